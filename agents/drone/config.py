@@ -12,6 +12,16 @@ def get_config():
             "topic_prefix": os.getenv("TOPIC_PREFIX", "lab"),
         },
         "publish_interval": float(os.getenv("PUBLISH_INTERVAL_SEC", 1.0)),
+        "telemetry_codec": os.getenv("TELEMETRY_CODEC", "json"),          # json | binary
+        # émission : "periodic" (chaque pas) | "adaptive" (sur changement + battement)
+        "telemetry": {
+            "mode": os.getenv("TELEMETRY_MODE", "periodic"),
+            "deadband_m": float(os.getenv("DEADBAND_M", 2.0)),
+            "deadband_alt_m": float(os.getenv("DEADBAND_ALT_M", 1.0)),
+            "deadband_battery_pct": float(os.getenv("DEADBAND_BATTERY_PCT", 1.0)),
+            "heartbeat_sec": float(os.getenv("HEARTBEAT_SEC", 30.0)),
+            "flying_interval_sec": float(os.getenv("FLYING_INTERVAL_SEC", 1.0)),
+        },
         "shared_secret": os.getenv("SHARED_SECRET", "dev-secret-change-me"),
         "start": {
             "lat": float(os.getenv("START_LAT", 48.8566)),
@@ -0,0 +1,354 @@
+"""
+Agent multi-drones : un conteneur pour des milliers d'agents de terrain
+(tests de charge), là où drone_agent.py fait tourner un drone par processus.
+- drones décrits par un fichier JSON et/ou une plage d'identifiants
+  (--count N --id-prefix field- : field-00001 ... field-0000N) ; valeurs par
+  défaut = config d'environnement de l'agent (MQTT_*, SHARED_SECRET...) ;
+- un superviseur répartit les drones (round-robin) sur un pool de
+  processus dimensionné au nombre de CPU ; chaque processus fait tourner une
+  boucle asyncio sur sa part (échéancier des pas) avec une connexion MQTT
+  (réseau paho dans son thread, commandes remises à la boucle) ;
+- chaque processus remonte ses compteurs au superviseur, qui imprime un
+  agrégat JSON par intervalle (débits, retard des pas, CPU) et relance un
+  processus mort.
+
+    python fleet_agent.py --count 5000 [--config drones.json] [--procs 8]
+                          [--stats-interval 5] [--duration 600] [--summary bilan.json]
+
+Fichier de configuration :
+    {"defaults": {"topic_prefix": "lab", "publish_interval": 1.0,
+                  "telemetry": {"mode": "adaptive"}},
+     "drones": [{"id": "d-1", "start_lat": 48.85, "start_lon": 2.35}],
+     "range": {"prefix": "field-", "first": 1, "count": 1000}}
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+from config import get_config
+from runtime import AgentDrone, spec_from_config
+
+GRID = 100  # drones d'une plage : grille de GRID colonnes espacées de 0,001°
+
+
+# --- description des drones ---
+
+def _merge(base: dict, override: dict) -> dict:
+    out = {**base, **override}
+    if "telemetry" in override:
+        out["telemetry"] = {**base["telemetry"], **override["telemetry"]}
+    return out
+
+
+def id_range(prefix: str, first: int, count: int, base: dict) -> List[dict]:
+    specs = []
+    for k in range(count):
+        specs.append({**base, "id": f"{prefix}{first + k:05d}",
+                      "start_lat": base["start_lat"] + (k // GRID) * 1e-3,
+                      "start_lon": base["start_lon"] + (k % GRID) * 1e-3})
+    return specs
+
+
+def load_specs(path: Optional[str] = None, count: int = 0, id_prefix: str = "field-",
+               first: int = 1, base: Optional[dict] = None) -> List[dict]:
+    base = base or spec_from_config(get_config())
+    specs = []
+    if path:
+        with open(path) as f:
+            doc = json.load(f)
+        if isinstance(doc, list):
+            doc = {"drones": doc}
+        base = _merge(base, doc.get("defaults", {}))
+        specs += [_merge(base, d) for d in doc.get("drones", [])]
+        r = doc.get("range")
+        if r:
+            specs += id_range(r.get("prefix", id_prefix), int(r.get("first", 1)), int(r["count"]), base)
+    if count:
+        specs += id_range(id_prefix, first, count, base)
+    ids = [s["id"] for s in specs]
+    if len(set(ids)) != len(ids):
+        raise ValueError("duplicate drone ids")
+    return specs
+
+
+def shard_specs(specs: List[dict], n: int) -> List[List[dict]]:
+    return [specs[i::n] for i in range(n) if specs[i::n]]
+
+
+# --- un processus : une boucle asyncio sur sa part ---
+
+class Shard:
+    def __init__(self, index: int, specs: List[dict], publish=None):
+        self.index = index
+        self._publish = publish
+        self.drones = [AgentDrone(s, self.publish) for s in specs]
+        self.by_topic: Dict[str, AgentDrone] = {d.t_commands: d for d in self.drones}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.client = None
+        self.connected = False
+        self.disconnects = 0
+
+        self.ticks = 0
+        self.resyncs = 0
+        self.publish_errors = 0
+        self.lateness_sum = 0.0
+        self.lateness_max = 0.0
+
+    # --- MQTT ---
+
+    def publish(self, topic: str, payload, qos: int):
+        if self._publish is not None:
+            self._publish(topic, payload, qos)
+        elif self.client is None or self.client.publish(topic, payload, qos=qos).rc != 0:
+            self.publish_errors += 1
+
+    def connect(self, mqtt_cfg: dict):
+        import paho.mqtt.client as mqtt
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2,
+                             client_id=f"fleet-agent-{socket.gethostname()}-{os.getpid()}-{self.index}")
+        if mqtt_cfg["username"]:
+            client.username_pw_set(mqtt_cfg["username"], mqtt_cfg["password"])
+        client.reconnect_delay_set(min_delay=1, max_delay=30)
+        # callbacks dans le thread réseau paho : tout est remis à la boucle asyncio
+        client.on_connect = lambda c, u, f, rc, p=None: self.loop.call_soon_threadsafe(self._on_connect, rc)
+        client.on_disconnect = lambda c, u, f, rc, p=None: self.loop.call_soon_threadsafe(self._on_disconnect)
+        client.on_message = lambda c, u, msg: self.loop.call_soon_threadsafe(self.deliver, msg.topic, msg.payload)
+        self.client = client
+        client.connect_async(mqtt_cfg["host"], mqtt_cfg["port"], keepalive=30)
+        client.loop_start()
+
+    def _on_connect(self, rc):
+        if rc.is_failure:
+            print(f"[shard {self.index}] connect failed: {rc}")
+            return
+        self.connected = True
+        topics = [(t, 1) for t in self.by_topic]
+        for i in range(0, len(topics), 500):
+            self.client.subscribe(topics[i:i + 500])
+        for d in self.drones:
+            d.connected()
+
+    def _on_disconnect(self):
+        if self.connected:
+            self.disconnects += 1
+        self.connected = False
+
+    def deliver(self, topic: str, raw: bytes):
+        drone = self.by_topic.get(topic)
+        if drone is not None:
+            drone.handle_message(raw)
+
+    # --- échéancier ---
+
+    async def run(self, duration: Optional[float] = None):
+        self.loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        n = len(self.drones)
+        seq = itertools.count()
+        # phases étalées sur un intervalle : pas de rafale à chaque seconde
+        heap = [(now + d.interval * i / n, next(seq), d) for i, d in enumerate(self.drones)]
+        heapq.heapify(heap)
+        end = None if duration is None else now + duration
+        while heap:
+            now = time.monotonic()
+            if end is not None and now >= end:
+                break
+            while heap and heap[0][0] <= now:
+                deadline, _, d = heapq.heappop(heap)
+                lateness = now - deadline
+                try:
+                    d.tick()
+                except Exception as e:
+                    print(f"[shard {self.index}] tick failed for {d.drone_id}: {e}")
+                self.ticks += 1
+                self.lateness_sum += lateness
+                if lateness > self.lateness_max:
+                    self.lateness_max = lateness
+                nxt = deadline + d.interval
+                if nxt < now:
+                    nxt = now + d.interval  # plus d'une période de retard : recalage
+                    self.resyncs += 1
+                heapq.heappush(heap, (nxt, next(seq), d))
+            # commandes reçues entre-temps : traitées pendant l'attente
+            await asyncio.sleep(max(0.0, heap[0][0] - time.monotonic()))
+
+    def stats(self) -> dict:
+        return {
+            "shard": self.index,
+            "pid": os.getpid(),
+            "drones": len(self.drones),
+            "connected": self.connected,
+            "disconnects": self.disconnects,
+            "ticks": self.ticks,
+            "published": sum(d.published for d in self.drones),
+            "suppressed": sum(d.gate.suppressed for d in self.drones if d.gate is not None),
+            "commands": sum(d.commands for d in self.drones),
+            "rejected": sum(d.rejected for d in self.drones),
+            "publish_errors": self.publish_errors,
+            "resyncs": self.resyncs,
+            "lateness_sum": self.lateness_sum,
+            "lateness_max_ms": self.lateness_max * 1000.0,
+            "cpu_sec": time.process_time(),
+        }
+
+
+async def _serve(shard: Shard, mqtt_cfg: dict, stats_q, stats_interval: float,
+                 duration: Optional[float]):
+    shard.loop = asyncio.get_running_loop()
+    shard.connect(mqtt_cfg)
+
+    async def report():
+        while True:
+            await asyncio.sleep(stats_interval)
+            stats_q.put(shard.stats())
+
+    reporter = asyncio.create_task(report())
+    try:
+        await shard.run(duration)
+    finally:
+        reporter.cancel()
+        stats_q.put({**shard.stats(), "final": True})
+        shard.client.disconnect()
+        shard.client.loop_stop()
+
+
+def _shard_main(index: int, specs: List[dict], mqtt_cfg: dict, stats_q, stats_interval: float,
+                duration: Optional[float]):
+    try:
+        asyncio.run(_serve(Shard(index, specs), mqtt_cfg, stats_q, stats_interval, duration))
+    except KeyboardInterrupt:
+        pass
+
+
+# --- superviseur ---
+
+def aggregate(latest: Dict[int, dict]) -> dict:
+    shards = list(latest.values())
+    ticks = sum(s["ticks"] for s in shards)
+    out = {k: sum(s[k] for s in shards)
+           for k in ("drones", "ticks", "published", "suppressed", "commands", "rejected",
+                     "publish_errors", "resyncs", "disconnects", "cpu_sec")}
+    out["shards"] = len(shards)
+    out["connected"] = sum(1 for s in shards if s["connected"])
+    out["lateness_avg_ms"] = sum(s["lateness_sum"] for s in shards) / ticks * 1000.0 if ticks else 0.0
+    out["lateness_max_ms"] = max((s["lateness_max_ms"] for s in shards), default=0.0)
+    return out
+
+
+class Supervisor:
+    def __init__(self, specs: List[dict], mqtt_cfg: dict, procs: Optional[int] = None,
+                 stats_interval: float = 5.0, duration: Optional[float] = None, out=sys.stdout):
+        self.procs = max(1, min(procs or os.cpu_count() or 1, len(specs)))
+        self.shards = shard_specs(specs, self.procs)
+        self.mqtt_cfg = mqtt_cfg
+        self.stats_interval = stats_interval
+        self.duration = duration
+        self.out = out
+        # spawn : pas d'héritage de threads / sockets du superviseur
+        self.ctx = mp.get_context("spawn")
+        self.stats_q = self.ctx.Queue()
+        self.workers: Dict[int, mp.Process] = {}
+        self.latest: Dict[int, dict] = {}
+        self.restarts = 0
+
+    def _spawn(self, index: int, duration: Optional[float]):
+        p = self.ctx.Process(target=_shard_main, name=f"fleet-agent-{index}", daemon=True,
+                             args=(index, self.shards[index], self.mqtt_cfg, self.stats_q,
+                                   self.stats_interval, duration))
+        p.start()
+        self.workers[index] = p
+
+    def _drain(self, timeout: float):
+        try:
+            s = self.stats_q.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            self.latest[s["shard"]] = s
+            try:
+                s = self.stats_q.get_nowait()
+            except queue.Empty:
+                return
+
+    def run(self) -> dict:
+        t0 = time.monotonic()
+        end = None if self.duration is None else t0 + self.duration
+        for i in range(len(self.shards)):
+            self._spawn(i, self.duration)
+        print(f"[fleet-agent] {sum(map(len, self.shards))} drones on {len(self.shards)} processes",
+              file=sys.stderr)
+        prev, prev_t = None, t0
+        next_report = t0 + self.stats_interval
+        try:
+            while any(p.is_alive() for p in self.workers.values()):
+                self._drain(timeout=0.5)
+                now = time.monotonic()
+                for i, p in list(self.workers.items()):
+                    if not p.is_alive() and p.exitcode != 0 and (end is None or now < end - 1.0):
+                        print(f"[fleet-agent] shard {i} died (exit {p.exitcode}), restarting", file=sys.stderr)
+                        self.restarts += 1
+                        self._spawn(i, None if end is None else end - now)
+                if now >= next_report and self.latest:
+                    prev, prev_t = self.report(prev, prev_t, now), now
+                    next_report += self.stats_interval
+        except KeyboardInterrupt:
+            for p in self.workers.values():
+                p.terminate()
+        for p in self.workers.values():
+            p.join(timeout=5.0)
+        self._drain(timeout=0.1)
+        summary = {**aggregate(self.latest), "restarts": self.restarts,
+                   "wall_sec": time.monotonic() - t0}
+        summary["ticks_per_sec"] = summary["ticks"] / summary["wall_sec"]
+        return summary
+
+    def report(self, prev: Optional[dict], prev_t: float, now: float) -> dict:
+        agg = aggregate(self.latest)
+        dt = now - prev_t
+        line = {"ts": time.time(), **agg, "restarts": self.restarts}
+        if prev is not None and dt > 0:
+            for k in ("ticks", "published", "commands"):
+                line[f"{k}_per_sec"] = (agg[k] - prev[k]) / dt
+            # CPU en % d'un cœur, tous processus confondus
+            line["cpu_pct"] = (agg["cpu_sec"] - prev["cpu_sec"]) / dt * 100.0
+        print(json.dumps(line), file=self.out, flush=True)
+        return agg
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Agent multi-drones (pool de processus)")
+    ap.add_argument("--config", help="fichier JSON (defaults, drones, range)")
+    ap.add_argument("--count", type=int, default=0, help="drones générés (plage d'identifiants)")
+    ap.add_argument("--id-prefix", default="field-")
+    ap.add_argument("--first", type=int, default=1, help="premier numéro de la plage")
+    ap.add_argument("--procs", type=int, default=0, help="processus (0 = nombre de CPU)")
+    ap.add_argument("--stats-interval", type=float, default=5.0)
+    ap.add_argument("--duration", type=float, help="secondes (sinon jusqu'à Ctrl-C)")
+    ap.add_argument("--summary", help="bilan JSON en fin d'exécution")
+    args = ap.parse_args(argv)
+
+    cfg = get_config()
+    specs = load_specs(args.config, args.count, args.id_prefix, args.first, spec_from_config(cfg))
+    if not specs:
+        ap.error("no drones: use --count and/or --config")
+    sup = Supervisor(specs, cfg["mqtt"], procs=args.procs or None,
+                     stats_interval=args.stats_interval, duration=args.duration)
+    summary = sup.run()
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
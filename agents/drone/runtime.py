@@ -0,0 +1,168 @@
+"""
+Drone de terrain simulé, sans thread ni client MQTT : état, commandes
+signées, acquittements et télémétrie. Les messages sortent par un callable
+publish(topic, payload, qos).
+Utilisé par drone_agent.py (un drone par processus) et fleet_agent.py
+(des milliers de drones répartis sur un pool de processus).
+"""
+
+import json
+import time
+from typing import Callable, Optional
+
+from security import signer_for
+from sim_models import DroneState, move_towards
+from telemetry_codec import TelemetryEncoder
+from telemetry_policy import TelemetryPolicy, gate_for
+
+Publish = Callable[[str, object, int], None]
+
+
+def spec_from_config(cfg: dict) -> dict:
+    """Description à plat d'un drone depuis la config d'environnement (config.get_config)."""
+    dyn = cfg["dynamics"]
+    return {
+        "id": cfg["drone_id"],
+        "topic_prefix": cfg["mqtt"]["topic_prefix"],
+        "shared_secret": cfg["shared_secret"],
+        "start_lat": cfg["start"]["lat"],
+        "start_lon": cfg["start"]["lon"],
+        "start_alt": cfg["start"]["alt"],
+        "publish_interval": cfg["publish_interval"],
+        "cruise_speed_mps": dyn["cruise_speed_mps"],
+        "battery_drain": dyn["battery_drain_factor"],
+        "heading_noise": dyn["heading_noise_deg"],
+        "telemetry_codec": cfg["telemetry_codec"],
+        "telemetry": dict(cfg["telemetry"]),
+    }
+
+
+class AgentDrone:
+    def __init__(self, spec: dict, publish: Publish, clock: Callable[[], float] = time.time):
+        self.drone_id = spec["id"]
+        self.publish = publish
+        self.clock = clock
+        self.signer = signer_for(spec["shared_secret"])  # état HMAC partagé par secret
+        self.interval = float(spec["publish_interval"])
+        self.cruise_speed = float(spec["cruise_speed_mps"])
+        self.battery_drain = float(spec["battery_drain"])
+        self.heading_noise = float(spec["heading_noise"])
+        # json (historique) ou binaire compact (cf. telemetry_codec.py)
+        self.encode = TelemetryEncoder().encode if spec["telemetry_codec"] == "binary" else json.dumps
+        # None en mode périodique : un message par pas (cf. telemetry_policy.py)
+        self.gate = gate_for(TelemetryPolicy(**spec["telemetry"]), self.interval)
+
+        self.state = DroneState(lat=spec["start_lat"], lon=spec["start_lon"], alt=spec["start_alt"])
+        self.home = (spec["start_lat"], spec["start_lon"])
+        self.waypoint: Optional[tuple] = None
+
+        base = f"{spec['topic_prefix']}/drone/{self.drone_id}"
+        self.t_telemetry = f"{base}/telemetry"
+        self.t_events = f"{base}/events"
+        self.t_commands = f"{base}/commands"  # sous-topic unique, cmd via payload JSON
+
+        self.published = 0
+        self.commands = 0
+        self.rejected = 0
+
+    # --- connexion ---
+
+    def connected(self):
+        self.publish(self.t_events, json.dumps({
+            "type": "status", "message": "connected", "ts": self.clock(),
+        }), 1)
+        if self.gate is not None:
+            self.gate.reset()  # état complet dès la (re)connexion
+
+    # --- commandes ---
+
+    def handle_message(self, raw: bytes):
+        payload, valid = self.signer.unseal(raw)
+        if payload is None:
+            print(f"[{self.drone_id}] invalid envelope (JSON, payload/sig)")
+            self.rejected += 1
+            return
+        cid = payload.get("cid")  # corrélation : acquittée sur t_events
+        cmd = payload.get("cmd")
+        if not valid:
+            print(f"[{self.drone_id}] signature invalid, command rejected")
+            self.rejected += 1
+            self.ack(cid, cmd, False, "signature invalid")
+            return
+
+        args = payload.get("args") or {}
+        self.commands += 1
+        try:
+            self.apply_command(cmd, args)
+        except Exception as e:
+            print(f"[{self.drone_id}] {cmd} failed: {e!r}")
+            self.rejected += 1
+            self.ack(cid, cmd, False, f"{type(e).__name__}: {e}")
+            return
+        self.ack(cid, cmd, True)
+
+    def ack(self, cid, cmd, ok, error=None):
+        if not isinstance(cid, str):
+            return  # commande sans cid (ancienne API) : pas d'accusé
+        self.publish(self.t_events, json.dumps({
+            "type": "ack", "cid": cid, "cmd": cmd, "ok": ok, "error": error, "ts": self.clock(),
+        }), 1)
+
+    def apply_command(self, cmd, args):
+        state = self.state
+        if cmd == "takeoff":
+            state.status = "flying"
+            state.alt = max(state.alt, float(args.get("alt", 10.0)))
+        elif cmd == "land":
+            state.status = "landing"
+            state.alt = 0.0
+            self.waypoint = None
+        elif cmd == "goto":
+            lat = float(args["lat"]); lon = float(args["lon"]); alt = float(args.get("alt", state.alt))
+            self.waypoint = (lat, lon)
+            state.status = "flying"
+            state.alt = alt
+        elif cmd == "rth":
+            # Return-To-Home : revient au point de départ
+            self.waypoint = self.home
+            state.status = "flying"
+        elif cmd == "ping":
+            self.publish(self.t_events, json.dumps({"type": "pong", "ts": self.clock()}), 0)
+        else:
+            raise ValueError(f"unknown cmd {cmd!r}")
+
+    # --- pas de simulation ---
+
+    def step(self):
+        state, wp = self.state, self.waypoint
+        if state.status == "flying" and wp is not None:
+            move_towards(
+                state, wp[0], wp[1],
+                dt=self.interval,
+                speed_mps=self.cruise_speed,
+                drain_factor=self.battery_drain,
+                noise_deg=self.heading_noise,
+            )
+            # Arrivé au waypoint ?
+            if abs(state.lat - wp[0]) < 1e-5 and abs(state.lon - wp[1]) < 1e-5:
+                self.waypoint = None
+                state.status = "idle"
+
+    def tick(self):
+        """Avance d'un pas (dt = publish_interval) puis publie la télémétrie (si la politique le veut)."""
+        self.step()
+        state = self.state
+        ts = self.clock()
+        if self.gate is not None and not self.gate.should_publish(
+                ts, state.lat, state.lon, state.alt, state.battery_pct, state.status):
+            return
+        self.publish(self.t_telemetry, self.encode({
+            "drone_id": self.drone_id,
+            "ts": ts,
+            "position": {"lat": state.lat, "lon": state.lon, "alt": state.alt},
+            "speed_mps": state.speed_mps,
+            "battery_pct": state.battery_pct,
+            "status": state.status,
+            "heading_deg": state.heading_deg,
+        }), 0)
+        self.published += 1
@@ -15,9 +15,11 @@ class DroneState:
 
 def move_towards(state: DroneState, target_lat: float, target_lon: float,
                  dt: float, speed_mps: float = 5.0,
-                 drain_factor: float = 0.005, noise_deg: float = 0.0):
+                 drain_factor: float = 0.005, noise_deg: float = 0.0,
+                 rng=None):
     """Déplace grossièrement le drone vers un waypoint (lat/lon) en supposant terrain plat.
     NB: modèle très simplifié pour le bac à sable.
+    rng : générateur optionnel (uniform(a, b)) pour un bruit de cap reproductible.
     """
     dlat = target_lat - state.lat
     dlon = target_lon - state.lon
@@ -38,7 +40,7 @@ def move_towards(state: DroneState, target_lat: float, target_lon: float,
 
     hdg = (math.degrees(math.atan2(dlon, dlat)) + 360) % 360
     if noise_deg:
-        hdg = (hdg + random.uniform(-noise_deg, noise_deg)) % 360
+        hdg = (hdg + (rng or random).uniform(-noise_deg, noise_deg)) % 360
     state.heading_deg = hdg
 
     state.battery_pct = max(0.0, state.battery_pct - drain_factor * speed_mps * dt)
@@ -0,0 +1,160 @@
+"""
+Codec binaire compact pour la télémétrie (v1), à côté du JSON historique.
+Spécification complète : docs/telemetry-binary.md (à garder en phase).
+
+Enregistrement (little-endian, 52 octets fixes) :
+
+    u8  version   = 1
+    u8  kind      = 1 (enregistrement)
+    u8  status    0 idle | 1 flying | 2 landing | 3 error | 255 inconnu
+    u8  flags     bit 0 : l'identifiant texte suit l'enregistrement
+    u64 id_ref    identifiant interné = blake2b-64(drone_id)
+    f64 ts, f64 lat, f64 lon
+    f32 alt, f32 speed_mps, f32 battery_pct, f32 heading_deg
+    [u8 len + drone_id utf-8]   si flags & 1
+
+Trame (mode batch) : u8 version, u8 kind = 2, u16 count, puis `count`
+enregistrements concaténés.
+
+Le premier octet d'un JSON est "{" (0x7B), celui d'un message binaire est la
+version (0x01) : decode_any() accepte donc indifféremment les deux formats.
+Copie de fleet-api/telemetry_codec.py (à garder identique).
+"""
+
+import hashlib
+import json
+import struct
+from typing import Dict, List, Optional
+
+VERSION = 1
+KIND_RECORD = 1
+KIND_FRAME = 2
+
+FLAG_ID = 0x01
+
+STATUS_CODES = ("idle", "flying", "landing", "error")
+STATUS_INDEX = {name: code for code, name in enumerate(STATUS_CODES)}
+STATUS_UNKNOWN = 255
+
+RECORD = struct.Struct("<BBBBQdddffff")
+FRAME_HEADER = struct.Struct("<BBH")
+MAX_FRAME_RECORDS = 0xFFFF  # count sur u16
+
+# Renvoie l'identifiant texte tous les N messages d'un drone, pour les
+# abonnés arrivés en cours de route.
+ANNOUNCE_EVERY = 100
+
+
+def intern_id(drone_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(drone_id.encode(), digest_size=8).digest(), "little")
+
+
+class TelemetryEncoder:
+    def __init__(self, announce_every: int = ANNOUNCE_EVERY):
+        self.announce_every = max(1, announce_every)
+        # drone_id -> [id_ref, id utf-8 préfixé par sa longueur, compteur]
+        self._ids: Dict[str, list] = {}
+
+    def _intern(self, drone_id: str) -> list:
+        entry = self._ids.get(drone_id)
+        if entry is None:
+            raw = drone_id.encode()
+            if len(raw) > 255:
+                raise ValueError("drone_id too long for binary telemetry")
+            entry = [intern_id(drone_id), bytes((len(raw),)) + raw, 0]
+            self._ids[drone_id] = entry
+        return entry
+
+    def encode(self, record: dict) -> bytes:
+        entry = self._intern(record["drone_id"])
+        announce = entry[2] % self.announce_every == 0
+        entry[2] += 1
+        return self._pack(record, entry, announce)
+
+    def _pack(self, record: dict, entry: list, announce: bool) -> bytes:
+        pos = record["position"]
+        head = RECORD.pack(
+            VERSION, KIND_RECORD,
+            STATUS_INDEX.get(record["status"], STATUS_UNKNOWN),
+            FLAG_ID if announce else 0,
+            entry[0], record["ts"], pos["lat"], pos["lon"],
+            pos["alt"], record["speed_mps"], record["battery_pct"], record["heading_deg"],
+        )
+        return head + entry[1] if announce else head
+
+    def encode_frame(self, records: List[dict]) -> bytes:
+        # Une trame n'a pas de topic par drone pour retrouver l'identifiant :
+        # chaque enregistrement porte donc son id texte (un abonné qui vient
+        # de (re)démarrer décode la trame entière sans table préalable).
+        if len(records) > MAX_FRAME_RECORDS:
+            raise ValueError(f"too many records for one frame (max {MAX_FRAME_RECORDS})")
+        parts = [FRAME_HEADER.pack(VERSION, KIND_FRAME, len(records))]
+        parts.extend(self._pack(r, self._intern(r["drone_id"]), True) for r in records)
+        return b"".join(parts)
+
+
+class TelemetryDecoder:
+    def __init__(self):
+        self.ids: Dict[int, str] = {}
+
+    def _record(self, buf, offset: int, topic_id: Optional[str]):
+        (version, kind, status, flags, ref, ts, lat, lon,
+         alt, speed, battery, heading) = RECORD.unpack_from(buf, offset)
+        if version != VERSION or kind != KIND_RECORD:
+            raise ValueError(f"unsupported telemetry record v{version} kind {kind}")
+        offset += RECORD.size
+        if flags & FLAG_ID:
+            n = buf[offset]
+            drone_id = bytes(buf[offset + 1:offset + 1 + n]).decode()
+            offset += 1 + n
+            self.ids[ref] = drone_id
+        else:
+            drone_id = self.ids.get(ref) or topic_id
+            if topic_id and ref not in self.ids:
+                self.ids[ref] = topic_id
+        rec = {
+            "drone_id": drone_id,
+            "ts": ts,
+            "position": {"lat": lat, "lon": lon, "alt": alt},
+            "speed_mps": speed,
+            "battery_pct": battery,
+            "status": STATUS_CODES[status] if status < len(STATUS_CODES) else "unknown",
+            "heading_deg": heading,
+        }
+        return rec, offset
+
+    def decode(self, buf: bytes, topic: Optional[str] = None):
+        """Décode un enregistrement (dict) ou une trame (list de dict)."""
+        topic_id = _drone_id_from_topic(topic)
+        if len(buf) >= 2 and buf[1] == KIND_FRAME:
+            version, _, count = FRAME_HEADER.unpack_from(buf, 0)
+            if version != VERSION:
+                raise ValueError(f"unsupported telemetry frame v{version}")
+            offset, out = FRAME_HEADER.size, []
+            for _ in range(count):
+                rec, offset = self._record(buf, offset, None)
+                out.append(rec)
+            return out
+        rec, _ = self._record(buf, 0, topic_id)
+        return rec
+
+
+def _drone_id_from_topic(topic: Optional[str]) -> Optional[str]:
+    # "{prefix}/drone/{id}/telemetry"
+    if not topic or "/drone/" not in topic:
+        return None
+    return topic.split("/drone/", 1)[1].split("/", 1)[0]
+
+
+def is_binary(payload) -> bool:
+    return len(payload) > 0 and payload[0] == VERSION
+
+
+_default_decoder = TelemetryDecoder()
+
+
+def decode_any(payload, topic: Optional[str] = None, decoder: Optional[TelemetryDecoder] = None):
+    """JSON ou binaire : dict (un drone), ou list/dict de trame selon le format."""
+    if is_binary(payload):
+        return (decoder or _default_decoder).decode(payload, topic)
+    return json.loads(payload)
@@ -0,0 +1,91 @@
+"""
+Politique d'émission de la télémétrie, par drone.
+- "periodic" (historique) : un message à chaque pas (publish_interval) ;
+- "adaptive" : un message seulement si la position, l'altitude, la batterie
+  ou le statut ont bougé au-delà des zones mortes depuis le dernier message
+  émis ; sinon un battement toutes les heartbeat_sec. En vol, le battement
+  passe à flying_interval_sec (cadence relevée tant que le drone vole).
+Le pas de simulation reste publish_interval : seule l'émission est filtrée.
+Copie de fleet-api/telemetry_policy.py (à garder identique).
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+PERIODIC = "periodic"
+ADAPTIVE = "adaptive"
+MODES = (PERIODIC, ADAPTIVE)
+
+M_PER_DEG = 111_000.0  # même approximation que move_towards
+
+
+@dataclass(frozen=True)
+class TelemetryPolicy:
+    mode: str = PERIODIC
+    deadband_m: float = 2.0
+    deadband_alt_m: float = 1.0
+    deadband_battery_pct: float = 1.0
+    heartbeat_sec: float = 30.0
+    flying_interval_sec: float = 1.0
+
+    @classmethod
+    def from_drone(cls, d) -> "TelemetryPolicy":
+        """Depuis un Drone / DroneCreate (champs telemetry_*, deadband_*...)."""
+        return cls(
+            mode=d.telemetry_mode,
+            deadband_m=d.deadband_m,
+            deadband_alt_m=d.deadband_alt_m,
+            deadband_battery_pct=d.deadband_battery_pct,
+            heartbeat_sec=d.heartbeat_sec,
+            flying_interval_sec=d.flying_interval_sec,
+        )
+
+
+class TelemetryGate:
+    """
+    Décide à chaque pas si l'état doit être émis (un portillon par drone).
+    step_sec : période des pas ; les battements sont arrondis au pas le plus
+    proche (un pas arrivé 1 ms trop tôt ne repousse pas l'émission d'un pas).
+    """
+    __slots__ = ("policy", "_slack", "_lat", "_lon", "_alt", "_battery", "_status", "_ts",
+                 "sent", "suppressed")
+
+    def __init__(self, policy: TelemetryPolicy, step_sec: float):
+        self.policy = policy
+        self._slack = step_sec / 2.0
+        self._ts: Optional[float] = None
+        self._lat = self._lon = self._alt = self._battery = 0.0
+        self._status = ""
+        self.sent = 0
+        self.suppressed = 0
+
+    def reset(self):
+        """Force l'émission au prochain pas (redémarrage, reconnexion)."""
+        self._ts = None
+
+    def should_publish(self, ts: float, lat: float, lon: float, alt: float,
+                       battery_pct: float, status: str) -> bool:
+        p = self.policy
+        last = self._ts
+        if last is not None and status == self._status:
+            beat = p.flying_interval_sec if status == "flying" else p.heartbeat_sec
+            if (ts - last + self._slack < beat
+                    and abs(alt - self._alt) < p.deadband_alt_m
+                    and abs(battery_pct - self._battery) < p.deadband_battery_pct
+                    and math.hypot(lat - self._lat, lon - self._lon) * M_PER_DEG < p.deadband_m):
+                self.suppressed += 1
+                return False
+        self._ts, self._status = ts, status
+        self._lat, self._lon, self._alt, self._battery = lat, lon, alt, battery_pct
+        self.sent += 1
+        return True
+
+
+def gate_for(policy: TelemetryPolicy, step_sec: float) -> Optional[TelemetryGate]:
+    """None en mode périodique : aucun coût sur le chemin historique."""
+    if policy.mode == PERIODIC:
+        return None
+    if policy.mode != ADAPTIVE:
+        raise ValueError(f"unknown telemetry mode {policy.mode!r}")
+    return TelemetryGate(policy, step_sec)
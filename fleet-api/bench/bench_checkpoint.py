@@ -0,0 +1,81 @@
+"""
+Bench points de reprise (checkpoint.py) : coût d'un point de reprise
+(collecte + encodage + écriture) et d'une reprise au démarrage (lecture
+mmap + relance de N drones, état et mission restaurés), moteurs scheduler
+et vector, sans broker.
+
+    python bench/bench_checkpoint.py [--drones 1000,5000,10000] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DISABLE_MQTT", "1")
+
+from checkpoint import Checkpointer  # noqa: E402
+from manager import FleetManager  # noqa: E402
+from models import Drone  # noqa: E402
+
+
+def fleet_manager(engine: str) -> FleetManager:
+    os.environ["SIM_ENGINE"] = engine
+    return FleetManager()
+
+
+def run(n: int, engine: str, path: str) -> dict:
+    drones = [Drone(id=f"d-{i:05d}", start_lat=48.0 + i * 1e-4, start_lon=2.0) for i in range(n)]
+    fleet = fleet_manager(engine)
+    for i, d in enumerate(drones):
+        fleet.start(d)
+        if i % 2:  # une moitié en mission
+            fleet.workers[d.id].apply_command("mission", {"waypoints": [
+                {"lat": 48.5, "lon": 2.5, "alt": 40}, {"lat": 48.6, "lon": 2.6}]})
+    ck = Checkpointer(path, fleet.snapshot)
+    write_ms = []
+    for _ in range(5):
+        ck.write()
+        write_ms.append(ck.last_ms)
+    fleet.shutdown()
+
+    fleet = fleet_manager(engine)
+    t0 = time.perf_counter()
+    fleet.saved.update(ck.restore())
+    for d in drones:
+        fleet.start(d)
+    resume_ms = (time.perf_counter() - t0) * 1000.0
+    assert sum(1 for w in fleet.workers.values() if w.is_running()) == n
+    fleet.shutdown()
+    return {
+        "drones": n,
+        "engine": engine,
+        "frame_bytes": ck.last_bytes,
+        "checkpoint_ms": min(write_ms),
+        "read_ms": ck.restore_ms,
+        "resume_ms": resume_ms,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--drones", default="1000,5000,10000")
+    p.add_argument("--engines", default="scheduler,vector")
+    p.add_argument("--out")
+    args = p.parse_args()
+    res = []
+    with tempfile.TemporaryDirectory(prefix="fleet-ckpt-") as tmp:
+        for engine in args.engines.split(","):
+            for n in args.drones.split(","):
+                res.append(run(int(n), engine, os.path.join(tmp, f"{engine}-{n}.ckpt")))
+    print(json.dumps(res, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Bench codec télémétrie : JSON actuel vs binaire compact (telemetry_codec.py).
+Mesure octets/message et µs par encodage/décodage.
+
+    python bench/bench_codec.py [--n 20000] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telemetry_codec import TelemetryDecoder, TelemetryEncoder  # noqa: E402
+
+
+def sample(i: int) -> dict:
+    return {
+        "drone_id": f"drone-{i:05d}",
+        "ts": time.time(),
+        "position": {"lat": 48.8566 + i * 1e-5, "lon": 2.3522 - i * 1e-5, "alt": 35.0},
+        "speed_mps": 8.0,
+        "battery_pct": 87.25,
+        "status": "flying",
+        "heading_deg": 123.4,
+    }
+
+
+def per_call_us(fn, n: int) -> float:
+    return min(timeit.repeat(fn, number=n, repeat=3)) / n * 1e6
+
+
+def run(n: int) -> dict:
+    records = [sample(i) for i in range(1000)]
+    enc, dec = TelemetryEncoder(), TelemetryDecoder()
+
+    json_msgs = [json.dumps(r) for r in records]
+    # 2e passage : régime établi (identifiant déjà annoncé)
+    [enc.encode(r) for r in records]
+    bin_msgs = [enc.encode(r) for r in records]
+
+    it = iter(range(10**9))
+    pick = lambda: records[next(it) % 1000]  # noqa: E731
+    return {
+        "json": {
+            "bytes_per_msg": sum(map(len, json_msgs)) / len(json_msgs),
+            "encode_us": per_call_us(lambda: json.dumps(pick()), n),
+            "decode_us": per_call_us(lambda: json.loads(json_msgs[0]), n),
+        },
+        "binary": {
+            "bytes_per_msg": sum(map(len, bin_msgs)) / len(bin_msgs),
+            "bytes_with_id": len(TelemetryEncoder().encode(records[0])),
+            "encode_us": per_call_us(lambda: enc.encode(pick()), n),
+            "decode_us": per_call_us(lambda: dec.decode(bin_msgs[0]), n),
+        },
+        "batch_frame_500": {
+            "json_bytes": len(json.dumps({"v": 1, "drones": records[:500]}, separators=(",", ":"))),
+            "binary_bytes": len(enc.encode_frame(records[:500])),
+        },
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=20000)
+    p.add_argument("--out")
+    args = p.parse_args()
+    res = run(args.n)
+    print(json.dumps(res, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
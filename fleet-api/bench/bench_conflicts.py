@@ -0,0 +1,86 @@
+"""
+Bench détection de conflits (conflicts.find_conflicts) : durée d'une passe
+flotte entière à densité constante (~1 drone / 4 ha), comparée au balayage
+de toutes les paires (O(n²)) sur les petites flottes.
+
+    python bench/bench_conflicts.py [--drones 1000,10000,50000] [--out results.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conflicts import find_conflicts  # noqa: E402
+from spatial import M_PER_DEG  # noqa: E402
+
+SEP, VERT, HORIZON = 50.0, 15.0, 30.0
+
+
+def fleet(n: int, rng) -> tuple:
+    side_deg = math.sqrt(n * 40_000.0) / M_PER_DEG  # 200 m x 200 m par drone
+    return (48.5 + rng.uniform(0, side_deg, n), 2.0 + rng.uniform(0, side_deg * 1.5, n),
+            rng.uniform(10, 120, n), rng.uniform(0, 15, n), rng.uniform(0, 360, n))
+
+
+def brute_force(lat, lon, alt, speed, heading) -> int:
+    """Toutes les paires, même calcul de CPA (vectorisé par ligne)."""
+    kx = M_PER_DEG * math.cos(math.radians(float(lat.mean())))
+    x, y = lon * kx, lat * M_PER_DEG
+    vx, vy = speed * np.sin(np.radians(heading)), speed * np.cos(np.radians(heading))
+    hits = 0
+    for i in range(lat.size - 1):
+        px, py = x[i + 1:] - x[i], y[i + 1:] - y[i]
+        rvx, rvy = vx[i + 1:] - vx[i], vy[i + 1:] - vy[i]
+        vv = rvx * rvx + rvy * rvy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.clip(np.where(vv > 0, -(px * rvx + py * rvy) / vv, 0.0), 0.0, HORIZON)
+        ok = (np.hypot(px + rvx * t, py + rvy * t) < SEP) & (np.abs(alt[i + 1:] - alt[i]) < VERT)
+        hits += int(ok.sum())
+    return hits
+
+
+def run(n: int, brute_max: int) -> dict:
+    rng = np.random.default_rng(1)
+    arrays = fleet(n, rng)
+    find_conflicts(*arrays, SEP, VERT, HORIZON)  # chauffe
+    reps = max(3, 20_000 // n)
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        res = find_conflicts(*arrays, SEP, VERT, HORIZON)
+    out = {
+        "drones": n,
+        "pass_ms": (time.perf_counter() - t0) / reps * 1000.0,
+        "candidates": int(res["candidates"]),
+        "conflicts": int(res["i"].size),
+    }
+    if n <= brute_max:
+        t0 = time.perf_counter()
+        hits = brute_force(*arrays)
+        out["brute_force_ms"] = (time.perf_counter() - t0) * 1000.0
+        out["brute_force_conflicts"] = hits
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--drones", default="1000,10000,50000")
+    p.add_argument("--brute-max", type=int, default=10_000,
+                   help="balayage O(n²) de comparaison jusqu'à cette taille")
+    p.add_argument("--out")
+    args = p.parse_args()
+    res = [run(int(n), args.brute_max) for n in args.drones.split(",")]
+    print(json.dumps(res, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
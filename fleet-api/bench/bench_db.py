@@ -0,0 +1,71 @@
+"""
+Bench lectures /drones : requêtes/s sur GET /drones/{id} et temps de
+GET /drones selon la concurrence, via l'app ASGI en mémoire, sans broker,
+sur une base temporaire.
+
+    python bench/bench_db.py [--drones 1000] [--requests 2000] [--out results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="fleet-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/fleet.db")
+os.environ.setdefault("DISABLE_MQTT", "1")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from main import app  # noqa: E402
+
+
+async def run(n_drones: int, n_requests: int, levels) -> dict:
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as ac:
+            await ac.post("/drones/bulk", json=[{"id": f"bench-{i:05d}"} for i in range(n_drones)])
+            for conc in levels:
+                sem = asyncio.Semaphore(conc)
+
+                async def one(i):
+                    async with sem:
+                        r = await ac.get(f"/drones/bench-{i % n_drones:05d}")
+                        assert r.status_code == 200
+
+                t0 = time.perf_counter()
+                await asyncio.gather(*(one(i) for i in range(n_requests)))
+                dt = time.perf_counter() - t0
+                results[f"get_one_c{conc}"] = {"req_per_sec": n_requests / dt}
+
+            t0 = time.perf_counter()
+            for _ in range(10):
+                r = await ac.get("/drones")
+            results["list_all"] = {"ms": (time.perf_counter() - t0) / 10 * 1000,
+                                   "drones": len(r.json())}
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--drones", type=int, default=1000)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", default="1,10,50")
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    levels = [int(x) for x in args.concurrency.split(",")]
+    results = asyncio.run(run(args.drones, args.requests, levels))
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Bench ingestion télémétrie : messages/s traités par TelemetryIngestor
+(décodage + mise à jour du cache), JSON et binaire.
+
+    python bench/bench_ingest.py [--n 200000] [--drones 5000] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import TelemetryCache, TelemetryIngestor  # noqa: E402
+from telemetry_codec import TelemetryEncoder  # noqa: E402
+
+
+def messages(n_drones: int, binary: bool):
+    enc = TelemetryEncoder()
+    out = []
+    for i in range(n_drones):
+        drone_id = f"drone-{i:05d}"
+        rec = {"drone_id": drone_id, "ts": time.time(),
+               "position": {"lat": 48.85, "lon": 2.35, "alt": 30.0},
+               "speed_mps": 8.0, "battery_pct": 90.0, "status": "flying", "heading_deg": 12.0}
+        payload = enc.encode(rec) if binary else json.dumps(rec).encode()
+        out.append(SimpleNamespace(topic=f"lab/drone/{drone_id}/telemetry", payload=payload))
+    return out
+
+
+def run(n: int, n_drones: int) -> dict:
+    res = {}
+    for name, binary in (("json", False), ("binary", True)):
+        ing = TelemetryIngestor(TelemetryCache(), "localhost", 1883)
+        msgs = messages(n_drones, binary)
+        t0 = time.perf_counter()
+        for i in range(n):
+            ing._on_message(None, None, msgs[i % n_drones])
+        elapsed = time.perf_counter() - t0
+        res[name] = {"messages": n, "msgs_per_sec": n / elapsed, "errors": ing.errors}
+    return res
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=200000)
+    p.add_argument("--drones", type=int, default=5000)
+    p.add_argument("--out")
+    args = p.parse_args()
+    res = run(args.n, args.drones)
+    print(json.dumps(res, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
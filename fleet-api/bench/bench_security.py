@@ -0,0 +1,82 @@
+"""
+Bench signature des commandes : ancienne implémentation (hmac.new + json.dumps
+à chaque appel) vs security.Signer (état HMAC copié, encodeur canonique
+réutilisé, vérification sur les octets reçus). µs par message.
+
+    python bench/bench_security.py [--n 20000] [--out results.json]
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security import Signer  # noqa: E402
+
+SECRET = "dev-secret-change-me"
+
+
+def legacy_sign(payload: dict, secret: str) -> str:
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def legacy_receive(raw: bytes, secret: str) -> bool:
+    data = json.loads(raw.decode())
+    return hmac.compare_digest(legacy_sign(data["payload"], secret), data["sig"])
+
+
+def sample(i: int) -> dict:
+    return {"cmd": "goto", "cid": f"5f3a-{i:x}",
+            "args": {"lat": 48.8566 + i * 1e-5, "lon": 2.3522, "alt": 30.0}}
+
+
+def per_call_us(fn, n: int) -> float:
+    return min(timeit.repeat(fn, number=n, repeat=3)) / n * 1e6
+
+
+def run(n: int) -> dict:
+    signer = Signer(SECRET)
+    payloads = [sample(i) for i in range(1000)]
+    legacy_raw = [json.dumps({"sig": legacy_sign(p, SECRET), "payload": p}).encode() for p in payloads]
+    sealed = [signer.seal(p)[1] for p in payloads]
+    assert all(signer.unseal(r)[1] for r in sealed + legacy_raw)
+
+    it = iter(range(10**9))
+    pick = lambda seq: seq[next(it) % 1000]  # noqa: E731
+    batch = n // 1000 or 1
+    return {
+        "sign_us": {
+            "legacy": per_call_us(lambda: legacy_sign(pick(payloads), SECRET), n),
+            "signer": per_call_us(lambda: signer.sign(pick(payloads)), n),
+            "seal": per_call_us(lambda: signer.seal(pick(payloads)), n),
+            "sign_many_per_msg": per_call_us(lambda: signer.sign_many(payloads), batch) / 1000,
+        },
+        "receive_us": {
+            # décodage + vérification d'une enveloppe brute
+            "legacy": per_call_us(lambda: legacy_receive(pick(legacy_raw), SECRET), n),
+            "unseal_fast_path": per_call_us(lambda: signer.unseal(pick(sealed)), n),
+            "unseal_legacy_envelope": per_call_us(lambda: signer.unseal(pick(legacy_raw)), n),
+        },
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=20000)
+    p.add_argument("--out")
+    args = p.parse_args()
+    res = run(args.n)
+    print(json.dumps(res, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Bench index spatial (spatial.GridIndex) : coût d'une mise à jour et latence
+des requêtes bbox / rayon / k plus proches à N drones.
+
+    python bench/bench_spatial.py [--drones 100000] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial import GridIndex  # noqa: E402
+
+
+def timed_us(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def run(n_drones: int, cell_deg: float) -> dict:
+    r = random.Random(1)
+    idx = GridIndex(cell_deg=cell_deg)
+    # flotte répartie sur ~1° x 1° autour de Paris
+    pts = [(48.4 + r.random(), 1.9 + r.random()) for _ in range(n_drones)]
+    for i, (lat, lon) in enumerate(pts):
+        idx.update(f"d-{i}", lat, lon)
+
+    moves = [(f"d-{r.randrange(n_drones)}", 48.4 + r.random(), 1.9 + r.random()) for _ in range(100_000)]
+    it = iter(moves * 2)
+    update_us = timed_us(lambda: idx.update(*next(it)), len(moves))
+
+    q = [(48.4 + r.random(), 1.9 + r.random()) for _ in range(1000)]
+    qi = iter(q * 10)
+
+    def bbox():
+        lat, lon = next(qi)
+        return idx.bbox(lat, lon, lat + 0.01, lon + 0.015)
+
+    def radius():
+        lat, lon = next(qi)
+        return idx.radius(lat, lon, 500.0)
+
+    def nearest():
+        lat, lon = next(qi)
+        return idx.nearest(lat, lon, 10)
+
+    return {
+        "drones": n_drones,
+        "cells": idx.stats()["cells"],
+        "update_us": update_us,
+        "bbox_1km_us": timed_us(bbox, 1000),
+        "radius_500m_us": timed_us(radius, 1000),
+        "nearest_10_us": timed_us(nearest, 1000),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--drones", type=int, default=100_000)
+    p.add_argument("--cell-deg", type=float, default=0.01)
+    p.add_argument("--out")
+    args = p.parse_args()
+    res = run(args.drones, args.cell_deg)
+    print(json.dumps(res, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
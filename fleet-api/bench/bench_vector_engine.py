@@ -0,0 +1,93 @@
+"""
+Bench moteur de simulation : coût d'un tick de flotte complet (pas + construction
+de la télémétrie + publication sur un bus nul), SimEngine (un step Python par
+drone) contre VectorEngine (pas NumPy groupé).
+
+    python bench/bench_vector_engine.py [--sizes 1000,10000,50000] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bus import NullBus  # noqa: E402
+from engine import ScheduledDrone, SimEngine, VectorDrone, VectorEngine  # noqa: E402
+
+
+def params(i: int) -> dict:
+    return dict(drone_id=f"drone-{i:05d}", topic_prefix="bench", shared_secret="s",
+                start_lat=48.8 + (i % 100) * 1e-3, start_lon=2.3 + (i // 100) * 1e-4,
+                start_alt=0.0, publish_interval_sec=1.0, cruise_speed_mps=8.0,
+                battery_drain=0.005, heading_noise=2.0)
+
+
+def fly(drone, i: int):
+    drone.apply_command("goto", {"lat": 48.9, "lon": 2.4 + i * 1e-6, "alt": 30.0})
+
+
+def bench_scalar(n: int, rounds: int) -> dict:
+    engine, bus = SimEngine(), NullBus()
+    drones = [ScheduledDrone(engine, bus, **params(i)) for i in range(n)]
+    for i, d in enumerate(drones):
+        fly(d, i)
+    step = full = 0.0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for d in drones:
+            d.step()
+        t1 = time.perf_counter()
+        for d in drones:
+            d.publish_state(d.state, d.telemetry())
+        t2 = time.perf_counter()
+        step += t1 - t0
+        full += t2 - t0
+    return {"step_ms": step / rounds * 1000, "tick_ms": full / rounds * 1000}
+
+
+def bench_vector(n: int, rounds: int) -> dict:
+    engine, bus = VectorEngine(threaded=False, seed=1), NullBus()
+    for i in range(n):
+        d = VectorDrone(engine, bus, **params(i))
+        d.start()
+        fly(d, i)
+    now = time.monotonic()
+    full = step = 0.0
+    for k in range(1, rounds + 1):
+        t0 = time.perf_counter()
+        engine.run_due(now + k * 1.0 + 0.5)
+        full += time.perf_counter() - t0
+        step += engine.last_step_ms / 1000.0
+    return {"step_ms": step / rounds * 1000, "tick_ms": full / rounds * 1000}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,50000")
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    import builtins
+    quiet_print, builtins.print = builtins.print, lambda *a, **k: None  # logs "CMD ..."
+    try:
+        results = {}
+        for n in (int(x) for x in args.sizes.split(",")):
+            results[n] = {"scheduler": bench_scalar(n, args.rounds),
+                          "vector": bench_vector(n, args.rounds)}
+            for r in results[n].values():
+                r["tick_us_per_drone"] = r["tick_ms"] * 1000 / n
+    finally:
+        builtins.print = quiet_print
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
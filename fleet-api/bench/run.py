@@ -0,0 +1,266 @@
+"""
+Suite de benchs de référence : chiffres comparables d'un commit à l'autre.
+- micro   : move_towards, segment analytique, sign/verify (et Signer), sérialisation de la
+            télémétrie (JSON / binaire), construction de DroneRead ;
+- api     : débit et latences p50/p95/p99 de GET /drones, GET /drones/{id},
+            POST /drones/{id}/cmd (avec et sans attente d'ack), app ASGI en
+            mémoire, DISABLE_MQTT, base temporaire pré-remplie ;
+- scaling : FleetManager de 10 à 10k drones : gigue des ticks (écart à
+            publish_interval entre deux pas d'un même drone) et CPU du processus.
+Résultat JSON (méta : commit, Python, machine) ; --compare affiche les ratios
+avec un résultat précédent.
+
+    python bench/run.py [--only micro,api,scaling] [--quick] [--out bench.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="fleet-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/fleet.db")
+os.environ.setdefault("DISABLE_MQTT", "1")
+# simulateurs locaux sans broker : /cmd leur remet les commandes directement
+os.environ.setdefault("SIM_ENGINE", "scheduler")
+
+from commands import percentile  # noqa: E402
+
+
+def per_call_us(fn, n: int) -> float:
+    return min(timeit.repeat(fn, number=n, repeat=3)) / n * 1e6
+
+
+def latency_summary(ms) -> dict:
+    s = sorted(ms)
+    return {"p50_ms": percentile(s, 50), "p95_ms": percentile(s, 95),
+            "p99_ms": percentile(s, 99), "max_ms": s[-1] if s else None}
+
+
+# --- micro ---
+
+def bench_micro(n: int) -> dict:
+    from models import Drone, DroneRead
+    from security import Signer, sign, verify
+    from sim import DroneSimulator, DroneState, move_towards
+    from telemetry_codec import TelemetryEncoder
+    from trajectory import Trajectory
+
+    st = DroneState(lat=48.0, lon=2.0, alt=30.0)
+    rng = random.Random(1)
+    payload = {"cmd": "goto", "cid": "bench-1", "args": {"lat": 48.9, "lon": 2.4, "alt": 30.0}}
+    signer = Signer("bench-secret")
+    sig, raw = signer.seal(payload)
+    sim = DroneSimulator(
+        drone_id="bench-00001", topic_prefix="lab", shared_secret="bench-secret",
+        start_lat=48.0, start_lon=2.0, start_alt=30.0, publish_interval_sec=1.0,
+        cruise_speed_mps=8.0, battery_drain=0.005, heading_noise=0.0,
+    )
+    record = sim.telemetry()
+    enc = TelemetryEncoder()
+    enc.encode(record)
+    drone = Drone(id="bench-00001")
+    traj = Trajectory()
+    traj.plan(0.0, 48.0, 2.0, 100.0, [(48.9, 2.4, None), (48.5, 2.0, None)], 8.0, 0.005)
+    row = {f: getattr(drone, f) for f in DroneRead.model_fields}
+
+    def step():
+        st.lat, st.lon = 48.0, 2.0
+        move_towards(st, 48.9, 2.4, dt=1.0, speed_mps=8.0, drain_factor=0.005, noise_deg=5.0, rng=rng)
+
+    return {
+        "move_towards_us": per_call_us(step, n),
+        "trajectory_at_us": per_call_us(lambda: traj.at(5000.0), n),
+        "sign_us": per_call_us(lambda: sign(payload, "bench-secret"), n),
+        "verify_us": per_call_us(lambda: verify(payload, sig, "bench-secret"), n),
+        "signer_seal_us": per_call_us(lambda: signer.seal(payload), n),
+        "signer_unseal_us": per_call_us(lambda: signer.unseal(raw), n),
+        "telemetry_record_us": per_call_us(sim.telemetry, n),
+        "telemetry_json_us": per_call_us(lambda: json.dumps(record), n),
+        "telemetry_binary_us": per_call_us(lambda: enc.encode(record), n),
+        "droneread_from_row_us": per_call_us(lambda: DroneRead(**row), n),
+        "droneread_validate_orm_us": per_call_us(lambda: DroneRead.model_validate(drone, from_attributes=True), n),
+    }
+
+
+# --- api ---
+
+async def _timed_requests(ac, n: int, conc: int, request) -> dict:
+    sem = asyncio.Semaphore(conc)
+    ms = []
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            r = await request(ac, i)
+            ms.append((time.perf_counter() - t0) * 1000.0)
+            assert r.status_code == 200, r.text
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    dt = time.perf_counter() - t0
+    return {"req_per_sec": n / dt, **latency_summary(ms)}
+
+
+async def _bench_api(n_drones: int, n_requests: int, conc: int, running: int) -> dict:
+    from httpx import ASGITransport, AsyncClient
+    from main import app
+
+    ids = [f"bench-{i:05d}" for i in range(n_drones)]
+    out = {"drones": n_drones, "running": running, "concurrency": conc}
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as ac:
+            await ac.post("/drones/bulk", json=[{"id": i} for i in ids])
+            for i in ids[:running]:
+                await ac.post(f"/drones/{i}/start")
+
+            out["get_drones"] = await _timed_requests(
+                ac, max(20, n_requests // 50), conc, lambda c, i: c.get("/drones"))
+            out["get_drone"] = await _timed_requests(
+                ac, n_requests, conc, lambda c, i: c.get(f"/drones/{ids[i % n_drones]}"))
+            out["cmd"] = await _timed_requests(
+                ac, n_requests, conc,
+                lambda c, i: c.post(f"/drones/{ids[i % running]}/cmd", json={"cmd": "ping"}))
+            out["cmd_wait_ack"] = await _timed_requests(
+                ac, n_requests // 2, conc,
+                lambda c, i: c.post(f"/drones/{ids[i % running]}/cmd", params={"wait": "true"},
+                                    json={"cmd": "goto", "args": {"lat": 48.9, "lon": 2.4}}))
+    return out
+
+
+def bench_api(n_drones: int, n_requests: int, conc: int, running: int) -> dict:
+    return asyncio.run(_bench_api(n_drones, n_requests, conc, min(running, n_drones)))
+
+
+# --- scaling ---
+
+def bench_scaling(levels, seconds: float, engine: str) -> dict:
+    from manager import FleetManager
+    from models import Drone
+
+    os.environ["SIM_ENGINE"] = engine
+    curve = []
+    for n in levels:
+        fm = FleetManager()
+        fm.connect()
+        last, gaps = {}, []
+
+        def on_state(drone_id, st, last=last, gaps=gaps):
+            now = time.monotonic()
+            prev = last.get(drone_id)
+            if prev is not None:
+                gaps.append(abs(now - prev - 1.0) * 1000.0)
+            last[drone_id] = now
+
+        fm.state_listeners.append(on_state)
+        drones = [Drone(id=f"scale-{i:05d}", publish_interval_sec=1.0,
+                        start_lat=48.0 + i * 1e-5, start_lon=2.0) for i in range(n)]
+        t_start = time.perf_counter()
+        for d in drones:
+            fm.start(d)
+        start_sec = time.perf_counter() - t_start
+
+        time.sleep(1.5)  # régime établi ; fenêtre décalée d'une demi-période
+        gaps.clear()
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        time.sleep(seconds)
+        cpu = time.process_time() - cpu0
+        wall = time.perf_counter() - wall0
+        sample = list(gaps)
+        engine_stats = fm.engine.stats() if fm.engine is not None else {}
+        fm.shutdown()
+        curve.append({
+            "drones": n,
+            "start_sec": start_sec,
+            "ticks_per_sec": len(sample) / wall,
+            "expected_ticks_per_sec": float(n),
+            "cpu_pct": cpu / wall * 100.0,
+            "jitter": latency_summary(sample),
+            "resyncs": engine_stats.get("resyncs"),
+        })
+        print(f"[scaling] {engine} {n} drones: cpu {curve[-1]['cpu_pct']:.1f}% "
+              f"jitter p99 {curve[-1]['jitter']['p99_ms']} ms", file=sys.stderr)
+    return {"engine": engine, "seconds": seconds, "curve": curve}
+
+
+# --- résultats ---
+
+def meta() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        rev = None
+    return {"commit": rev or None, "python": platform.python_version(), "machine": platform.machine(),
+            "cpus": os.cpu_count(), "ts": time.time()}
+
+
+def flatten(d, prefix=""):
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            yield from flatten(v, key + ".")
+        elif isinstance(v, list):
+            for i, item in enumerate(v):
+                if isinstance(item, dict):
+                    yield from flatten(item, f"{key}[{item.get('drones', i)}].")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield key, v
+
+
+def compare(old: dict, new: dict):
+    before = dict(flatten({k: v for k, v in old.items() if k != "meta"}))
+    print(f"{'metric':60} {'before':>12} {'after':>12} {'ratio':>8}")
+    for key, v in flatten({k: v for k, v in new.items() if k != "meta"}):
+        if key in before and before[key]:
+            print(f"{key:60} {before[key]:12.3f} {v:12.3f} {v / before[key]:8.2f}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", default="micro,api,scaling")
+    ap.add_argument("--quick", action="store_true", help="tailles réduites (CI, fumée)")
+    ap.add_argument("--micro-n", type=int, default=20000)
+    ap.add_argument("--drones", type=int, default=1000)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--running", type=int, default=100, help="drones démarrés pour /cmd")
+    ap.add_argument("--levels", default="10,100,1000,10000")
+    ap.add_argument("--seconds", type=float, default=5.0, help="mesure par palier de scaling")
+    ap.add_argument("--engine", default=os.environ["SIM_ENGINE"], choices=["scheduler", "vector"])
+    ap.add_argument("--out")
+    ap.add_argument("--compare", help="résultat JSON précédent")
+    args = ap.parse_args(argv)
+    if args.quick:
+        args.micro_n, args.drones, args.requests = 2000, 200, 200
+        args.levels, args.seconds = "10,100,1000", 2.0
+
+    only = set(args.only.split(","))
+    res = {"meta": meta()}
+    if "micro" in only:
+        res["micro"] = bench_micro(args.micro_n)
+    if "api" in only:
+        res["api"] = bench_api(args.drones, args.requests, args.concurrency, args.running)
+    if "scaling" in only:
+        res["scaling"] = bench_scaling([int(x) for x in args.levels.split(",")], args.seconds, args.engine)
+
+    print(json.dumps(res, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), res)
+
+
+if __name__ == "__main__":
+    main()
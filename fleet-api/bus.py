@@ -0,0 +1,373 @@
+"""
+Bus de messages partagé par les drones cadencés par le SimEngine.
+Interface minimale : publish(topic, payload, qos), subscribe(topic, handler),
+unsubscribe(topic). Le handler reçoit le payload brut (bytes).
+
+- NullBus   : pas de broker (DISABLE_MQTT)
+- ClientBus : un seul client paho partagé
+- MqttPool  : quelques connexions partagées + routage des commandes par drone
+
+Les connexions ne bloquent jamais l'appelant (connect_async + thread
+réseau paho, cf. Link) : reconnexion exponentielle à gigue, et messages
+QoS >= 1 (commandes, events) gardés en file tant que le broker est
+injoignable.
+"""
+
+import collections
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import paho.mqtt.client as mqtt
+
+from metrics import MQTT_FAILED, MQTT_OK
+
+Handler = Callable[[bytes], None]
+
+
+class NullBus:
+    """Bus sans broker (DISABLE_MQTT) : les publications sont ignorées."""
+
+    def publish(self, topic: str, payload, qos: int = 0):
+        pass
+
+    def subscribe(self, topic: str, handler: Handler):
+        pass
+
+    def unsubscribe(self, topic: str):
+        pass
+
+
+class Backoff:
+    """
+    Délai de reconnexion exponentiel à gigue ("equal jitter") : moitié du
+    palier base * 2**n (plafonné à cap) plus un tirage uniforme sur l'autre
+    moitié. Des clients coupés ensemble (redémarrage du broker) ne
+    reviennent pas tous à la même seconde.
+    """
+
+    def __init__(self, base: float = 0.5, cap: float = 30.0, rng: Callable[[], float] = random.random):
+        self.base = base
+        self.cap = cap
+        self.rng = rng
+        self.attempt = 0
+
+    def next(self) -> float:
+        step = min(self.cap, self.base * (2 ** min(self.attempt, 32)))
+        self.attempt += 1
+        return step / 2 + self.rng() * step / 2
+
+    def reset(self):
+        self.attempt = 0
+
+
+class Link:
+    """
+    État de la connexion d'un client paho, pour son propriétaire (ClientBus,
+    PoolConnection) qui appelle up()/down() depuis ses callbacks :
+    - start() : connect_async + loop_start, rend la main immédiatement ;
+      connexion et reconnexions dans le thread réseau paho ;
+    - délai de reconnexion tiré par Backoff à chaque échec (paho ne sait
+      que doubler un délai fixe : reprogrammé par reconnect_delay_set) ;
+    - hold() : message QoS >= 1 publié lien coupé, gardé (file bornée) puis
+      envoyé dans l'ordre par up(), avant toute nouvelle publication.
+    """
+
+    def __init__(self, client, backoff: Optional[Backoff] = None, max_buffer: int = 10000):
+        self.client = client
+        self.backoff = backoff or Backoff()
+        self.max_buffer = max_buffer
+        self.connected = False
+        self.connects = 0
+        self.failures = 0
+        self.buffered = 0
+        self.dropped = 0
+        self.started_at: Optional[float] = None
+        self.first_connect_sec: Optional[float] = None
+        self._buffer = collections.deque()
+        self._lock = threading.Lock()
+        client.on_connect_fail = self._on_connect_fail
+
+    def start(self, host: str, port: int, keepalive: int = 30):
+        self.started_at = time.perf_counter()
+        self.client.connect_async(host, port, keepalive=keepalive)
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def hold(self, topic: str, payload, qos: int) -> bool:
+        """True si le message est pris en charge ici (lien coupé) : ne pas le publier."""
+        if self.connected or qos == 0:
+            return False
+        with self._lock:
+            if self.connected:
+                return False
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+            else:
+                self._buffer.append((topic, payload, qos))
+                self.buffered += 1
+            return True
+
+    def up(self, send: Callable[[str, object, int], None]):
+        """CONNACK reçu : vide la file par send() puis laisse passer les publications."""
+        with self._lock:
+            while self._buffer:
+                send(*self._buffer.popleft())
+            self.connected = True
+        self.connects += 1
+        if self.first_connect_sec is None and self.started_at is not None:
+            self.first_connect_sec = time.perf_counter() - self.started_at
+        self.backoff.reset()
+
+    def down(self):
+        """Connexion perdue ou refusée : prochaine tentative après un délai à gigue."""
+        self.connected = False
+        self.client.reconnect_delay_set(self.backoff.next(), self.backoff.cap)
+
+    def _on_connect_fail(self, client, userdata):
+        self.failures += 1
+        self.down()
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "failures": self.failures,
+            "queued": len(self._buffer),
+            "buffered": self.buffered,
+            "dropped": self.dropped,
+            "first_connect_sec": self.first_connect_sec,
+        }
+
+
+class ClientBus:
+    """
+    Bus adossé à UN client paho (celui du FleetManager, ou d'un DroneWorker).
+    Chaque topic de commandes est routé vers son handler via message_callback_add,
+    et les abonnements sont rejoués à la reconnexion. connect() ne bloque
+    pas : publications QoS >= 1 en file tant que le broker est injoignable.
+    """
+
+    def __init__(self, client, backoff: Optional[Backoff] = None, max_buffer: int = 10000):
+        self.client = client
+        self.link = Link(client, backoff, max_buffer)
+        self._handlers: Dict[str, Handler] = {}
+        self._lock = threading.Lock()
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+
+    def connect(self, host: str, port: int, keepalive: int = 30):
+        self.link.start(host, port, keepalive)
+
+    def close(self):
+        self.link.stop()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            self.link.down()
+            return
+        with self._lock:
+            topics = list(self._handlers)
+        for topic in topics:
+            client.subscribe(topic)
+        self.link.up(self._send)
+
+    def _on_disconnect(self, client, userdata, rc):
+        self.link.down()
+
+    def publish(self, topic: str, payload, qos: int = 0):
+        if not self.link.hold(topic, payload, qos):
+            self._send(topic, payload, qos)
+
+    def _send(self, topic: str, payload, qos: int):
+        info = self.client.publish(topic, payload, qos=qos)
+        (MQTT_OK if info.rc == mqtt.MQTT_ERR_SUCCESS else MQTT_FAILED).inc()
+
+    def subscribe(self, topic: str, handler: Handler):
+        with self._lock:
+            self._handlers[topic] = handler
+        self.client.message_callback_add(topic, lambda c, u, msg: handler(msg.payload))
+        self.client.subscribe(topic)
+
+    def unsubscribe(self, topic: str):
+        with self._lock:
+            self._handlers.pop(topic, None)
+        self.client.message_callback_remove(topic)
+        self.client.unsubscribe(topic)
+
+
+class PoolConnection:
+    """Un client paho du pool, avec sa limite de file et ses compteurs."""
+
+    def __init__(self, index: int, client, max_queue: int, backoff: Optional[Backoff] = None):
+        self.index = index
+        self.client = client
+        self.max_queue = max_queue
+        self.link = Link(client, backoff, max_buffer=max_queue)
+        self.published = 0
+        self.dropped = 0
+        self.failed = 0
+        self.pending = 0
+        self.max_pending = 0
+        self._lock = threading.Lock()
+        client.max_queued_messages_set(max_queue)
+        client.on_publish = self._on_publish
+
+    def _on_publish(self, client, userdata, mid):
+        with self._lock:
+            self.pending -= 1
+
+    @property
+    def connected(self) -> bool:
+        return self.link.connected
+
+    def publish(self, topic: str, payload, qos: int = 0):
+        if not self.link.hold(topic, payload, qos):
+            self._send(topic, payload, qos)
+
+    def _send(self, topic: str, payload, qos: int):
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.dropped += 1
+                return
+            self.pending += 1
+            if self.pending > self.max_pending:
+                self.max_pending = self.pending
+        info = self.client.publish(topic, payload, qos=qos)
+        with self._lock:
+            if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                self.published += 1
+            else:
+                # pas de on_publish pour un message refusé
+                self.pending -= 1
+                self.failed += 1
+
+    def stats(self) -> dict:
+        return {
+            "index": self.index,
+            "connected": self.connected,
+            "published": self.published,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "max_queue": self.max_queue,
+            "link": self.link.stats(),
+        }
+
+
+class MqttPool:
+    """
+    Pool de `size` connexions MQTT partagées par tous les drones simulés.
+    - Les publications d'un même drone passent toujours par la même connexion
+      (hash de `{prefix}/drone/{id}`), ce qui préserve leur ordre.
+    - Les commandes arrivent par UN abonnement wildcard par préfixe
+      (`{prefix}/drone/+/commands`) sur la connexion 0 et sont routées
+      vers le handler du drone d'après le topic.
+    """
+
+    def __init__(self, host: str, port: int, size: int = 4, max_queue: int = 10000,
+                 client_id_prefix: str = "fleet-pool", keepalive: int = 30,
+                 backoff: Callable[[], Backoff] = Backoff):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self._handlers: Dict[str, Handler] = {}
+        self._prefixes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.unrouted = 0
+
+        self.conns = []
+        for i in range(max(1, size)):
+            client = mqtt.Client(client_id=f"{client_id_prefix}-{os.getpid()}-{i}")
+            conn = PoolConnection(i, client, max_queue, backoff())
+            client.on_connect = self._make_on_connect(conn)
+            client.on_disconnect = self._make_on_disconnect(conn)
+            self.conns.append(conn)
+        self.cmd_conn = self.conns[0]
+        self.cmd_conn.client.on_message = self._on_message
+
+    # --- connexion ---
+
+    def connect(self):
+        """Rend la main tout de suite : connexions établies par les threads paho."""
+        for conn in self.conns:
+            conn.link.start(self.host, self.port, keepalive=self.keepalive)
+
+    def close(self):
+        for conn in self.conns:
+            conn.link.stop()
+
+    def _make_on_connect(self, conn: PoolConnection):
+        def on_connect(client, userdata, flags, rc):
+            print(f"[MqttPool] connection {conn.index} rc={rc}")
+            if rc != 0:
+                conn.link.down()
+                return
+            if conn is self.cmd_conn:
+                with self._lock:
+                    prefixes = list(self._prefixes)
+                for prefix in prefixes:
+                    client.subscribe(self._wildcard(prefix))
+            conn.link.up(conn._send)
+        return on_connect
+
+    def _make_on_disconnect(self, conn: PoolConnection):
+        def on_disconnect(client, userdata, rc):
+            conn.link.down()
+        return on_disconnect
+
+    # --- bus ---
+
+    @staticmethod
+    def _wildcard(prefix: str) -> str:
+        return f"{prefix}/drone/+/commands"
+
+    def connection_for(self, topic: str) -> PoolConnection:
+        base = topic.rsplit("/", 1)[0]
+        return self.conns[hash(base) % len(self.conns)]
+
+    def publish(self, topic: str, payload, qos: int = 0):
+        self.connection_for(topic).publish(topic, payload, qos)
+
+    def subscribe(self, topic: str, handler: Handler):
+        # topic = "{prefix}/drone/{id}/commands"
+        prefix = topic.split("/drone/", 1)[0]
+        with self._lock:
+            self._handlers[topic] = handler
+            first = prefix not in self._prefixes
+            self._prefixes[prefix] = self._prefixes.get(prefix, 0) + 1
+        if first:
+            self.cmd_conn.client.subscribe(self._wildcard(prefix))
+
+    def unsubscribe(self, topic: str):
+        prefix = topic.split("/drone/", 1)[0]
+        with self._lock:
+            if self._handlers.pop(topic, None) is None:
+                return
+            self._prefixes[prefix] -= 1
+            last = self._prefixes[prefix] == 0
+            if last:
+                del self._prefixes[prefix]
+        if last:
+            self.cmd_conn.client.unsubscribe(self._wildcard(prefix))
+
+    def _on_message(self, client, userdata, msg):
+        handler = self._handlers.get(msg.topic)
+        if handler is None:
+            self.unrouted += 1
+            return
+        handler(msg.payload)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.conns),
+            "routes": len(self._handlers),
+            "unrouted": self.unrouted,
+            "connections": [c.stats() for c in self.conns],
+        }
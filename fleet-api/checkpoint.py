@@ -0,0 +1,230 @@
+"""
+Points de reprise de la simulation (état de chaque drone local).
+- fichier binaire en ajout seul : une trame par point de reprise
+  (en-tête magic / nombre de drones / horodatage / taille / CRC32, puis un
+  enregistrement struct par drone : état + waypoints restants) ;
+- écrit par un thread de fond toutes les interval secondes, hors des pas de
+  simulation ; compacté (réécriture atomique de la seule dernière trame)
+  toutes les compact_every trames ;
+- lu au démarrage par mmap : seuls les en-têtes sont parcourus, puis la
+  dernière trame complète (CRC valide) est décodée ; une fin de fichier
+  tronquée (arrêt brutal pendant une écriture) est ignorée puis coupée à
+  la prochaine écriture.
+Le statut "running" persisté en base dit quels drones reprendre, le point
+de reprise dit où ils en étaient (cf. FleetManager.saved).
+"""
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from telemetry_codec import STATUS_CODES, STATUS_INDEX
+
+MAGIC = b"FCK1"
+# magic, nombre de drones, horodatage, taille du corps, CRC32 du corps
+HEADER = struct.Struct("<4sIdII")
+# longueur de l'id, statut, lat, lon, alt, vitesse, batterie, cap, nombre de waypoints
+RECORD = struct.Struct("<HBddddddH")
+WAYPOINT = struct.Struct("<ddd")  # lat, lon, alt (NaN = inchangée)
+
+Waypoint = Tuple[float, float, Optional[float]]
+
+
+class SavedDrone(NamedTuple):
+    status: str
+    lat: float
+    lon: float
+    alt: float
+    speed_mps: float
+    battery_pct: float
+    heading_deg: float
+    waypoints: List[Waypoint]
+
+
+def encode_frame(drones: Dict[str, SavedDrone], ts: float) -> bytes:
+    parts = []
+    for drone_id, d in drones.items():
+        raw_id = drone_id.encode()
+        parts.append(RECORD.pack(len(raw_id), STATUS_INDEX.get(d.status, 0), d.lat, d.lon, d.alt,
+                                 d.speed_mps, d.battery_pct, d.heading_deg, len(d.waypoints)))
+        parts.append(raw_id)
+        for lat, lon, alt in d.waypoints:
+            parts.append(WAYPOINT.pack(lat, lon, math.nan if alt is None else alt))
+    body = b"".join(parts)
+    return HEADER.pack(MAGIC, len(drones), ts, len(body), zlib.crc32(body)) + body
+
+
+def decode_body(buf, offset: int, count: int) -> Dict[str, SavedDrone]:
+    out = {}
+    unpack_rec, unpack_wp = RECORD.unpack_from, WAYPOINT.unpack_from
+    rsize, wsize = RECORD.size, WAYPOINT.size
+    for _ in range(count):
+        id_len, status, lat, lon, alt, speed, battery, heading, n_wp = unpack_rec(buf, offset)
+        offset += rsize
+        drone_id = bytes(buf[offset:offset + id_len]).decode()
+        offset += id_len
+        wps = []
+        for _ in range(n_wp):
+            wlat, wlon, walt = unpack_wp(buf, offset)
+            offset += wsize
+            wps.append((wlat, wlon, None if math.isnan(walt) else walt))
+        name = STATUS_CODES[status] if status < len(STATUS_CODES) else "idle"
+        out[drone_id] = SavedDrone(name, lat, lon, alt, speed, battery, heading, wps)
+    return out
+
+
+def scan(buf) -> Tuple[List[Tuple[int, int, float, int, int]], int]:
+    """
+    Trames complètes (offset, count, ts, body_len, crc) et fin de la dernière.
+    Ne lit que les en-têtes ; s'arrête à la première trame tronquée ou invalide.
+    """
+    frames, offset, size = [], 0, len(buf)
+    while offset + HEADER.size <= size:
+        magic, count, ts, body_len, crc = HEADER.unpack_from(buf, offset)
+        end = offset + HEADER.size + body_len
+        if magic != MAGIC or end > size:
+            break
+        frames.append((offset, count, ts, body_len, crc))
+        offset = end
+    return frames, offset
+
+
+def read_checkpoint(path: str) -> Tuple[Dict[str, SavedDrone], Optional[float]]:
+    """Dernier point de reprise valide du fichier : ({drone_id: SavedDrone}, ts) ou ({}, None)."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return {}, None
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return {}, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            frames, _ = scan(buf)
+            for offset, count, ts, body_len, crc in reversed(frames):
+                start = offset + HEADER.size
+                if zlib.crc32(buf[start:start + body_len]) == crc:
+                    return decode_body(buf, start, count), ts
+    return {}, None
+
+
+class Checkpointer:
+    def __init__(self, path: str, collect: Callable[[], Dict[str, SavedDrone]],
+                 compact_every: int = 16):
+        self.path = path
+        self.collect = collect  # appelé depuis le thread d'écriture
+        self.compact_every = max(1, compact_every)
+        self._appended = 0
+        self._checked = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.writes = 0
+        self.compactions = 0
+        self.errors = 0
+        self.last_drones = 0
+        self.last_bytes = 0
+        self.last_ms = 0.0
+        self.last_ts: Optional[float] = None
+        self.restored = 0
+        self.restore_ms = 0.0
+
+    def write(self) -> int:
+        """Un point de reprise ; renvoie la taille de la trame écrite."""
+        with self._lock:
+            t0 = time.perf_counter()
+            ts = time.time()
+            drones = self.collect()
+            frame = encode_frame(drones, ts)
+            if not self._checked:
+                self._truncate_torn_tail()
+                self._checked = True
+            if self._appended >= self.compact_every or not os.path.exists(self.path):
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(frame)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self._appended = 1
+                self.compactions += 1
+            else:
+                with open(self.path, "ab") as f:
+                    f.write(frame)
+                self._appended += 1
+            self.writes += 1
+            self.last_drones = len(drones)
+            self.last_bytes = len(frame)
+            self.last_ms = (time.perf_counter() - t0) * 1000.0
+            self.last_ts = ts
+            return len(frame)
+
+    def _truncate_torn_tail(self):
+        try:
+            with open(self.path, "r+b") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    frames, end = scan(buf)
+                if end < size:
+                    print(f"[checkpoint] dropping {size - end} bytes of torn tail in {self.path}")
+                    f.truncate(end)
+                self._appended = len(frames)
+        except FileNotFoundError:
+            pass
+
+    def restore(self) -> Dict[str, SavedDrone]:
+        t0 = time.perf_counter()
+        drones, ts = read_checkpoint(self.path)
+        self.restore_ms = (time.perf_counter() - t0) * 1000.0
+        self.restored = len(drones)
+        self.last_ts = ts
+        return drones
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "writes": self.writes,
+            "compactions": self.compactions,
+            "errors": self.errors,
+            "last_drones": self.last_drones,
+            "last_bytes": self.last_bytes,
+            "last_ms": self.last_ms,
+            "last_ts": self.last_ts,
+            "restored": self.restored,
+            "restore_ms": self.restore_ms,
+        }
+
+    # --- thread de fond ---
+
+    def start(self, interval: float = 5.0):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="checkpoint", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread puis écrit un dernier point de reprise."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+        self._safe_write()
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            self._safe_write()
+
+    def _safe_write(self):
+        try:
+            self.write()
+        except Exception as e:
+            self.errors += 1
+            print(f"[checkpoint] write failed: {e}")
@@ -0,0 +1,199 @@
+"""
+Suivi des commandes envoyées aux drones (accusés de réception).
+- chaque commande porte un identifiant de corrélation `cid` dans le payload
+  signé ; le simulateur ou l'agent répond sur .../events par
+  {"type": "ack", "cid", "cmd", "ok", "error", "ts"} ;
+- les commandes en vol sont indexées par échéance (tas) : expire() passe en
+  "timeout" celles restées sans ack, sans parcourir toute la table ;
+- latence bout en bout (publication -> ack) par type de commande, sur une
+  fenêtre glissante, exposée en p50/p95/p99.
+Les acks arrivent depuis plusieurs threads (paho, workers, moteur) : l'état
+est sous verrou. Le mode "attente d'ack" de l'API passe par un Future asyncio
+résolu via call_soon_threadsafe.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Rang le plus proche sur une liste déjà triée ; None si vide."""
+    if not sorted_values:
+        return None
+    k = max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+def _resolve(fut: asyncio.Future, result: dict):
+    if not fut.done():
+        fut.set_result(result)
+
+
+class _Pending:
+    __slots__ = ("cid", "drone_id", "cmd", "sent", "deadline", "future", "loop")
+
+    def __init__(self, cid: str, drone_id: str, cmd: str, sent: float, deadline: float):
+        self.cid = cid
+        self.drone_id = drone_id
+        self.cmd = cmd
+        self.sent = sent
+        self.deadline = deadline
+        self.future: Optional[asyncio.Future] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class CommandTracker:
+    def __init__(self, timeout: float = 5.0, window: int = 1024, keep: int = 10000):
+        self.timeout = timeout
+        self.window = window
+        self.keep = keep
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _Pending] = {}
+        # (échéance, cid) ; les entrées déjà acquittées sont ignorées au dépilage
+        self._deadlines: List[Tuple[float, str]] = []
+        # derniers résultats (acked / failed / timeout), bornés à `keep`
+        self._done: "OrderedDict[str, dict]" = OrderedDict()
+        self._latency: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+        self._seq = itertools.count(1)
+        self._prefix = f"{os.getpid():x}{int(time.time()):x}"
+        self.duplicates = 0
+        self.unknown = 0
+
+    def new_cid(self) -> str:
+        return f"{self._prefix}-{next(self._seq):x}"
+
+    # --- cycle de vie ---
+
+    def register(self, cid: str, drone_id: str, cmd: str,
+                 timeout: Optional[float] = None, wait: bool = False) -> Optional[asyncio.Future]:
+        """À appeler AVANT la publication (l'ack peut arriver tout de suite).
+        wait=True : renvoie un Future résolu avec le résultat (boucle courante)."""
+        now = time.monotonic()
+        p = _Pending(cid, drone_id, cmd, now, now + (timeout or self.timeout))
+        if wait:
+            p.loop = asyncio.get_running_loop()
+            p.future = p.loop.create_future()
+        with self._lock:
+            self._expire(now)
+            self._pending[cid] = p
+            heapq.heappush(self._deadlines, (p.deadline, cid))
+            self._count(cmd)["sent"] += 1
+        return p.future
+
+    def ack(self, event: dict) -> bool:
+        """Event {"type": "ack", "cid", "ok", "error"} reçu d'un drone."""
+        if not isinstance(event, dict) or event.get("type") != "ack":
+            return False
+        cid = event.get("cid")
+        if not isinstance(cid, str):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            p = self._pending.pop(cid, None)
+            if p is None:
+                # même ack reçu par deux chemins (local + broker), ou trop tard
+                if cid in self._done:
+                    self.duplicates += 1
+                else:
+                    self.unknown += 1
+                return False
+            ok = event.get("ok", True) is True
+            latency_ms = (now - p.sent) * 1000.0
+            self._count(p.cmd)["acked" if ok else "failed"] += 1
+            lat = self._latency.get(p.cmd)
+            if lat is None:
+                lat = self._latency[p.cmd] = deque(maxlen=self.window)
+            lat.append(latency_ms)
+            self._finish(p, "acked" if ok else "failed", latency_ms, event.get("error"))
+        return True
+
+    def fail(self, cid: str, error: str):
+        """La publication elle-même a échoué : pas d'ack à attendre."""
+        with self._lock:
+            p = self._pending.pop(cid, None)
+            if p is not None:
+                self._count(p.cmd)["failed"] += 1
+                self._finish(p, "failed", None, error)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        with self._lock:
+            return self._expire(time.monotonic() if now is None else now)
+
+    def _expire(self, now: float) -> int:
+        n = 0
+        heap = self._deadlines
+        while heap and heap[0][0] <= now:
+            _, cid = heapq.heappop(heap)
+            p = self._pending.pop(cid, None)
+            if p is None:
+                continue  # déjà acquittée
+            self._count(p.cmd)["timeouts"] += 1
+            self._finish(p, "timeout", None, "no ack before deadline")
+            n += 1
+        return n
+
+    def _finish(self, p: _Pending, status: str, latency_ms: Optional[float], error):
+        # sous self._lock
+        result = {
+            "cid": p.cid, "drone_id": p.drone_id, "cmd": p.cmd,
+            "status": status, "ok": status == "acked",
+            "latency_ms": latency_ms, "error": error,
+        }
+        self._done[p.cid] = result
+        while len(self._done) > self.keep:
+            self._done.popitem(last=False)
+        if p.future is not None:
+            p.loop.call_soon_threadsafe(_resolve, p.future, result)
+
+    def _count(self, cmd: str) -> Dict[str, int]:
+        c = self._counts.get(cmd)
+        if c is None:
+            c = self._counts[cmd] = {"sent": 0, "acked": 0, "failed": 0, "timeouts": 0}
+        return c
+
+    # --- lecture ---
+
+    async def wait(self, cid: str, fut: asyncio.Future, timeout: float) -> dict:
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            # l'échéance de la commande est passée : expire() la bascule en timeout
+            self.expire()
+            return self.get(cid)
+
+    def get(self, cid: str) -> Optional[dict]:
+        with self._lock:
+            p = self._pending.get(cid)
+            if p is not None:
+                return {"cid": cid, "drone_id": p.drone_id, "cmd": p.cmd, "status": "pending",
+                        "ok": None, "latency_ms": None, "error": None}
+            return self._done.get(cid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            per_cmd = {}
+            for cmd, counts in self._counts.items():
+                lat = sorted(self._latency.get(cmd, ()))
+                per_cmd[cmd] = {
+                    **counts,
+                    "p50_ms": percentile(lat, 50),
+                    "p95_ms": percentile(lat, 95),
+                    "p99_ms": percentile(lat, 99),
+                }
+            return {
+                "in_flight": len(self._pending),
+                "duplicates": self.duplicates,
+                "unknown": self.unknown,
+                "commands": per_cmd,
+            }
@@ -1,6 +1,7 @@
 #fleet-api/config.py
 # Centralise la lecture des variables d'env pour l'API.
 import os
+import socket
 
 def env_str(name: str, default: str) -> str:
     return os.getenv(name, default)
@@ -9,6 +10,10 @@ def env_int(name: str, default: int) -> int:
     v = os.getenv(name)
     return int(v) if v is not None else default
 
+def env_float(name: str, default: float) -> float:
+    v = os.getenv(name)
+    return float(v) if v is not None else default
+
 def get_config():
     env = env_str("APP_ENV", "dev")  # "dev" ou "prod"
 
@@ -34,9 +39,109 @@ def get_config():
             "host": env_str("MQTT_HOST", "localhost"),
             "port": env_int("MQTT_PORT", 1883),
             "topic_prefix": env_str("TOPIC_PREFIX", "lab"),
+            "disabled": env_str("DISABLE_MQTT", "").lower() in {"1", "true", "yes"},
+            # 0 = pas de pool ; N > 0 = N connexions partagées par tous les drones
+            "pool_size": env_int("MQTT_POOL_SIZE", 0),
+            "pool_max_queue": env_int("MQTT_POOL_MAX_QUEUE", 10000),
+            # connexion en arrière-plan : délai de reconnexion exponentiel à gigue,
+            # commandes/events gardés en file (bornée) tant que le broker est absent
+            "reconnect_min_ms": env_int("MQTT_RECONNECT_MIN_MS", 500),
+            "reconnect_max_ms": env_int("MQTT_RECONNECT_MAX_MS", 30000),
+            "buffer_max": env_int("MQTT_BUFFER_MAX", 10000),
+        },
+        "ingest": {
+            # abonnement de fleet-api à la télémétrie (cache du dernier état)
+            "enabled": env_int("TELEMETRY_INGEST", 1) == 1,
+            "topic_prefix": env_str("INGEST_TOPIC_PREFIX", "+"),
+        },
+        "history": {
+            # historique de télémétrie en base (cf. history.py)
+            "enabled": env_int("HISTORY_ENABLED", 1) == 1,
+            "ring_size": env_int("HISTORY_RING_SIZE", 600),
+            "flush_interval_ms": env_int("HISTORY_FLUSH_INTERVAL_MS", 1000),
+            "retention_hours": env_int("HISTORY_RETENTION_HOURS", 168),
+            "compact_after_min": env_int("HISTORY_COMPACT_AFTER_MIN", 60),
+            "compact_step_sec": env_int("HISTORY_COMPACT_STEP_SEC", 60),
+        },
+        "stream": {
+            # diffusion WebSocket / SSE (cf. stream.py)
+            "max_pending": env_int("STREAM_MAX_PENDING", 10000),
+            "min_interval_ms": env_int("STREAM_MIN_INTERVAL_MS", 100),
+        },
+        "spatial": {
+            # taille des cases de l'index spatial (degrés), cf. spatial.py
+            "cell_deg": env_float("SPATIAL_CELL_DEG", 0.01),
+        },
+        "conflicts": {
+            # détection de conflits à l'échelle de la flotte, cf. conflicts.py
+            "enabled": env_int("CONFLICTS_ENABLED", 1) == 1,
+            "separation_m": env_float("CONFLICT_SEPARATION_M", 50.0),
+            "vertical_m": env_float("CONFLICT_VERTICAL_M", 15.0),
+            "horizon_sec": env_float("CONFLICT_HORIZON_SEC", 30.0),
+            "interval_ms": env_int("CONFLICT_INTERVAL_MS", 1000),
+            "stale_sec": env_float("CONFLICT_STALE_SEC", 10.0),
+        },
+        "sim": {
+            # "thread" : un thread + un client MQTT par drone (historique)
+            # "scheduler" : un seul planificateur pour tous les drones (SimEngine)
+            # "vector" : planificateur unique + pas NumPy sur toute la flotte (VectorEngine)
+            "engine": env_str("SIM_ENGINE", "thread"),
+            # au démarrage, relance les drones dont le statut persisté est "running"
+            "resume": env_int("SIM_RESUME", 1) == 1,
+        },
+        "checkpoint": {
+            # points de reprise de l'état simulé (cf. checkpoint.py)
+            "enabled": env_int("CHECKPOINT_ENABLED", 1) == 1,
+            "path": env_str("CHECKPOINT_PATH", "data/fleet.ckpt"),
+            "interval_ms": env_int("CHECKPOINT_INTERVAL_MS", 5000),
+            "compact_every": env_int("CHECKPOINT_COMPACT_EVERY", 16),
+        },
+        "sharding": {
+            # répartition des drones simulés entre répliques (cf. sharding.py)
+            "enabled": env_int("SHARDING_ENABLED", 0) == 1,
+            "name": env_str("SHARD_NAME", socket.gethostname()),
+            # URL de base de cette réplique, vue des autres (relais HTTP)
+            "url": env_str("SHARD_URL", f"http://{socket.gethostname()}:8000"),
+            # "nom=url,nom=url" ; vide = découverte par le broker (messages retenus)
+            "members": env_str("SHARD_MEMBERS", ""),
+            "vnodes": env_int("SHARD_VNODES", 64),
+            # attente après un changement de membres avant de rééquilibrer
+            "settle_ms": env_int("SHARD_SETTLE_MS", 1000),
+            "forward_timeout_ms": env_int("SHARD_FORWARD_TIMEOUT_MS", 5000),
+        },
+        "telemetry": {
+            # 1 = trames groupées sur {prefix}/fleet/telemetry (cf. telemetry.py)
+            "batch": env_int("TELEMETRY_BATCH", 0) == 1,
+            "batch_max_drones": env_int("TELEMETRY_BATCH_MAX", 500),
+            "batch_latency_ms": env_int("TELEMETRY_BATCH_LATENCY_MS", 200),
+            # préfixes publiés en binaire compact (cf. telemetry_codec.py), ex: "lab,fleet2"
+            "binary_prefixes": [
+                p.strip()
+                for p in env_str("TELEMETRY_BINARY_PREFIXES", "").split(",")
+                if p.strip()
+            ],
+        },
+        "commands": {
+            # délai d'ack par défaut et fenêtre des percentiles de latence (cf. commands.py)
+            "timeout_ms": env_int("COMMAND_TIMEOUT_MS", 5000),
+            "latency_window": env_int("COMMAND_LATENCY_WINDOW", 1024),
         },
         "shared_secret": env_str("SHARED_SECRET", "dev-secret-change-me"),
         "database_url": env_str("DATABASE_URL", "sqlite:///data/fleet.db"),
+        "db": {
+            "pool_size": env_int("DB_POOL_SIZE", 10),
+            "max_overflow": env_int("DB_MAX_OVERFLOW", 20),
+            "pool_timeout_sec": env_int("DB_POOL_TIMEOUT_SEC", 30),
+            # pragmas SQLite (cf. models._sqlite_pragmas)
+            "busy_timeout_ms": env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+            "mmap_size": env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+            "cache_size_kb": env_int("SQLITE_CACHE_SIZE_KB", 64 * 1024),
+        },
+        "api": {
+            # tailles max d'un lot /drones/bulk et d'une page de GET /drones
+            "bulk_max": env_int("API_BULK_MAX", 10000),
+            "page_max": env_int("API_PAGE_MAX", 5000),
+        },
         "cors": {
             "allow_origins": cors_allow_origins,
             "allow_origin_regex": cors_allow_origin_regex,
@@ -0,0 +1,285 @@
+"""
+Détection de conflits de trajectoire à l'échelle de la flotte.
+- chaque drone garde son dernier état (position, altitude, vitesse, cap),
+  alimenté par les simulateurs locaux et la télémétrie ingérée ;
+- une passe (thread de fond, toutes les interval secondes, ou detect()
+  appelé directement) projette la flotte en mètres autour de sa latitude
+  moyenne et hache les positions sur une grille 3D : cases horizontales de
+  separation + 2 * vitesse max * horizon, verticales de vertical_m. Seules
+  les paires de cases voisines (demi-voisinage, 14 cases) sont comparées :
+  coût quasi linéaire au lieu de O(n²) ;
+- pour chaque paire candidate : point de rapprochement maximal (CPA) à
+  vitesse constante, borné à [0, horizon]. Conflit si la distance au CPA
+  passe sous separation_m avec un écart vertical sous vertical_m :
+  "proximity" si la séparation est déjà perdue, "predicted" sinon ;
+- début / fin d'un conflit : event {"type": "conflict", ...} publié sur
+  .../events des deux drones ; conflits actifs lisibles via l'API.
+Tout est vectorisé (NumPy) : génération des paires comprise.
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import CONFLICT_PASS
+from spatial import M_PER_DEG
+
+# demi-voisinage 3D : (0, 0, 0) traité à part, puis les 13 décalages > 0
+_HALF = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+         if (dx, dy, dz) > (0, 0, 0)]
+
+
+def _expand(points: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Paires (p, starts[p] + k) pour k < counts[p], sans boucle Python."""
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    first = np.cumsum(counts) - counts
+    i = np.repeat(points, counts)
+    j = np.repeat(starts - first, counts) + np.arange(total)
+    return i, j
+
+
+def candidate_pairs(x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                    cell_xy: float, cell_z: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Paires non ordonnées (chacune une seule fois) de points dans la même case ou des cases voisines."""
+    n = x.size
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    ix = np.floor(x / cell_xy).astype(np.int64)
+    iy = np.floor(y / cell_xy).astype(np.int64)
+    iz = np.floor(z / cell_z).astype(np.int64)
+    # marge d'une case de chaque côté : un décalage ne déborde jamais sur la ligne voisine
+    ix -= ix.min() - 1
+    iy -= iy.min() - 1
+    iz -= iz.min() - 1
+    ny, nz = int(iy.max()) + 2, int(iz.max()) + 2
+    key = (ix * ny + iy) * nz + iz
+
+    order = np.argsort(key, kind="stable")
+    skey = key[order]
+    cells, start, count = np.unique(skey, return_index=True, return_counts=True)
+    cell_of = np.repeat(np.arange(cells.size), count)
+    pos = np.arange(n)
+
+    # même case : j après i dans la case
+    end = start[cell_of] + count[cell_of]
+    parts_i, parts_j = [], []
+    i, j = _expand(pos, pos + 1, end - pos - 1)
+    parts_i.append(i)
+    parts_j.append(j)
+
+    for dx, dy, dz in _HALF:
+        nkey = cells + (dx * ny + dy) * nz + dz
+        k = np.searchsorted(cells, nkey)
+        k[k == cells.size] = 0
+        hit = cells[k] == nkey
+        if not hit.any():
+            continue
+        # points des cases qui ont cette voisine occupée
+        src = np.flatnonzero(hit[cell_of])
+        dst = k[cell_of[src]]
+        i, j = _expand(src, start[dst], count[dst])
+        parts_i.append(i)
+        parts_j.append(j)
+    i = np.concatenate(parts_i)
+    j = np.concatenate(parts_j)
+    return order[i], order[j]
+
+
+def find_conflicts(lat: np.ndarray, lon: np.ndarray, alt: np.ndarray,
+                   speed: np.ndarray, heading: np.ndarray,
+                   separation_m: float, vertical_m: float, horizon_sec: float) -> dict:
+    """
+    Conflits de la flotte ; renvoie des tableaux alignés : i, j (indices),
+    distance_m (actuelle), t_cpa (s), cpa_m, et le nombre de candidats.
+    """
+    lat0 = float(lat.mean()) if lat.size else 0.0
+    kx = M_PER_DEG * math.cos(math.radians(lat0))
+    x = (lon - lon.mean()) * kx if lon.size else lon
+    y = (lat - lat0) * M_PER_DEG
+    h = np.radians(heading)
+    vx, vy = speed * np.sin(h), speed * np.cos(h)
+    vmax = float(speed.max()) if speed.size else 0.0
+
+    i, j = candidate_pairs(x, y, alt, separation_m + 2.0 * vmax * horizon_sec, vertical_m)
+    candidates = i.size
+    keep = np.abs(alt[j] - alt[i]) < vertical_m
+    i, j = i[keep], j[keep]
+    px, py = x[j] - x[i], y[j] - y[i]
+    rvx, rvy = vx[j] - vx[i], vy[j] - vy[i]
+    vv = rvx * rvx + rvy * rvy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(vv > 0, -(px * rvx + py * rvy) / vv, 0.0)
+    t = np.clip(t, 0.0, horizon_sec)
+    cpa = np.hypot(px + rvx * t, py + rvy * t)
+    hit = cpa < separation_m
+    return {
+        "i": i[hit], "j": j[hit],
+        "distance_m": np.hypot(px[hit], py[hit]),
+        "t_cpa": t[hit], "cpa_m": cpa[hit],
+        "candidates": candidates,
+    }
+
+
+class ConflictDetector:
+    def __init__(self, separation_m: float = 50.0, vertical_m: float = 15.0,
+                 horizon_sec: float = 30.0, stale_sec: float = 10.0,
+                 publish: Optional[Callable[[str, dict], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.separation_m = separation_m
+        self.vertical_m = vertical_m
+        self.horizon_sec = horizon_sec
+        self.stale_sec = stale_sec
+        self.publish = publish  # (drone_id, event) -> None
+        self.clock = clock
+        # drone_id -> (lat, lon, alt, speed_mps, heading_deg, ts) ; écrit sans verrou
+        # par les threads des simulateurs (affectation atomique), copié par detect()
+        self._states: Dict[str, tuple] = {}
+        self.active: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()  # passes de détection
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.passes = 0
+        self.started = 0
+        self.ended = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.last_drones = 0
+        self.last_candidates = 0
+
+    # --- alimentation ---
+
+    def update(self, drone_id: str, lat: float, lon: float, alt: float,
+               speed_mps: float, heading_deg: float, ts: Optional[float] = None):
+        self._states[drone_id] = (lat, lon, alt, speed_mps, heading_deg,
+                                  self.clock() if ts is None else ts)
+
+    def update_state(self, drone_id: str, st):
+        """Listener de FleetManager.state_listeners (simulateurs locaux)."""
+        self._states[drone_id] = (st.lat, st.lon, st.alt, st.speed_mps, st.heading_deg, self.clock())
+
+    def update_record(self, rec: dict):
+        """Listener de TelemetryCache (drones distants)."""
+        pos = rec.get("position") or {}
+        if pos.get("lat") is None or pos.get("lon") is None:
+            return
+        self._states[rec["drone_id"]] = (pos["lat"], pos["lon"], pos.get("alt") or 0.0,
+                                         rec.get("speed_mps") or 0.0, rec.get("heading_deg") or 0.0,
+                                         rec.get("ts") or self.clock())
+
+    def remove(self, drone_id: str):
+        self._states.pop(drone_id, None)
+
+    # --- détection ---
+
+    def detect(self, now: Optional[float] = None) -> List[dict]:
+        """Une passe ; renvoie les events émis (débuts et fins de conflits)."""
+        with self._lock:
+            return self._detect(self.clock() if now is None else now)
+
+    def _detect(self, now: float) -> List[dict]:
+        t0 = time.perf_counter()
+        states = self._states.copy()
+        cutoff = now - self.stale_sec
+        ids = [k for k, v in states.items() if v[5] >= cutoff]
+        for k in states.keys() - set(ids):
+            self._states.pop(k, None)  # plus de nouvelles : oublié
+        arr = np.array([states[k] for k in ids], dtype=np.float64).reshape(-1, 6)
+        res = find_conflicts(arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3], arr[:, 4],
+                             self.separation_m, self.vertical_m, self.horizon_sec)
+
+        current: Dict[Tuple[str, str], dict] = {}
+        for i, j, dist, t, cpa in zip(res["i"].tolist(), res["j"].tolist(), res["distance_m"].tolist(),
+                                      res["t_cpa"].tolist(), res["cpa_m"].tolist()):
+            a, b = (ids[i], ids[j]) if ids[i] < ids[j] else (ids[j], ids[i])
+            prev = self.active.get((a, b))
+            current[(a, b)] = {
+                "drones": [a, b],
+                "kind": "proximity" if dist < self.separation_m else "predicted",
+                "distance_m": dist, "t_cpa_sec": t, "cpa_m": cpa,
+                "since": prev["since"] if prev else now, "updated": now,
+            }
+
+        events = []
+        for pair, c in current.items():
+            if pair not in self.active:
+                events += self._events("start", c, now)
+        for pair, c in self.active.items():
+            if pair not in current:
+                events += self._events("end", c, now)
+        self.started += sum(1 for p in current if p not in self.active)
+        self.ended += sum(1 for p in self.active if p not in current)
+        self.active = current
+
+        dt = time.perf_counter() - t0
+        CONFLICT_PASS.observe(dt)
+        self.passes += 1
+        self.last_ms = dt * 1000.0
+        self.max_ms = max(self.max_ms, self.last_ms)
+        self.last_drones = len(ids)
+        self.last_candidates = res["candidates"]
+        return events
+
+    def _events(self, state: str, c: dict, now: float) -> List[dict]:
+        a, b = c["drones"]
+        out = []
+        for me, other in ((a, b), (b, a)):
+            ev = {"type": "conflict", "state": state, "drone_id": me, "with": other, "kind": c["kind"],
+                  "distance_m": c["distance_m"], "t_cpa_sec": c["t_cpa_sec"], "cpa_m": c["cpa_m"],
+                  "ts": now}
+            out.append(ev)
+            if self.publish is not None:
+                try:
+                    self.publish(me, ev)
+                except Exception as e:
+                    print(f"[conflicts] publish failed for {me}: {e}")
+        return out
+
+    # --- lecture ---
+
+    def conflicts(self, drone_id: Optional[str] = None) -> List[dict]:
+        items = list(self.active.values())
+        if drone_id is not None:
+            items = [c for c in items if drone_id in c["drones"]]
+        return sorted(items, key=lambda c: c["cpa_m"])
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._states),
+            "active": len(self.active),
+            "passes": self.passes,
+            "started": self.started,
+            "ended": self.ended,
+            "last_drones": self.last_drones,
+            "last_candidates": self.last_candidates,
+            "last_ms": self.last_ms,
+            "max_ms": self.max_ms,
+        }
+
+    # --- thread de fond ---
+
+    def start(self, interval: float = 1.0):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="conflicts", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.detect()
+            except Exception as e:
+                print(f"[conflicts] pass failed: {e}")
@@ -0,0 +1,435 @@
+"""
+Moteur de simulation à planificateur unique.
+Un seul thread fait avancer tous les drones enregistrés, chacun à son propre
+publish_interval, à partir d'un tas d'échéances monotones (time.monotonic).
+Les échéances sont calculées à partir de la précédente (pas de dérive) ;
+si le moteur prend plus d'une période de retard, il se recale sur "maintenant"
+au lieu d'enchaîner les ticks en rafale.
+
+VectorEngine (SIM_ENGINE=vector) applique la même politique d'échéances,
+mais fait avancer les drones dus en une passe NumPy sur un FleetState
+(cf. fleet_state.py) au lieu d'un DroneSimulator.step par drone.
+"""
+
+from collections import deque
+import heapq
+import itertools
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fleet_state import ERROR, FleetState, StateView
+from telemetry_codec import STATUS_CODES, STATUS_INDEX
+from sim import DroneSimulator, DroneState
+from checkpoint import SavedDrone
+import metrics
+
+
+class SimEngine:
+    def __init__(self, name: str = "sim-engine"):
+        self.name = name
+        self._heap: List[Tuple[float, int, int, "ScheduledDrone"]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Statistiques de cadencement
+        self.ticks = 0
+        self.errors = 0
+        self.resyncs = 0
+        self.lateness_sum = 0.0
+        self.lateness_max = 0.0
+
+    # --- planification ---
+
+    def add(self, drone: "ScheduledDrone"):
+        with self._lock:
+            drone._gen += 1
+            deadline = time.monotonic() + drone.publish_interval
+            heapq.heappush(self._heap, (deadline, next(self._seq), drone._gen, drone))
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def remove(self, drone: "ScheduledDrone"):
+        # Suppression paresseuse : l'entrée du tas est ignorée à son échéance.
+        with self._lock:
+            drone._gen += 1
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # --- boucle ---
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        tick_h, late_h = metrics.TICK["scheduler"], metrics.LATE["scheduler"]
+        while self._running:
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                next_deadline = self._heap[0][0] if self._heap else None
+
+            for deadline, _, gen, drone in due:
+                if gen != drone._gen:
+                    continue
+                start = time.monotonic()
+                lateness = start - deadline
+                late_h.observe(lateness)
+                try:
+                    drone.tick()
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[SimEngine] tick failed for {drone.drone_id}: {e}")
+                tick_h.observe(time.monotonic() - start)
+                self.ticks += 1
+                self.lateness_sum += lateness
+                if lateness > self.lateness_max:
+                    self.lateness_max = lateness
+
+                nxt = deadline + drone.publish_interval
+                now = time.monotonic()
+                if nxt < now:
+                    nxt = now + drone.publish_interval
+                    self.resyncs += 1
+                with self._lock:
+                    if gen == drone._gen:
+                        heapq.heappush(self._heap, (nxt, next(self._seq), gen, drone))
+                        if next_deadline is None or nxt < next_deadline:
+                            next_deadline = nxt
+
+            if not due:
+                timeout = None if next_deadline is None else max(0.0, next_deadline - time.monotonic())
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+
+    def shutdown(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._heap),
+            "ticks": self.ticks,
+            "errors": self.errors,
+            "resyncs": self.resyncs,
+            "lateness_avg_ms": (self.lateness_sum / self.ticks * 1000.0) if self.ticks else 0.0,
+            "lateness_max_ms": self.lateness_max * 1000.0,
+        }
+
+
+class ScheduledDrone(DroneSimulator):
+    """
+    Drone simulé cadencé par un SimEngine et publiant via un bus partagé
+    (voir bus.py). Même API publique que DroneWorker : start/stop/is_running.
+    """
+    def __init__(self, engine: SimEngine, bus, **params):
+        super().__init__(bus=bus, **params)
+        self.engine = engine
+        self._gen = 0
+        self._active = False
+
+    # --- public API ---
+
+    def start(self):
+        if self._active:
+            return
+        self._active = True
+        self.bus.subscribe(self.t_commands, self.handle_message)
+        self._publish(self.t_events, json.dumps({
+            "type": "status", "message": "connected", "ts": time.time()
+        }), 1)
+        self.engine.add(self)
+
+    def stop(self, wait: bool = True):
+        if not self._active:
+            return
+        self._active = False
+        self.engine.remove(self)
+        self.bus.unsubscribe(self.t_commands)
+        print(f"[{self.drone_id}] stopped")
+
+    def is_running(self) -> bool:
+        return self._active
+
+
+class VectorEngine:
+    """
+    Planificateur vectorisé : échéance, intervalle et état de chaque drone
+    vivent dans un FleetState. À chaque réveil, les drones dus sont avancés
+    par groupes d'intervalle identique (un appel NumPy par groupe), puis
+    leurs télémétries sont construites et publiées hors verrou.
+    """
+    def __init__(self, name: str = "vector-engine", seed: Optional[int] = None,
+                 threaded: bool = True):
+        self.name = name
+        # threaded=False : pas de thread, l'appelant cadence run_due(now) (tests, bench)
+        self.threaded = threaded
+        self.fleet = FleetState()
+        self.rng = np.random.default_rng(seed)
+        # RLock : apply_command (thread MQTT) et la boucle modifient l'état
+        self.lock = threading.RLock()
+        self._drones: Dict[str, "VectorDrone"] = {}
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.ticks = 0
+        self.errors = 0
+        self.resyncs = 0
+        self.lateness_sum = 0.0
+        self.lateness_max = 0.0
+        self.last_step_ms = 0.0
+
+    # --- planification ---
+
+    def add(self, drone: "VectorDrone"):
+        st, wp = drone.state, drone._wp
+        with self.lock:
+            f = self.fleet
+            i = f.add(drone.drone_id, st.lat, st.lon, st.alt,
+                      cruise_speed_mps=drone.cruise_speed,
+                      battery_drain=drone.battery_drain,
+                      heading_noise=drone.heading_noise,
+                      interval=drone.publish_interval)
+            f.speed[i], f.battery[i], f.heading[i] = st.speed_mps, st.battery_pct, st.heading_deg
+            f.status[i] = STATUS_INDEX.get(st.status, ERROR)
+            if wp is not None:
+                f.wp_lat[i], f.wp_lon[i] = wp
+                f.has_wp[i] = True
+            f.next_due[i] = time.monotonic() + drone.publish_interval
+            self._drones[drone.drone_id] = drone
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def remove(self, drone: "VectorDrone") -> Tuple[DroneState, Optional[tuple]]:
+        """Retire le drone et renvoie une copie de son état (et waypoint)."""
+        with self.lock:
+            state = self.fleet.get(drone.drone_id)
+            wp = self.fleet.waypoint(drone.drone_id)
+            self.fleet.remove(drone.drone_id)
+            del self._drones[drone.drone_id]
+        return state, wp
+
+    def __len__(self) -> int:
+        return self.fleet.n
+
+    # --- boucle ---
+
+    def _ensure_thread(self):
+        if not self.threaded or (self._thread and self._thread.is_alive()):
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """Avance et publie les drones dont l'échéance est passée ; renvoie leur nombre."""
+        now = time.monotonic() if now is None else now
+        f = self.fleet
+        with self.lock:
+            n = f.n
+            due = np.flatnonzero(f.next_due[:n] <= now)
+            if due.size == 0:
+                return 0
+            t0 = time.perf_counter()
+            interval = f.interval[due]
+            groups = np.unique(interval)
+            for dt in groups:
+                grp = due if groups.size == 1 else due[interval == dt]
+                f.step(float(dt), rng=self.rng, idx=grp)
+            self.last_step_ms = (time.perf_counter() - t0) * 1000.0
+
+            lateness = now - f.next_due[due]
+            nxt = f.next_due[due] + interval
+            behind = nxt < now
+            if behind.any():
+                nxt[behind] = now + interval[behind]
+                self.resyncs += int(behind.sum())
+            f.next_due[due] = nxt
+
+            # extraction en bloc (tolist) plutôt qu'un accès numpy par champ
+            ids = [f.ids[i] for i in due.tolist()]
+            cols = zip(f.lat[due].tolist(), f.lon[due].tolist(), f.alt[due].tolist(),
+                       f.speed[due].tolist(), f.battery[due].tolist(),
+                       f.status[due].tolist(), f.heading[due].tolist())
+            rows = list(zip(ids, cols))
+            drones = self._drones
+
+        self.ticks += len(rows)
+        late_max = float(lateness.max())
+        self.lateness_sum += float(lateness.sum())
+        self.lateness_max = max(self.lateness_max, late_max)
+        metrics.LATE["vector"].observe(late_max)
+
+        ts = time.time()
+        for drone_id, (lat, lon, alt, speed, battery, status, heading) in rows:
+            drone = drones.get(drone_id)
+            if drone is None:
+                continue  # retiré entre-temps
+            st = DroneState(lat=lat, lon=lon, alt=alt, speed_mps=speed,
+                            battery_pct=battery, status=STATUS_CODES[status],
+                            heading_deg=heading)
+            try:
+                drone.publish_state(st, drone.record(st, ts))
+            except Exception as e:
+                self.errors += 1
+                print(f"[VectorEngine] publish failed for {drone_id}: {e}")
+            if drone._legs and st.status == "idle":
+                with self.lock:
+                    if drone._active:
+                        drone.next_leg()
+        metrics.TICK["vector"].observe(time.perf_counter() - t0)
+        return len(rows)
+
+    def _run(self):
+        while self._running:
+            try:
+                self.run_due()
+            except Exception as e:
+                self.errors += 1
+                print(f"[VectorEngine] step failed: {e}")
+            with self.lock:
+                n = self.fleet.n
+                next_deadline = float(self.fleet.next_due[:n].min()) if n else None
+            timeout = None if next_deadline is None else max(0.0, next_deadline - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def shutdown(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": self.fleet.n,
+            "ticks": self.ticks,
+            "errors": self.errors,
+            "resyncs": self.resyncs,
+            "lateness_avg_ms": (self.lateness_sum / self.ticks * 1000.0) if self.ticks else 0.0,
+            "lateness_max_ms": self.lateness_max * 1000.0,
+            "last_step_ms": self.last_step_ms,
+        }
+
+
+class VectorDrone(DroneSimulator):
+    """
+    Drone dont l'état vit dans le FleetState d'un VectorEngine tant qu'il
+    tourne. Les commandes passent par DroneSimulator.apply_command, sur une
+    StateView. Même API publique que DroneWorker : start/stop/is_running.
+    """
+    def __init__(self, engine: VectorEngine, bus, **params):
+        self._wp = None
+        self._legs: deque = deque()  # suite de la mission (un seul waypoint par drone dans FleetState)
+        self._active = False
+        self.engine = engine
+        super().__init__(bus=bus, **params)
+
+    # waypoint : attribut local à l'arrêt, tableaux du FleetState en marche
+    @property
+    def _waypoint(self):
+        if not self._active:
+            return self._wp
+        return self.engine.fleet.waypoint(self.drone_id)
+
+    @_waypoint.setter
+    def _waypoint(self, wp):
+        if not self._active:
+            self._wp = wp
+        elif wp is None:
+            self.engine.fleet.clear_waypoint(self.drone_id)
+        else:
+            self.engine.fleet.set_waypoint(self.drone_id, wp[0], wp[1])
+
+    def apply_command(self, cmd: str, args: dict):
+        with self.engine.lock:
+            super().apply_command(cmd, args)
+
+    def _fly(self, waypoints, append: bool = False):
+        if append and self._waypoint is not None:
+            self._legs.extend(waypoints)
+            return
+        self._legs = deque(waypoints[1:])
+        self._set_leg(waypoints[0])
+
+    def _set_leg(self, wp):
+        lat, lon, alt = wp
+        if alt is not None:
+            self.state.alt = alt
+        self._waypoint = (lat, lon)
+
+    def _hold(self):
+        self._legs.clear()
+        self._waypoint = None
+        self.state.speed_mps = 0.0
+
+    def next_leg(self):
+        """Arrivé avec une mission en cours : segment suivant (appelé par le moteur, sous verrou)."""
+        self.state.status = "flying"
+        self._set_leg(self._legs.popleft())
+
+    def step(self):
+        pass  # avancé en bloc par VectorEngine
+
+    def saved(self):
+        with self.engine.lock:
+            st = self.engine.fleet.get(self.drone_id) if self._active else self.state
+            wp = self._waypoint
+            legs = list(self._legs)
+        if wp is not None:
+            legs.insert(0, (wp[0], wp[1], None))
+        return SavedDrone(st.status, st.lat, st.lon, st.alt, st.speed_mps, st.battery_pct,
+                          st.heading_deg, legs)
+
+    def record(self, st: DroneState, ts: float) -> dict:
+        return {
+            "drone_id": self.drone_id,
+            "ts": ts,
+            "position": {"lat": st.lat, "lon": st.lon, "alt": st.alt},
+            "speed_mps": st.speed_mps,
+            "battery_pct": st.battery_pct,
+            "status": st.status,
+            "heading_deg": st.heading_deg,
+        }
+
+    # --- public API ---
+
+    def start(self):
+        if self._active:
+            return
+        self.bus.subscribe(self.t_commands, self.handle_message)
+        self._publish(self.t_events, json.dumps({
+            "type": "status", "message": "connected", "ts": time.time()
+        }), 1)
+        with self.engine.lock:  # aucune commande entre l'ajout et la bascule d'état
+            self.engine.add(self)
+            self.state = StateView(self.engine.fleet, self.drone_id)
+            self._active = True
+
+    def stop(self, wait: bool = True):
+        if not self._active:
+            return
+        with self.engine.lock:
+            self._active = False
+            self.state, self._wp = self.engine.remove(self)
+        self.bus.unsubscribe(self.t_commands)
+        print(f"[{self.drone_id}] stopped")
+
+    def is_running(self) -> bool:
+        return self._active
@@ -0,0 +1,221 @@
+"""
+État de flotte vectorisé (struct-of-arrays, NumPy).
+Chaque grandeur (lat, lon, alt, vitesse, batterie, cap, waypoint...) est un
+tableau contigu indexé par drone ; move_towards_batch avance tous les drones
+en vol en une seule passe, avec exactement la même sémantique que
+sim.move_towards (accroche à l'arrivée, plancher batterie, bruit de cap tiré
+dans le même ordre depuis un générateur seedé).
+Utilisé par le moteur vectorisé (SIM_ENGINE=vector, cf. engine.VectorEngine).
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from sim import DroneState
+from telemetry_codec import STATUS_CODES, STATUS_INDEX
+
+IDLE, FLYING, LANDING, ERROR = range(len(STATUS_CODES))
+
+ARRIVAL_EPS = 1e-5  # même seuil que DroneSimulator.step
+
+
+def move_towards_batch(lat: np.ndarray, lon: np.ndarray,
+                       speed: np.ndarray, battery: np.ndarray, heading: np.ndarray,
+                       target_lat: np.ndarray, target_lon: np.ndarray,
+                       dt: float, speed_mps: np.ndarray,
+                       drain_factor: np.ndarray, noise_deg: np.ndarray,
+                       idx: np.ndarray, rng: Optional[np.random.Generator] = None):
+    """
+    Version vectorisée de sim.move_towards, appliquée sur place aux drones
+    d'indices `idx` (ordre croissant). Les tableaux cibles/paramètres sont
+    indexés comme l'état.
+    """
+    if idx.size == 0:
+        return
+    dlat = target_lat[idx] - lat[idx]
+    dlon = target_lon[idx] - lon[idx]
+    dist = np.hypot(dlat, dlon)
+
+    still = dist < 1e-9
+    if still.any():
+        speed[idx[still]] = 0.0
+        keep = ~still
+        idx, dlat, dlon, dist = idx[keep], dlat[keep], dlon[keep], dist[keep]
+        if idx.size == 0:
+            return
+
+    sp = speed_mps[idx]
+    step = (sp * dt) / 111_000.0
+    arrive = step >= dist
+    go = ~arrive
+
+    ia = idx[arrive]
+    lat[ia] = target_lat[ia]
+    lon[ia] = target_lon[ia]
+    speed[ia] = 0.0
+
+    ig = idx[go]
+    lat[ig] += (dlat[go] / dist[go]) * step[go]
+    lon[ig] += (dlon[go] / dist[go]) * step[go]
+    speed[ig] = sp[go]
+
+    hdg = (np.degrees(np.arctan2(dlon, dlat)) + 360) % 360
+    nz = noise_deg[idx]
+    noisy = nz != 0
+    if noisy.any():
+        if rng is None:
+            rng = np.random.default_rng()
+        hdg[noisy] = (hdg[noisy] + rng.uniform(-nz[noisy], nz[noisy])) % 360
+    heading[idx] = hdg
+
+    battery[idx] = np.maximum(0.0, battery[idx] - drain_factor[idx] * sp * dt)
+
+
+_FLOAT_FIELDS = ("lat", "lon", "alt", "speed", "heading", "wp_lat", "wp_lon",
+                 "cruise_speed", "drain", "noise", "battery", "interval", "next_due")
+_FIELDS = _FLOAT_FIELDS + ("has_wp", "status")
+
+
+class FleetState:
+    """Flotte de drones simulés stockée en tableaux contigus."""
+
+    def __init__(self, capacity: int = 1024):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.n = 0
+        self._alloc(max(1, capacity))
+
+    def _alloc(self, capacity: int):
+        def grow(name, dtype, fill=0):
+            arr = np.full(capacity, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                arr[:self.n] = old[:self.n]
+            setattr(self, name, arr)
+
+        for name in _FLOAT_FIELDS:
+            grow(name, np.float64)
+        grow("has_wp", np.bool_, False)
+        grow("status", np.int8, IDLE)
+        self.capacity = capacity
+
+    def add(self, drone_id: str, lat: float, lon: float, alt: float = 0.0,
+            cruise_speed_mps: float = 8.0, battery_drain: float = 0.005,
+            heading_noise: float = 0.0, interval: float = 1.0) -> int:
+        if drone_id in self.index:
+            raise ValueError(f"drone {drone_id} already in fleet state")
+        if self.n == self.capacity:
+            self._alloc(self.capacity * 2)
+        i = self.n
+        self.lat[i], self.lon[i], self.alt[i] = lat, lon, alt
+        self.speed[i] = 0.0
+        self.heading[i] = 0.0
+        self.battery[i] = 100.0
+        self.status[i] = IDLE
+        self.has_wp[i] = False
+        self.cruise_speed[i] = cruise_speed_mps
+        self.drain[i] = battery_drain
+        self.noise[i] = heading_noise
+        self.interval[i] = interval
+        self.next_due[i] = 0.0
+        self.ids.append(drone_id)
+        self.index[drone_id] = i
+        self.n += 1
+        return i
+
+    def remove(self, drone_id: str):
+        """Retrait en O(1) : le dernier drone prend la place libérée."""
+        i = self.index.pop(drone_id)
+        last = self.n - 1
+        if i != last:
+            for name in _FIELDS:
+                arr = getattr(self, name)
+                arr[i] = arr[last]
+            moved = self.ids[last]
+            self.ids[i] = moved
+            self.index[moved] = i
+        self.ids.pop()
+        self.n -= 1
+
+    def __len__(self) -> int:
+        return self.n
+
+    def waypoint(self, drone_id: str) -> Optional[tuple]:
+        i = self.index[drone_id]
+        return (float(self.wp_lat[i]), float(self.wp_lon[i])) if self.has_wp[i] else None
+
+    def clear_waypoint(self, drone_id: str):
+        self.has_wp[self.index[drone_id]] = False
+
+    def set_waypoint(self, drone_id: str, lat: float, lon: float, alt: Optional[float] = None):
+        i = self.index[drone_id]
+        self.wp_lat[i], self.wp_lon[i] = lat, lon
+        self.has_wp[i] = True
+        self.status[i] = FLYING
+        if alt is not None:
+            self.alt[i] = alt
+
+    def get(self, drone_id: str) -> DroneState:
+        """Copie de l'état d'un drone sous forme de DroneState."""
+        i = self.index[drone_id]
+        return DroneState(
+            lat=float(self.lat[i]), lon=float(self.lon[i]), alt=float(self.alt[i]),
+            speed_mps=float(self.speed[i]), battery_pct=float(self.battery[i]),
+            status=STATUS_CODES[self.status[i]], heading_deg=float(self.heading[i]),
+        )
+
+    def step(self, dt: float, rng: Optional[np.random.Generator] = None,
+             idx: Optional[np.ndarray] = None):
+        """Équivalent vectorisé de DroneSimulator.step pour toute la flotte
+        (ou pour les seuls indices `idx`, en ordre croissant)."""
+        if idx is None:
+            n = self.n
+            idx = np.flatnonzero((self.status[:n] == FLYING) & self.has_wp[:n])
+        else:
+            idx = idx[(self.status[idx] == FLYING) & self.has_wp[idx]]
+        move_towards_batch(
+            self.lat, self.lon, self.speed, self.battery, self.heading,
+            self.wp_lat, self.wp_lon, dt,
+            self.cruise_speed, self.drain, self.noise, idx, rng=rng,
+        )
+        if idx.size:
+            arrived = idx[
+                (np.abs(self.lat[idx] - self.wp_lat[idx]) < ARRIVAL_EPS)
+                & (np.abs(self.lon[idx] - self.wp_lon[idx]) < ARRIVAL_EPS)
+            ]
+            self.has_wp[arrived] = False
+            self.status[arrived] = IDLE
+
+
+class StateView:
+    """
+    Vue DroneState (mêmes attributs) sur un drone de FleetState : permet de
+    réutiliser DroneSimulator.apply_command sur l'état vectorisé.
+    """
+    __slots__ = ("_fleet", "_id")
+
+    def __init__(self, fleet: FleetState, drone_id: str):
+        self._fleet = fleet
+        self._id = drone_id
+
+    def _get(self, name):
+        return float(getattr(self._fleet, name)[self._fleet.index[self._id]])
+
+    def _set(self, name, value):
+        getattr(self._fleet, name)[self._fleet.index[self._id]] = value
+
+    lat = property(lambda self: self._get("lat"), lambda self, v: self._set("lat", v))
+    lon = property(lambda self: self._get("lon"), lambda self, v: self._set("lon", v))
+    alt = property(lambda self: self._get("alt"), lambda self, v: self._set("alt", v))
+    speed_mps = property(lambda self: self._get("speed"), lambda self, v: self._set("speed", v))
+    battery_pct = property(lambda self: self._get("battery"), lambda self, v: self._set("battery", v))
+    heading_deg = property(lambda self: self._get("heading"), lambda self, v: self._set("heading", v))
+
+    @property
+    def status(self) -> str:
+        return STATUS_CODES[self._fleet.status[self._fleet.index[self._id]]]
+
+    @status.setter
+    def status(self, value: str):
+        self._set("status", STATUS_INDEX.get(value, ERROR))
@@ -0,0 +1,250 @@
+"""
+Simulation headless : horloge virtuelle, sans MQTT ni threads.
+- mêmes simulateurs que l'API (sim.DroneSimulator, trajectory.py), avancés
+  pas à pas par un échéancier (tas) sur une VirtualClock : aussi vite que le
+  CPU le permet (warp=0) ou à un facteur d'accélération donné (warp=60 :
+  une minute simulée par seconde réelle) ;
+- timeline de commandes scriptée (t en secondes depuis le début, drone ou
+  "*" pour toute la flotte) ;
+- télémétrie vers un fichier JSON lines (FileSink) ou n'importe quel
+  callable(record) du processus ;
+- run() renvoie un bilan : état final, distance parcourue, batterie mini
+  par drone, erreurs de commandes : de quoi tester une mission en secondes.
+
+    python headless.py scenario.json [--warp 0] [--out telemetry.jsonl] [--summary bilan.json]
+
+Scénario :
+    {"duration": 7200, "seed": 1,
+     "drones": [{"id": "d-1", "start_lat": 48.85, ...}] ou "count": 500,
+     "commands": [{"t": 0, "drone": "*", "cmd": "takeoff", "args": {"alt": 30}},
+                  {"t": 5, "drone": "d-1", "cmd": "goto", "args": {"lat": 48.9, "lon": 2.4}}]}
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from models import DroneCreate
+from sim import DroneSimulator
+from telemetry_policy import TelemetryPolicy, gate_for
+
+Sink = Callable[[dict], None]
+
+
+class VirtualClock:
+    def __init__(self, start: float = 0.0, warp: float = 0.0):
+        self.t = start
+        self.warp = warp  # 0 = pas d'attente ; N = N secondes simulées par seconde réelle
+        self._origin = None  # (temps réel, temps virtuel) au premier pas
+
+    def now(self) -> float:
+        return self.t
+
+    def advance_to(self, t: float):
+        if t <= self.t:
+            return
+        if self.warp > 0:
+            if self._origin is None:
+                self._origin = (time.monotonic(), self.t)
+            real0, virt0 = self._origin
+            delay = real0 + (t - virt0) / self.warp - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.t = t
+
+
+class FileSink:
+    """Télémétrie en JSON lines (un état par ligne)."""
+
+    def __init__(self, path: str):
+        self._f = open(path, "w", buffering=1 << 20)
+
+    def __call__(self, record: dict):
+        self._f.write(json.dumps(record, separators=(",", ":")))
+        self._f.write("\n")
+
+    def close(self):
+        self._f.close()
+
+
+class _Track:
+    __slots__ = ("flown_m", "min_battery", "records")
+
+    def __init__(self):
+        self.flown_m = 0.0
+        self.min_battery = 100.0
+        self.records = 0
+
+
+class HeadlessSim:
+    def __init__(self, clock: Optional[VirtualClock] = None, sink: Optional[Sink] = None,
+                 seed: Optional[int] = None, topic_prefix: str = "sim"):
+        self.clock = clock or VirtualClock()
+        self.sink = sink
+        self.seed = seed
+        self.topic_prefix = topic_prefix
+        self.drones: Dict[str, DroneSimulator] = {}
+        self._tracks: Dict[str, _Track] = {}
+        self._seq = itertools.count()
+        self._due: list = []        # (t, seq, drone_id)
+        self._timeline: list = []   # (t, seq, cible, cmd, args)
+        self.steps = 0
+        self.commands = 0
+        self.errors: List[dict] = []
+
+    # --- préparation ---
+
+    def add(self, drone_id: str, **params) -> DroneSimulator:
+        d = DroneCreate(id=drone_id, topic_prefix=params.pop("topic_prefix", self.topic_prefix), **params)
+        sim = DroneSimulator(
+            drone_id=d.id,
+            topic_prefix=d.topic_prefix,
+            shared_secret="",
+            start_lat=d.start_lat, start_lon=d.start_lon, start_alt=d.start_alt,
+            publish_interval_sec=d.publish_interval_sec,
+            cruise_speed_mps=d.cruise_speed_mps,
+            battery_drain=d.battery_drain,
+            heading_noise=d.heading_noise,
+        )
+        sim.clock = self.clock.now
+        if self.seed is not None:
+            sim.rng = random.Random(f"{self.seed}:{drone_id}")
+        sim.telemetry_sink = self._emit
+        sim.telemetry_gate = gate_for(TelemetryPolicy.from_drone(d), d.publish_interval_sec)
+        self.drones[drone_id] = sim
+        self._tracks[drone_id] = _Track()
+        heapq.heappush(self._due, (self.clock.now(), next(self._seq), drone_id))
+        return sim
+
+    def schedule(self, t: float, drone: str, cmd: str, args: Optional[dict] = None):
+        """Commande à t secondes (temps virtuel) ; drone="*" : toute la flotte."""
+        heapq.heappush(self._timeline, (t, next(self._seq), drone, cmd, args or {}))
+
+    def load_commands(self, entries: Iterable[dict], t0: float = 0.0):
+        for e in entries:
+            self.schedule(t0 + float(e["t"]), e.get("drone", "*"), e["cmd"], e.get("args"))
+
+    # --- exécution ---
+
+    def _emit(self, topic_prefix: str, record: dict):
+        tr = self._tracks[record["drone_id"]]
+        tr.records += 1
+        if self.sink is not None:
+            self.sink(record)
+
+    def _apply(self, t: float, target: str, cmd: str, args: dict):
+        sims = self.drones.values() if target == "*" else [self.drones.get(target)]
+        for sim in sims:
+            self.commands += 1
+            if sim is None:
+                self.errors.append({"t": t, "drone": target, "cmd": cmd, "error": "unknown drone"})
+                continue
+            try:
+                sim.apply_command(cmd, args)
+            except Exception as e:
+                self.errors.append({"t": t, "drone": sim.drone_id, "cmd": cmd,
+                                    "error": f"{type(e).__name__}: {e}"})
+
+    def run(self, duration: float) -> dict:
+        """Avance de `duration` secondes virtuelles ; renvoie le bilan."""
+        wall0 = time.perf_counter()
+        t0 = self.clock.now()
+        end = t0 + duration
+        due, timeline = self._due, self._timeline
+        inf = float("inf")
+        while True:
+            t_cmd = timeline[0][0] if timeline else inf
+            t_step = due[0][0] if due else inf
+            t = min(t_cmd, t_step)
+            if t > end:
+                break
+            self.clock.advance_to(t)
+            if t_cmd <= t_step:
+                # à même instant, la commande passe avant le pas
+                _, _, target, cmd, args = heapq.heappop(timeline)
+                self._apply(t, target, cmd, args)
+                continue
+            _, _, drone_id = heapq.heappop(due)
+            sim = self.drones[drone_id]
+            st = sim.state
+            lat, lon = st.lat, st.lon
+            sim.tick()
+            # même métrique que move_towards (degrés -> m à 111 km/degré)
+            tr = self._tracks[drone_id]
+            tr.flown_m += math.hypot(st.lat - lat, st.lon - lon) * 111_000.0
+            # suivi à chaque pas : la télémétrie émise peut être filtrée (mode adaptatif)
+            if st.battery_pct < tr.min_battery:
+                tr.min_battery = st.battery_pct
+            self.steps += 1
+            heapq.heappush(due, (t + sim.publish_interval, next(self._seq), drone_id))
+        self.clock.advance_to(end)
+        wall = time.perf_counter() - wall0
+        return self.summary(end - t0, wall)
+
+    def summary(self, virtual_sec: float, wall_sec: float) -> dict:
+        drones = {}
+        for drone_id, sim in self.drones.items():
+            st, tr = sim.state, self._tracks[drone_id]
+            drones[drone_id] = {
+                "lat": st.lat, "lon": st.lon, "alt": st.alt, "status": st.status,
+                "battery_pct": st.battery_pct, "min_battery_pct": tr.min_battery,
+                "flown_m": tr.flown_m, "records": tr.records,
+            }
+        return {
+            "virtual_sec": virtual_sec,
+            "wall_sec": wall_sec,
+            "speedup": virtual_sec / wall_sec if wall_sec > 0 else None,
+            "steps": self.steps,
+            "commands": self.commands,
+            "errors": self.errors,
+            "drones": drones,
+        }
+
+
+def from_scenario(scenario: dict, clock: Optional[VirtualClock] = None,
+                  sink: Optional[Sink] = None) -> HeadlessSim:
+    sim = HeadlessSim(clock=clock, sink=sink, seed=scenario.get("seed"))
+    drones = scenario.get("drones")
+    if drones is None:
+        drones = [{"id": f"sim-{i:05d}"} for i in range(int(scenario.get("count", 1)))]
+    for d in drones:
+        params = dict(d)
+        sim.add(params.pop("id"), **params)
+    sim.load_commands(scenario.get("commands", []))
+    return sim
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Simulation headless (horloge virtuelle)")
+    p.add_argument("scenario", help="fichier JSON du scénario")
+    p.add_argument("--duration", type=float, help="secondes simulées (sinon celle du scénario)")
+    p.add_argument("--warp", type=float, default=0.0, help="0 = au plus vite ; N = N s simulées par s réelle")
+    p.add_argument("--out", help="télémétrie en JSON lines")
+    p.add_argument("--summary", help="bilan JSON (sinon sur la sortie standard)")
+    args = p.parse_args(argv)
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    sink = FileSink(args.out) if args.out else None
+    sim = from_scenario(scenario, clock=VirtualClock(warp=args.warp), sink=sink)
+    try:
+        result = sim.run(args.duration if args.duration is not None else float(scenario.get("duration", 3600)))
+    finally:
+        if sink is not None:
+            sink.close()
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
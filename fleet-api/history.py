@@ -0,0 +1,299 @@
+"""
+Historique de télémétrie (position, altitude, batterie) par drone.
+- record() est branché sur TelemetryCache : il ajoute le point à un buffer
+  circulaire par drone (requêtes récentes servies depuis la mémoire) et à la
+  liste des points à écrire.
+- Un thread de fond vide cette liste dans SQLite par grosses transactions
+  (executemany), et applique la rétention / compaction.
+- query() renvoie une série sous-échantillonnée côté serveur :
+  min/max/dernier par tranche de `step` secondes.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+
+from models import TelemetryPoint, get_engine
+
+# (drone_id, ts, lat, lon, alt, speed_mps, battery_pct, status)
+Row = Tuple[str, float, float, float, float, float, float, str]
+COLUMNS = ("drone_id", "ts", "lat", "lon", "alt", "speed_mps", "battery_pct", "status")
+
+_BUCKETS_SQL = text("""
+WITH agg AS (
+    SELECT CAST((ts - :t0) / :step AS INTEGER) AS b,
+           COUNT(*) AS n,
+           MIN(alt) AS alt_min, MAX(alt) AS alt_max,
+           MIN(battery_pct) AS bat_min, MAX(battery_pct) AS bat_max,
+           MAX(ts) AS last_ts
+    FROM telemetry_point
+    WHERE drone_id = :drone_id AND ts >= :t0 AND ts < :t1
+    GROUP BY b
+)
+SELECT agg.b, agg.n, agg.alt_min, agg.alt_max, agg.bat_min, agg.bat_max,
+       p.ts, p.lat, p.lon, p.alt, p.speed_mps, p.battery_pct, p.status
+FROM agg
+JOIN telemetry_point p ON p.id = (
+    SELECT id FROM telemetry_point
+    WHERE drone_id = :drone_id AND ts = agg.last_ts
+    ORDER BY id DESC LIMIT 1
+)
+ORDER BY agg.b
+""")
+
+_COMPACT_SQL = text("""
+DELETE FROM telemetry_point
+WHERE ts >= :since AND ts < :until
+  AND id NOT IN (
+    SELECT MAX(id) FROM telemetry_point
+    WHERE ts >= :since AND ts < :until
+    GROUP BY drone_id, CAST(ts / :step AS INTEGER)
+  )
+""")
+
+
+def downsample(rows: List[Row], t0: float, step: float) -> List[dict]:
+    """Même découpage que la requête SQL, pour les points encore en mémoire."""
+    out: List[dict] = []
+    cur_b, bucket = None, None
+    for row in rows:
+        b = int((row[1] - t0) / step)
+        if b != cur_b:
+            if bucket is not None:
+                out.append(bucket)
+            cur_b = b
+            bucket = {"t": t0 + b * step, "n": 0,
+                      "alt": {"min": row[4], "max": row[4]},
+                      "battery_pct": {"min": row[6], "max": row[6]}}
+        bucket["n"] += 1
+        bucket["alt"]["min"] = min(bucket["alt"]["min"], row[4])
+        bucket["alt"]["max"] = max(bucket["alt"]["max"], row[4])
+        bucket["battery_pct"]["min"] = min(bucket["battery_pct"]["min"], row[6])
+        bucket["battery_pct"]["max"] = max(bucket["battery_pct"]["max"], row[6])
+        bucket["last"] = _last(row)
+    if bucket is not None:
+        out.append(bucket)
+    return out
+
+
+def merge_buckets(a: List[dict], b: List[dict]) -> List[dict]:
+    """Fusionne deux séries découpées avec les mêmes t0/step (SQL + mémoire)."""
+    out = {x["t"]: x for x in a}
+    for x in b:
+        y = out.get(x["t"])
+        if y is None:
+            out[x["t"]] = x
+            continue
+        out[x["t"]] = {
+            "t": x["t"], "n": x["n"] + y["n"],
+            "alt": {"min": min(x["alt"]["min"], y["alt"]["min"]),
+                    "max": max(x["alt"]["max"], y["alt"]["max"])},
+            "battery_pct": {"min": min(x["battery_pct"]["min"], y["battery_pct"]["min"]),
+                            "max": max(x["battery_pct"]["max"], y["battery_pct"]["max"])},
+            "last": x["last"] if x["last"]["ts"] >= y["last"]["ts"] else y["last"],
+        }
+    return [out[t] for t in sorted(out)]
+
+
+def _num(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _last(row) -> dict:
+    return {"ts": row[1], "lat": row[2], "lon": row[3], "alt": row[4],
+            "speed_mps": row[5], "battery_pct": row[6], "status": row[7]}
+
+
+class TelemetryHistory:
+    def __init__(self, database_url: str, ring_size: int = 600,
+                 flush_interval: float = 1.0, retention_sec: float = 7 * 86400,
+                 compact_after_sec: float = 3600, compact_step_sec: float = 60,
+                 maintenance_interval: float = 300, max_pending: int = 500_000):
+        self.database_url = database_url
+        self.ring_size = ring_size
+        self.flush_interval = flush_interval
+        self.retention_sec = retention_sec
+        self.compact_after_sec = compact_after_sec
+        self.compact_step_sec = compact_step_sec
+        self.maintenance_interval = maintenance_interval
+        self.max_pending = max_pending
+
+        self._rings: Dict[str, Deque[Row]] = {}
+        self._pending: List[Row] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._compacted_until = 0.0
+
+        self.written = 0
+        self.flushes = 0
+        self.deleted = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+        self.lost = 0
+        self.last_flush_ms = 0.0
+
+    # --- écriture ---
+
+    def record(self, rec: dict):
+        pos = rec.get("position") or {}
+        row = (rec.get("drone_id"), rec.get("ts"), pos.get("lat"), pos.get("lon"), pos.get("alt"),
+               rec.get("speed_mps"), rec.get("battery_pct"), rec.get("status"))
+        # colonnes NOT NULL : un état incomplet est écarté ici, pas au flush
+        if not (isinstance(row[0], str) and all(_num(v) for v in row[1:7])
+                and isinstance(row[7], str)):
+            self.rejected += 1
+            return
+        ring = self._rings.get(row[0])
+        if ring is None:
+            ring = self._rings.setdefault(row[0], deque(maxlen=self.ring_size))
+        ring.append(row)
+        with self._lock:
+            self._pending.append(row)
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            t0 = time.perf_counter()
+            try:
+                written = self._insert(rows)
+            except IntegrityError:
+                # ligne invalide dans le lot : insertion une à une, on écarte
+                # seulement les fautives
+                written = self._insert_each(rows)
+            except Exception:
+                # base indisponible / verrouillée : le lot repart en file
+                self.failed_flushes += 1
+                self._requeue(rows)
+                raise
+            self.last_flush_ms = (time.perf_counter() - t0) * 1000.0
+            self.written += written
+            self.flushes += 1
+            return written
+
+    def _insert(self, rows: List[Row]) -> int:
+        with get_engine(self.database_url).begin() as conn:
+            conn.execute(insert(TelemetryPoint.__table__),
+                         [dict(zip(COLUMNS, r)) for r in rows])
+        return len(rows)
+
+    def _insert_each(self, rows: List[Row]) -> int:
+        written = 0
+        with get_engine(self.database_url).connect() as conn:
+            for r in rows:
+                try:
+                    with conn.begin():
+                        conn.execute(insert(TelemetryPoint.__table__), dict(zip(COLUMNS, r)))
+                    written += 1
+                except IntegrityError:
+                    self.rejected += 1
+        return written
+
+    def _requeue(self, rows: List[Row]):
+        with self._lock:
+            pending = rows + self._pending
+            overflow = len(pending) - self.max_pending
+            if overflow > 0:
+                # file bornée : on sacrifie les points les plus anciens
+                pending = pending[overflow:]
+                self.lost += overflow
+            self._pending = pending
+
+    # --- rétention / compaction ---
+
+    def maintain(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with get_engine(self.database_url).begin() as conn:
+            res = conn.execute(text("DELETE FROM telemetry_point WHERE ts < :cutoff"),
+                               {"cutoff": now - self.retention_sec})
+            self.deleted += res.rowcount or 0
+            # Au-delà de compact_after_sec, on ne garde qu'un point par tranche.
+            until = now - self.compact_after_sec
+            since = max(self._compacted_until, now - self.retention_sec)
+            if until > since:
+                res = conn.execute(_COMPACT_SQL, {"since": since, "until": until,
+                                                  "step": self.compact_step_sec})
+                self.deleted += res.rowcount or 0
+                self._compacted_until = until
+        if self.database_url.startswith("sqlite"):
+            with get_engine(self.database_url).connect() as conn:
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # --- thread de fond ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+        self.flush()
+
+    def _run(self):
+        next_maintenance = time.monotonic() + self.maintenance_interval
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() >= next_maintenance:
+                    self.maintain()
+                    next_maintenance = time.monotonic() + self.maintenance_interval
+            except Exception as e:
+                print(f"[TelemetryHistory] background flush failed: {e}")
+
+    # --- lecture ---
+
+    def query(self, drone_id: str, t_from: float, t_to: float, step: float) -> List[dict]:
+        ring = self._rings.get(drone_id)
+        if ring:
+            rows = list(ring)
+            # la fenêtre demandée est entièrement couverte par le buffer mémoire
+            if rows[0][1] <= t_from:
+                return downsample([r for r in rows if t_from <= r[1] < t_to], t_from, step)
+
+        # Pas de flush dans le chemin de lecture : les points pas encore
+        # écrits sont lus en mémoire et fusionnés. _flush_lock garantit qu'un
+        # lot n'est ni compté deux fois ni absent (sorti de _pending mais pas
+        # encore commité).
+        with self._flush_lock:
+            with self._lock:
+                mem = [r for r in self._pending if r[0] == drone_id and t_from <= r[1] < t_to]
+            with get_engine(self.database_url).connect() as conn:
+                res = conn.execute(_BUCKETS_SQL, {"drone_id": drone_id, "t0": t_from,
+                                                  "t1": t_to, "step": step})
+                from_db = [
+                    {"t": t_from + r[0] * step, "n": r[1],
+                     "alt": {"min": r[2], "max": r[3]},
+                     "battery_pct": {"min": r[4], "max": r[5]},
+                     "last": _last((drone_id,) + tuple(r[6:]))}
+                    for r in res
+                ]
+        if not mem:
+            return from_db
+        mem.sort(key=lambda r: r[1])
+        return merge_buckets(from_db, downsample(mem, t_from, step))
+
+    def stats(self) -> dict:
+        return {
+            "drones": len(self._rings),
+            "pending": len(self._pending),
+            "written": self.written,
+            "flushes": self.flushes,
+            "deleted": self.deleted,
+            "rejected": self.rejected,
+            "failed_flushes": self.failed_flushes,
+            "lost": self.lost,
+            "last_flush_ms": self.last_flush_ms,
+        }
@@ -0,0 +1,175 @@
+"""
+Ingestion de la télémétrie dans fleet-api.
+- TelemetryIngestor : client MQTT dédié, abonné à `+/drone/+/telemetry` et aux
+  trames `+/fleet/telemetry` (JSON ou binaire, cf. telemetry_codec.py).
+  Les messages sont traités dans le thread réseau paho, jamais dans les
+  handlers HTTP. Abonné aussi à `+/drone/+/events` (JSON) : transmis aux
+  event_listeners (acks de commandes, cf. commands.py).
+- TelemetryCache : dernier état connu par drone. Une écriture = une affectation
+  de dict (atomique sous le GIL) : les lectures se font sans verrou, en O(1).
+"""
+
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import paho.mqtt.client as mqtt
+
+from telemetry_codec import TelemetryDecoder, decode_any
+
+Listener = Callable[[dict], None]
+
+
+def valid_record(rec) -> bool:
+    """Forme minimale d'un état : dict, drone_id texte, ts et position numériques."""
+    if not isinstance(rec, dict):
+        return False
+    drone_id, ts, pos = rec.get("drone_id"), rec.get("ts"), rec.get("position")
+    if not isinstance(drone_id, str) or not drone_id:
+        return False
+    if not isinstance(ts, (int, float)) or isinstance(ts, bool):
+        return False
+    if not isinstance(pos, dict):
+        return False
+    return all(isinstance(pos.get(k), (int, float)) for k in ("lat", "lon", "alt"))
+
+
+class TelemetryCache:
+    def __init__(self):
+        self._latest: Dict[str, dict] = {}
+        # Abonnés appelés à chaque état accepté (historique, diffusion...).
+        self.listeners: List[Listener] = []
+
+        self.received = 0
+        self.stale = 0
+        self.invalid = 0
+        self.listener_errors = 0
+        self.rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def update(self, record: dict) -> bool:
+        if not valid_record(record):
+            self.invalid += 1
+            return False
+        drone_id = record["drone_id"]
+        prev = self._latest.get(drone_id)
+        if prev is not None and record["ts"] < prev["ts"]:
+            # message arrivé dans le désordre : on garde le plus récent
+            self.stale += 1
+            return False
+        self._latest[drone_id] = record
+        self._count()
+        for listener in self.listeners:
+            # un abonné défaillant ne doit ni priver les suivants ni tuer
+            # le thread réseau qui nous appelle
+            try:
+                listener(record)
+            except Exception as e:
+                self.listener_errors += 1
+                if self.listener_errors <= 10:
+                    print(f"[TelemetryCache] listener {listener!r} failed: {e!r}")
+        return True
+
+    def _count(self):
+        self.received += 1
+        self._window_count += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.rate = self._window_count / elapsed
+            self._window_start, self._window_count = now, 0
+
+    def get(self, drone_id: str) -> Optional[dict]:
+        return self._latest.get(drone_id)
+
+    def get_many(self, drone_ids: Iterable[str]) -> Dict[str, dict]:
+        latest = self._latest
+        out = {}
+        for drone_id in drone_ids:
+            rec = latest.get(drone_id)
+            if rec is not None:
+                out[drone_id] = rec
+        return out
+
+    def all(self) -> Dict[str, dict]:
+        return dict(self._latest)
+
+    def forget(self, drone_id: str):
+        self._latest.pop(drone_id, None)
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def stats(self) -> dict:
+        return {
+            "drones": len(self._latest),
+            "messages": self.received,
+            "stale": self.stale,
+            "invalid": self.invalid,
+            "listener_errors": self.listener_errors,
+            "messages_per_sec": self.rate,
+        }
+
+
+class TelemetryIngestor:
+    def __init__(self, cache: TelemetryCache, host: str, port: int, topic_prefix: str = "+"):
+        self.cache = cache
+        self.host = host
+        self.port = port
+        self.topics = [
+            f"{topic_prefix}/drone/+/telemetry",
+            f"{topic_prefix}/fleet/telemetry",
+            f"{topic_prefix}/drone/+/events",
+        ]
+        self.decoder = TelemetryDecoder()
+        self.event_listeners: List[Listener] = []
+        self.errors = 0
+        self.events = 0
+        self.client = mqtt.Client(client_id=f"fleet-api-ingest-{os.getpid()}")
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+
+    def start(self):
+        self.client.connect_async(self.host, self.port, keepalive=30)
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        print(f"[TelemetryIngestor] MQTT connected rc={rc}")
+        for topic in self.topics:
+            client.subscribe(topic)
+
+    def _on_message(self, client, userdata, msg):
+        # rien ne doit remonter dans paho : une exception arrêterait le
+        # thread réseau, donc l'ingestion pour tout le processus
+        try:
+            if msg.topic.endswith("/events"):
+                self.event(json.loads(msg.payload))
+                return
+            data = decode_any(msg.payload, msg.topic, self.decoder)
+            self.ingest(data)
+        except Exception:
+            self.errors += 1
+
+    def ingest(self, data):
+        """Accepte un état, une trame JSON {"drones": [...]} ou une liste d'états."""
+        if isinstance(data, dict) and "drones" in data:
+            data = data["drones"]
+        if isinstance(data, list):
+            for rec in data:
+                self.cache.update(rec)
+        elif isinstance(data, dict):
+            self.cache.update(data)
+
+    def event(self, event: dict):
+        self.events += 1
+        for listener in self.event_listeners:
+            listener(event)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "errors": self.errors, "events": self.events}
@@ -1,12 +1,85 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+from sqlalchemy import delete, insert, update
 from sqlmodel import select
-from models import Drone, DroneCreate, DroneRead, CommandRequest, DroneUpdate, get_session
+import httpx
+from models import (
+    Drone, DroneCreate, DroneRead, CommandRequest, DroneUpdate,
+    BulkItemResult, BulkResult, DroneBulkUpdate, DroneIds, DroneHandoff,
+    dispose_db, get_async_session, init_db,
+)
 from manager import FleetManager
+from ingest import TelemetryCache, TelemetryIngestor
+from history import TelemetryHistory
+from stream import TelemetryHub, parse_bbox, parse_ids
+from spatial import GridIndex
+from conflicts import ConflictDetector
+from checkpoint import Checkpointer, SavedDrone
+from sharding import FORWARDED_HEADER, BrokerMembership, ShardMap, parse_members
+from registry import DroneRegistry
 from config import get_config
+from metrics import STARTUP, MetricsMiddleware, register_fleet
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Fleet API", version="0.1.0")
+_init_t0 = time.perf_counter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # schéma + threads de fond démarrés ici plutôt qu'à l'import du module ;
+    # rien n'attend le broker : connexions MQTT en arrière-plan
+    t0 = time.perf_counter()
+    fleet.connect()
+    await init_db(cfg["database_url"])
+    await registry.load()
+    if kcfg["enabled"]:
+        restored = await run_in_threadpool(checkpointer.restore)
+        fleet.saved.update((i, d) for i, d in restored.items() if i in registry)
+    if shards is None:
+        await _resume_running()
+    else:
+        global _loop, _http, _shard_task
+        _loop = asyncio.get_running_loop()
+        _http = httpx.AsyncClient(timeout=scfg["forward_timeout_ms"] / 1000.0)
+        _shard_task = asyncio.create_task(_shard_loop())
+        shard_changed.set()  # premier équilibrage : reprend les drones "running" de ce shard
+        if membership is not None:
+            membership.start()
+    if kcfg["enabled"]:
+        checkpointer.start(interval=kcfg["interval_ms"] / 1000.0)
+    if cfg["ingest"]["enabled"] and not cfg["mqtt"]["disabled"]:
+        ingestor.start()
+    if hcfg["enabled"]:
+        history.start()
+    if ccfg["enabled"]:
+        conflicts.start(interval=ccfg["interval_ms"] / 1000.0)
+    _startup("lifespan", time.perf_counter() - t0)
+    print(f"[fleet-api] ready in {startup_ms['init'] + startup_ms['lifespan']:.1f} ms (mqtt: {_mqtt_state()})")
+    yield
+    if shards is not None:
+        _shard_task.cancel()
+        if membership is not None:
+            await run_in_threadpool(membership.stop)
+        await _http.aclose()
+    if ccfg["enabled"]:
+        await run_in_threadpool(conflicts.stop)
+    if kcfg["enabled"]:
+        await run_in_threadpool(checkpointer.stop)  # dernier point de reprise, drones encore en vol
+    await run_in_threadpool(fleet.shutdown)
+    if hcfg["enabled"]:
+        await run_in_threadpool(history.stop)
+    if cfg["ingest"]["enabled"] and not cfg["mqtt"]["disabled"]:
+        ingestor.stop()
+    await dispose_db()
+
+app = FastAPI(title="Fleet API", version="0.1.0", lifespan=lifespan)
 
 cfg = get_config()
 
@@ -22,113 +95,742 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# ajouté après CORS : enveloppe toute la pile (préflights compris)
+app.add_middleware(MetricsMiddleware)
 
 cfg = get_config()
 fleet = FleetManager()
+register_fleet(fleet)
+
+kcfg = cfg["checkpoint"]
+checkpointer = Checkpointer(kcfg["path"], fleet.snapshot, compact_every=kcfg["compact_every"])
+
+telemetry_cache = TelemetryCache()
+ingestor = TelemetryIngestor(
+    telemetry_cache,
+    cfg["mqtt"]["host"], cfg["mqtt"]["port"],
+    topic_prefix=cfg["ingest"]["topic_prefix"],
+)
+
+hcfg = cfg["history"]
+history = TelemetryHistory(
+    cfg["database_url"],
+    ring_size=hcfg["ring_size"],
+    flush_interval=hcfg["flush_interval_ms"] / 1000.0,
+    retention_sec=hcfg["retention_hours"] * 3600,
+    compact_after_sec=hcfg["compact_after_min"] * 60,
+    compact_step_sec=hcfg["compact_step_sec"],
+)
+if hcfg["enabled"]:
+    telemetry_cache.listeners.append(history.record)
+
+# acks des drones distants (les simulateurs locaux passent par on_event)
+ingestor.event_listeners.append(fleet.commands.ack)
+
+hub = TelemetryHub(max_pending=cfg["stream"]["max_pending"])
+telemetry_cache.listeners.append(hub.publish)
+STREAM_MIN_INTERVAL = cfg["stream"]["min_interval_ms"] / 1000.0
+
+spatial = GridIndex(cell_deg=cfg["spatial"]["cell_deg"])
+telemetry_cache.listeners.append(spatial.update_record)
+fleet.state_listeners.append(lambda drone_id, st: spatial.update(drone_id, st.lat, st.lon))
+
+def _publish_conflict(drone_id: str, event: dict):
+    # chaque réplique voit toute la télémétrie : seul le propriétaire publie
+    if shards is not None and not shards.is_local(drone_id):
+        return
+    d = registry.get(drone_id)
+    fleet.publish_event(d.topic_prefix if d else cfg["mqtt"]["topic_prefix"], drone_id, event)
+
+ccfg = cfg["conflicts"]
+conflicts = ConflictDetector(
+    separation_m=ccfg["separation_m"],
+    vertical_m=ccfg["vertical_m"],
+    horizon_sec=ccfg["horizon_sec"],
+    stale_sec=ccfg["stale_sec"],
+    publish=_publish_conflict,
+)
+if ccfg["enabled"]:
+    telemetry_cache.listeners.append(conflicts.update_record)
+    fleet.state_listeners.append(conflicts.update_state)
+
+# --- démarrage ---
+
+startup_ms: Dict[str, float] = {}
+
+def _startup(phase: str, sec: float):
+    startup_ms[phase] = round(sec * 1000.0, 3)
+    STARTUP.labels(phase).set(sec)
+
+def _mqtt_connect_sec() -> Optional[float]:
+    """Lifespan -> toutes les connexions MQTT établies une fois (None avant)."""
+    times = [link.first_connect_sec for link in fleet.links()]
+    if not times or None in times:
+        return None
+    return max(times)
+
+def _mqtt_state() -> str:
+    links = fleet.links()
+    if not links:
+        return "disabled"
+    return "connected" if all(link.connected for link in links) else "connecting"
+
+STARTUP.labels("mqtt_connect").set_function(lambda: _mqtt_connect_sec() or float("nan"))
 
 # --- tests app  ---
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    # prêt dès la fin du lifespan, broker joignable ou non (file + reconnexion)
+    mqtt_sec = _mqtt_connect_sec()
+    return {"status": "ok", "mqtt": _mqtt_state(), "startup_ms": {
+        **startup_ms, "mqtt_connect": None if mqtt_sec is None else round(mqtt_sec * 1000.0, 3)}}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/fleet/stats")
+def fleet_stats():
+    return {**fleet.stats(), "registry": registry.stats(), "checkpoint": checkpointer.stats()}
 
 # --- CRUD drones ---
+#
+# Lectures servies par le registre en mémoire (registry.py), écritures en
+# write-through : transaction en base puis mise à jour du registre.
+
+BULK_MAX = cfg["api"]["bulk_max"]
+PAGE_MAX = cfg["api"]["page_max"]
+DRONE_FIELDS = tuple(DroneRead.model_fields)
+_IN_CHUNK = 500  # taille des IN (...) : reste sous la limite de variables SQLite
+
+def _chunks(seq, n: int = _IN_CHUNK):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def _projection(fields: Optional[str]):
+    if not fields:
+        return DRONE_FIELDS
+    cols = tuple(f for f in fields.split(",") if f)
+    unknown = [f for f in cols if f not in DRONE_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {','.join(unknown)}")
+    return cols
+
+def _status(drone_id: str) -> str:
+    w = fleet.workers.get(drone_id)
+    return "running" if (w is not None and w.is_running()) else "stopped"
+
+registry = DroneRegistry(cfg["database_url"], _status)
+
+async def _persist_status(drone_ids: List[str], status: str):
+    """Statut voulu en base (write-through) : relu au démarrage pour reprendre les drones."""
+    async with get_async_session(cfg["database_url"]) as s:
+        for chunk in _chunks(drone_ids):
+            await s.exec(update(Drone).where(Drone.id.in_(chunk)).values(status=status))
+        await s.commit()
+    for drone_id in drone_ids:
+        d = registry.get(drone_id)
+        if d is not None:
+            d.status = status
+
+async def _resume_running():
+    """Relance les drones persistés "running" (état repris de fleet.saved s'il y en a un)."""
+    running = [d for d in map(registry.get, registry.ids_after(None)) if d.status == "running"]
+    if not running:
+        return
+    if not cfg["sim"]["resume"]:
+        await _persist_status([d.id for d in running], "stopped")
+        return
+    t0 = time.perf_counter()
+    for d in running:
+        fleet.start(d)
+        registry.touch(d.id)
+    print(f"[fleet] resumed {len(running)} drones ({checkpointer.restored} restored from checkpoint) "
+          f"in {(time.perf_counter() - t0) * 1000.0:.1f} ms")
+
+# --- Sharding (plusieurs répliques, cf. sharding.py) ---
+#
+# Chaque réplique ne simule que les drones "running" (statut persisté) que
+# l'anneau lui attribue. Changement de membres : après settle_ms, arrêt des
+# drones partis (état passé au nouveau propriétaire via /shard/handoff) et
+# démarrage des drones arrivés. start/stop/trajectory, et cmd sans broker,
+# sont relayés en HTTP à la réplique propriétaire.
+
+scfg = cfg["sharding"]
+shards: Optional[ShardMap] = None
+membership: Optional[BrokerMembership] = None
+shard_changed = asyncio.Event()
+shard_lock = asyncio.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_http: Optional[httpx.AsyncClient] = None
+_shard_task: Optional[asyncio.Task] = None
+
+def _members_changed(members):
+    if shards.set_members(members):
+        print(f"[shard] members: {sorted(shards.members)}")
+        shard_changed.set()
+
+if scfg["enabled"]:
+    shards = ShardMap(scfg["name"], scfg["url"], parse_members(scfg["members"]), vnodes=scfg["vnodes"])
+    if not scfg["members"] and not cfg["mqtt"]["disabled"]:
+        membership = BrokerMembership(
+            cfg["mqtt"]["host"], cfg["mqtt"]["port"], cfg["mqtt"]["topic_prefix"],
+            shards.name, shards.url,
+            # thread réseau paho -> boucle asyncio
+            on_change=lambda members: _loop.call_soon_threadsafe(_members_changed, members),
+        )
+
+async def _shard_loop():
+    while True:
+        await shard_changed.wait()
+        await asyncio.sleep(scfg["settle_ms"] / 1000.0)  # laisse arriver les autres annonces
+        shard_changed.clear()
+        try:
+            await _rebalance()
+        except Exception as e:
+            print(f"[shard] rebalance failed: {e!r}")
+
+async def _rebalance():
+    async with shard_lock:
+        t0 = time.perf_counter()
+        async with get_async_session(cfg["database_url"]) as s:
+            rows = (await s.exec(select(Drone).where(Drone.status == "running"))).all()
+        mine = {d.id: d for d in rows if shards.is_local(d.id)}
+        leaving = [i for i, w in list(fleet.workers.items()) if w.is_running() and i not in mine]
+        if leaving:
+            await run_in_threadpool(fleet.stop_many, leaving)
+            await _handoff(leaving)
+        started = 0
+        for d in mine.values():
+            w = fleet.workers.get(d.id)
+            if w is None or not w.is_running():
+                registry.put(d)
+                fleet.start(d)
+                started += 1
+        print(f"[shard] {shards.name}: {len(mine)} drones, +{started} -{len(leaving)} "
+              f"in {(time.perf_counter() - t0) * 1000.0:.1f} ms")
+
+async def _handoff(drone_ids: List[str]):
+    """Passe l'état des drones arrêtés ici à leur nouveau propriétaire."""
+    by_owner = {}
+    for drone_id in drone_ids:
+        w = fleet.workers.get(drone_id)
+        owner = shards.owner(drone_id)
+        if w is not None and owner != shards.name:
+            by_owner.setdefault(owner, []).append({"id": drone_id, **w.saved()._asdict()})
+    for owner, items in by_owner.items():
+        try:
+            r = await _http.post(f"{shards.url_of(owner)}/shard/handoff", json=items,
+                                 headers={FORWARDED_HEADER: shards.name})
+            r.raise_for_status()
+        except Exception as e:
+            print(f"[shard] handoff of {len(items)} drones to {owner} failed: {e!r}")
+            continue
+        for item in items:
+            fleet.forget(item["id"])
+            registry.touch(item["id"])
+
+async def _stop_remote(drone_ids: List[str]):
+    """Drones supprimés ici mais simulés ailleurs : arrêt chez leur propriétaire."""
+    if shards is None:
+        return
+    remote = [i for i in drone_ids if shards.owner(i) != shards.name]
+
+    async def stop(drone_id):
+        try:
+            await _http.post(f"{shards.url_of(shards.owner(drone_id))}/drones/{drone_id}/stop",
+                             headers={FORWARDED_HEADER: shards.name})
+        except httpx.HTTPError as e:
+            print(f"[shard] remote stop of {drone_id} failed: {e!r}")
+    await asyncio.gather(*(stop(i) for i in remote))
+
+async def _forward(request: Request, drone_id: str) -> Optional[Response]:
+    """Réponse de la réplique propriétaire du drone, ou None s'il est local."""
+    if shards is None or request.headers.get(FORWARDED_HEADER):
+        return None  # déjà relayée : traitée ici même si les anneaux divergent un instant
+    owner = shards.owner(drone_id)
+    if owner == shards.name:
+        return None
+    url = f"{shards.url_of(owner)}{request.url.path}"
+    if request.url.query:
+        url += f"?{request.url.query}"
+    headers = {FORWARDED_HEADER: shards.name}
+    if "content-type" in request.headers:
+        headers["content-type"] = request.headers["content-type"]
+    try:
+        r = await _http.request(request.method, url, content=await request.body(), headers=headers)
+    except httpx.HTTPError as e:
+        raise HTTPException(503, f"Shard owner {owner} unavailable: {e!r}")
+    return Response(content=r.content, status_code=r.status_code,
+                    media_type=r.headers.get("content-type"))
+
+def _not_modified(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    return inm.strip() == "*" or etag in (t.strip() for t in inm.split(","))
+
+def _cached(request: Request, body: bytes, etag: str, headers: Optional[dict] = None) -> Response:
+    headers = {"ETag": etag, **(headers or {})}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def _drone_or_404(drone_id: str) -> Drone:
+    await registry.ensure_loaded()
+    d = registry.get(drone_id)
+    if d is None and shards is not None:
+        # créé via une autre réplique : le registre local ne l'a pas encore vu
+        d = await _load_drone(drone_id)
+    if d is None:
+        raise HTTPException(404, "Not found")
+    return d
+
+async def _load_drone(drone_id: str) -> Optional[Drone]:
+    async with get_async_session(cfg["database_url"]) as s:
+        d = await s.get(Drone, drone_id)
+    if d is not None:
+        registry.put(d)
+    return d
 
 @app.post("/drones", response_model=DroneRead)
-def create_drone(body: DroneCreate):
-    with get_session(cfg["database_url"]) as s:
-        if s.get(Drone, body.id):
+async def create_drone(body: DroneCreate):
+    await registry.ensure_loaded()
+    async with registry.write_lock:
+        if body.id in registry:
             raise HTTPException(400, "Drone already exists")
-        d = Drone(
-            id=body.id,
-            topic_prefix=body.topic_prefix,
-            start_lat=body.start_lat,
-            start_lon=body.start_lon,
-            start_alt=body.start_alt,
-            publish_interval_sec=body.publish_interval_sec,
-            cruise_speed_mps=body.cruise_speed_mps,
-            battery_drain=body.battery_drain,
-            heading_noise=body.heading_noise,
-            status="stopped",
-        )
-        s.add(d); s.commit(); s.refresh(d)
-        return DroneRead(**d.model_dump())
-
-@app.get("/drones", response_model=List[DroneRead])
-def list_drones():
-    with get_session(cfg["database_url"]) as s:
-        rows = s.exec(select(Drone)).all()
-        # met à jour statut en mémoire si besoin
-        out = []
-        for d in rows:
-            d.status = "running" if (d.id in fleet.workers and fleet.workers[d.id].is_running()) else "stopped"
-            out.append(DroneRead(**d.model_dump()))
-        return out
+        d = Drone(**body.model_dump(), status="stopped")
+        async with get_async_session(cfg["database_url"]) as s:
+            s.add(d); await s.commit()
+        registry.put(d)
+    return DroneRead(**registry.row(d.id))
+
+@app.get("/drones", response_model=None)
+async def list_drones(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    topic_prefix: Optional[str] = None,
+    status: Optional[str] = Query(None, pattern="^(running|stopped)$"),
+):
+    """
+    Sans paramètre : toute la flotte (comportement historique), réponse
+    pré-sérialisée. Avec `limit` : pagination par clé (id > after, triée par
+    id) ; le curseur de la page suivante est renvoyé dans l'en-tête
+    X-Next-Cursor. `fields=id,status` ne renvoie que ces colonnes.
+    ETag = version de la collection (If-None-Match -> 304).
+    """
+    await registry.ensure_loaded()
+    if limit is None and after is None and fields is None and topic_prefix is None and status is None:
+        return _cached(request, *registry.list_body())
+
+    etag = registry.etag()
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    cols = _projection(fields)
+    out = []
+    for drone_id in registry.ids_after(after):
+        if topic_prefix is not None and registry.get(drone_id).topic_prefix != topic_prefix:
+            continue
+        row = registry.row(drone_id)
+        if status is not None and row["status"] != status:
+            continue
+        out.append({c: row[c] for c in cols})
+        if limit is not None and len(out) == limit:
+            break
+    headers = {"ETag": etag}
+    if limit is not None and len(out) == limit:
+        headers["X-Next-Cursor"] = drone_id
+    return JSONResponse(out, headers=headers)
+
+# --- Lots : une transaction par requête, un résultat par élément ---
+
+def _check_bulk(n: int):
+    if n > BULK_MAX:
+        raise HTTPException(413, f"Too many items (max {BULK_MAX})")
+
+def _bulk_result(results: List[BulkItemResult]) -> BulkResult:
+    ok = sum(1 for r in results if r.ok)
+    return BulkResult(ok=ok, failed=len(results) - ok, results=results)
+
+@app.post("/drones/bulk", response_model=BulkResult)
+async def create_drones_bulk(body: List[DroneCreate]):
+    _check_bulk(len(body))
+    await registry.ensure_loaded()
+    results, rows, seen = [], [], set()
+    async with registry.write_lock:
+        for b in body:
+            if b.id in registry or b.id in seen:
+                results.append(BulkItemResult(id=b.id, ok=False, error="Drone already exists"))
+                continue
+            seen.add(b.id)
+            rows.append({**b.model_dump(), "status": "stopped"})
+            results.append(BulkItemResult(id=b.id, ok=True))
+        if rows:
+            async with get_async_session(cfg["database_url"]) as s:
+                await s.exec(insert(Drone), params=rows)  # executemany
+                await s.commit()
+            for row in rows:
+                registry.put(Drone(**row))
+    return _bulk_result(results)
+
+@app.patch("/drones/bulk", response_model=BulkResult)
+async def update_drones_bulk(body: List[DroneBulkUpdate]):
+    _check_bulk(len(body))
+    await registry.ensure_loaded()
+    results, updated = [], {}
+    async with registry.write_lock:
+        for b in body:
+            d = updated.get(b.id) or registry.get(b.id)
+            if d is None:
+                results.append(BulkItemResult(id=b.id, ok=False, error="Not found"))
+                continue
+            data = b.model_dump(exclude_unset=True, exclude={"id"})
+            updated[b.id] = Drone(**{**d.model_dump(), **data})
+            results.append(BulkItemResult(id=b.id, ok=True))
+        if updated:
+            # lignes complètes (mêmes colonnes) : UPDATE par clé primaire en executemany
+            async with get_async_session(cfg["database_url"]) as s:
+                await s.exec(update(Drone), params=[d.model_dump() for d in updated.values()])
+                await s.commit()
+            for d in updated.values():
+                registry.put(d)
+    return _bulk_result(results)
+
+@app.delete("/drones/bulk", response_model=BulkResult)
+async def delete_drones_bulk(body: DroneIds):
+    _check_bulk(len(body.ids))
+    await registry.ensure_loaded()
+    async with registry.write_lock:
+        existing = {i for i in body.ids if i in registry}
+        running = [i for i in existing if i in fleet.workers]
+        if running:
+            await run_in_threadpool(fleet.stop_many, running)
+        await _stop_remote(list(existing))
+        async with get_async_session(cfg["database_url"]) as s:
+            for chunk in _chunks(list(existing)):
+                await s.exec(delete(Drone).where(Drone.id.in_(chunk)))
+            await s.commit()
+        for drone_id in existing:
+            registry.remove(drone_id)
+            fleet.forget(drone_id)
+            spatial.remove(drone_id)
+            conflicts.remove(drone_id)
+    return _bulk_result([
+        BulkItemResult(id=i, ok=True) if i in existing
+        else BulkItemResult(id=i, ok=False, error="Not found")
+        for i in body.ids
+    ])
 
 @app.get("/drones/{drone_id}", response_model=DroneRead)
-def get_drone(drone_id: str):
-    with get_session(cfg["database_url"]) as s:
-        d = s.get(Drone, drone_id)
-        if not d:
-            raise HTTPException(404, "Not found")
-        d.status = "running" if (drone_id in fleet.workers and fleet.workers[drone_id].is_running()) else "stopped"
-        return DroneRead(**d.model_dump())
+async def get_drone(drone_id: str, request: Request):
+    await registry.ensure_loaded()
+    cached = registry.body(drone_id)
+    if cached is None:
+        raise HTTPException(404, "Not found")
+    return _cached(request, *cached)
 
 @app.delete("/drones/{drone_id}")
-def delete_drone(drone_id: str):
-    with get_session(cfg["database_url"]) as s:
-        d = s.get(Drone, drone_id)
-        if not d:
+async def delete_drone(drone_id: str):
+    await _drone_or_404(drone_id)
+    async with registry.write_lock:
+        if drone_id not in registry:
             raise HTTPException(404, "Not found")
-        # stoppe si en cours
-        fleet.stop(drone_id)
-        s.delete(d); s.commit()
-        return {"ok": True}
-    
+        # stoppe si en cours (join du thread worker : hors boucle asyncio)
+        await run_in_threadpool(fleet.stop, drone_id)
+        await _stop_remote([drone_id])
+        spatial.remove(drone_id)
+        conflicts.remove(drone_id)
+        async with get_async_session(cfg["database_url"]) as s:
+            await s.exec(delete(Drone).where(Drone.id == drone_id))
+            await s.commit()
+        registry.remove(drone_id)
+        fleet.forget(drone_id)
+    return {"ok": True}
+
 @app.patch("/drones/{drone_id}", response_model=DroneRead)
-def update_drone(drone_id: str, body: DroneUpdate):
-    with get_session(cfg["database_url"]) as s:
-        d = s.get(Drone, drone_id)
-        if not d:
+async def update_drone(drone_id: str, body: DroneUpdate):
+    await _drone_or_404(drone_id)
+    async with registry.write_lock:
+        d = registry.get(drone_id)
+        if d is None:
             raise HTTPException(404, "Not found")
-
         # ne met à jour que les champs fournis
         data = body.model_dump(exclude_unset=True)
-        for k, v in data.items():
-            setattr(d, k, v)
-
-        s.add(d); s.commit(); s.refresh(d)
-
-        # remettre à jour le status calculé
-        d.status = "running" if (drone_id in fleet.workers and fleet.workers[drone_id].is_running()) else "stopped"
-        return DroneRead(**d.model_dump())
+        if data:
+            async with get_async_session(cfg["database_url"]) as s:
+                await s.exec(update(Drone).where(Drone.id == drone_id).values(**data))
+                await s.commit()
+            registry.put(Drone(**{**d.model_dump(), **data}))
+    return DroneRead(**registry.row(drone_id))
 
 # --- Start/Stop ---
 
 @app.post("/drones/{drone_id}/start")
-def start_drone(drone_id: str):
-    with get_session(cfg["database_url"]) as s:
-        d = s.get(Drone, drone_id)
-        if not d:
-            raise HTTPException(404, "Not found")
-        fleet.start(d)
-        return {"ok": True, "status": "running"}
+async def start_drone(drone_id: str, request: Request):
+    forwarded = await _forward(request, drone_id)
+    if forwarded is not None:
+        return forwarded
+    d = await _drone_or_404(drone_id)
+    fleet.start(d)
+    registry.touch(drone_id)
+    await _persist_status([drone_id], "running")
+    return {"ok": True, "status": "running"}
 
 @app.post("/drones/{drone_id}/stop")
-def stop_drone(drone_id: str):
-    fleet.stop(drone_id)
+async def stop_drone(drone_id: str, request: Request):
+    forwarded = await _forward(request, drone_id)
+    if forwarded is not None:
+        return forwarded
+    await run_in_threadpool(fleet.stop, drone_id)
+    registry.touch(drone_id)
+    if drone_id in registry:
+        await _persist_status([drone_id], "stopped")
     return {"ok": True, "status": "stopped"}
 
 # --- Commandes (API signe et publie sur MQTT) ---
 
 @app.post("/drones/{drone_id}/cmd")
-def command_drone(drone_id: str, body: CommandRequest):
-    with get_session(cfg["database_url"]) as s:
-        d = s.get(Drone, drone_id)
-        if not d:
-            raise HTTPException(404, "Not found")
-        payload = {"cmd": body.cmd}
-        if body.args:
-            payload["args"] = body.args
-        topic, envelope = fleet.publish_cmd(d.topic_prefix, d.id, payload)
-        return {"ok": True, "topic": topic, "envelope": envelope}
+async def command_drone(
+    drone_id: str,
+    body: CommandRequest,
+    request: Request,
+    wait: bool = False,
+    timeout: Optional[float] = Query(None, gt=0, le=60),
+):
+    """
+    wait=false : publie et rend la main (cid pour suivre via /commands/{cid}).
+    wait=true : attend l'ack du drone (504 si rien avant `timeout` secondes).
+    Avec un broker, la commande le traverse jusqu'à la réplique qui simule le
+    drone (ack reçu par l'ingestion) ; sans broker, elle lui est relayée.
+    """
+    if not fleet.connected:
+        forwarded = await _forward(request, drone_id)
+        if forwarded is not None:
+            return forwarded
+    d = await _drone_or_404(drone_id)
+    payload = {"cmd": body.cmd}
+    if body.args:
+        payload["args"] = body.args
+    topic, envelope, fut = fleet.publish_cmd(d.topic_prefix, d.id, payload, timeout=timeout, wait=wait)
+    cid = envelope["payload"]["cid"]
+    if not wait:
+        return {"ok": True, "cid": cid, "topic": topic, "envelope": envelope}
+    result = await fleet.commands.wait(cid, fut, timeout or fleet.commands.timeout)
+    if result["status"] == "timeout":
+        raise HTTPException(504, result)
+    return {**result, "topic": topic}
+
+@app.get("/commands/stats")
+def command_stats():
+    return fleet.commands.stats()
+
+@app.get("/commands/{cid}")
+def command_status(cid: str):
+    result = fleet.commands.get(cid)
+    if result is None:
+        raise HTTPException(404, "Unknown command")
+    return result
+
+# --- Trajectoire (simulateurs locaux) ---
+
+@app.get("/drones/{drone_id}/trajectory")
+async def drone_trajectory(drone_id: str, request: Request, at: Optional[float] = None):
+    """
+    État d'un simulateur local à l'instant `at` (epoch, défaut : maintenant),
+    évalué sur ses segments sans avancer la simulation, et segments restants.
+    """
+    forwarded = await _forward(request, drone_id)
+    if forwarded is not None:
+        return forwarded
+    w = fleet.workers.get(drone_id)
+    if w is None or not w.is_running():
+        raise HTTPException(404, "No running simulator")
+    at = w.clock() if at is None else at
+    return {"drone_id": drone_id, "at": at, "state": asdict(w.state_at(at)), "segments": w.mission(at)}
+
+# --- Télémétrie (dernier état connu, servi depuis la mémoire) ---
+
+@app.get("/drones/{drone_id}/telemetry/latest")
+async def latest_telemetry(drone_id: str):
+    rec = telemetry_cache.get(drone_id)
+    if rec is None:
+        raise HTTPException(404, "No telemetry")
+    return rec
+
+@app.get("/drones/{drone_id}/telemetry")
+def telemetry_history(
+    drone_id: str,
+    t_from: Optional[float] = Query(None, alias="from"),
+    t_to: Optional[float] = Query(None, alias="to"),
+    step: Optional[float] = None,
+):
+    t_to = time.time() if t_to is None else t_to
+    t_from = t_to - 3600 if t_from is None else t_from
+    if t_to <= t_from:
+        raise HTTPException(400, "'to' must be greater than 'from'")
+    step = step or max((t_to - t_from) / 300, 1.0)
+    if step <= 0 or (t_to - t_from) / step > 10_000:
+        raise HTTPException(400, "step too small for this range")
+    points = history.query(drone_id, t_from, t_to, step)
+    return {"drone_id": drone_id, "from": t_from, "to": t_to, "step": step, "points": points}
+
+@app.get("/telemetry/latest")
+async def latest_telemetry_bulk(ids: Optional[str] = None):
+    if ids is None:
+        return {"items": telemetry_cache.all(), "missing": []}
+    wanted = [i for i in ids.split(",") if i]
+    items = telemetry_cache.get_many(wanted)
+    return {"items": items, "missing": [i for i in wanted if i not in items]}
+
+@app.get("/telemetry/stats")
+async def telemetry_stats():
+    return {**ingestor.stats(), "history": history.stats(), "stream": hub.stats()}
+
+# --- Télémétrie en direct (une souscription broker, N clients) ---
+
+def _stream_filters(ids: Optional[str], bbox: Optional[str]):
+    try:
+        return parse_ids(ids), parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.websocket("/ws/telemetry")
+async def telemetry_ws(websocket: WebSocket, ids: Optional[str] = None, bbox: Optional[str] = None):
+    try:
+        id_set, box = parse_ids(ids), parse_bbox(bbox)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    client = hub.register(id_set, box)
+    # le client peut changer son filtre en envoyant {"ids": [...], "bbox": [...]}
+    recv = asyncio.ensure_future(websocket.receive())
+    batch = asyncio.ensure_future(client.next_batch())
+    try:
+        while True:
+            done, _ = await asyncio.wait({recv, batch}, return_when=asyncio.FIRST_COMPLETED)
+            if batch in done:
+                updates = batch.result()
+                if updates:
+                    await websocket.send_text(json.dumps({"type": "telemetry", "updates": updates}))
+                await asyncio.sleep(STREAM_MIN_INTERVAL)  # laisse la file coalescer
+                batch = asyncio.ensure_future(client.next_batch())
+            if recv in done:
+                msg = recv.result()
+                if msg["type"] == "websocket.disconnect":
+                    break
+                # filtre validé ici, côté boucle : matches() tourne dans le
+                # thread d'ingestion et ne doit jamais voir un filtre invalide
+                try:
+                    sub = json.loads(msg.get("text") or "{}")
+                    if not isinstance(sub, dict):
+                        raise ValueError("filter must be an object")
+                    new_ids, new_box = parse_ids(sub.get("ids")), parse_bbox(sub.get("bbox"))
+                except ValueError:
+                    await websocket.close(code=1008)
+                    break
+                client.ids, client.bbox = new_ids, new_box
+                recv = asyncio.ensure_future(websocket.receive())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        recv.cancel()
+        batch.cancel()
+        hub.unregister(client)
+
+@app.get("/telemetry/stream")
+async def telemetry_sse(request: Request, ids: Optional[str] = None, bbox: Optional[str] = None):
+    id_set, box = _stream_filters(ids, bbox)
+    client = hub.register(id_set, box)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    updates = await asyncio.wait_for(client.next_batch(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if updates:
+                    yield f"data: {json.dumps(updates)}\n\n"
+                await asyncio.sleep(STREAM_MIN_INTERVAL)
+        finally:
+            hub.unregister(client)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+# --- Requêtes spatiales (index en mémoire) ---
+
+def _spatial_items(found, with_distance: bool):
+    items = []
+    for entry in found:
+        drone_id, dist = entry if with_distance else (entry, None)
+        pos = spatial.position(drone_id)
+        if pos is None:
+            continue
+        item = {"id": drone_id, "lat": pos[0], "lon": pos[1]}
+        if with_distance:
+            item["distance_m"] = dist
+        items.append(item)
+    return {"count": len(items), "items": items}
+
+@app.get("/spatial/bbox")
+def spatial_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    return _spatial_items(spatial.bbox(min_lat, min_lon, max_lat, max_lon), False)
+
+@app.get("/spatial/radius")
+def spatial_radius(lat: float, lon: float, radius_m: float = Query(..., gt=0)):
+    return _spatial_items(spatial.radius(lat, lon, radius_m), True)
+
+@app.get("/spatial/nearest")
+def spatial_nearest(lat: float, lon: float, k: int = Query(10, ge=1, le=1000)):
+    return _spatial_items(spatial.nearest(lat, lon, k), True)
+
+# --- Conflits (séparation entre drones) ---
+
+@app.get("/conflicts")
+def list_conflicts(drone: Optional[str] = None):
+    items = conflicts.conflicts(drone)
+    return {"count": len(items), "items": items, "stats": conflicts.stats()}
+
+# --- Sharding (état et passation entre répliques) ---
+
+@app.get("/shard")
+def shard_status():
+    if shards is None:
+        return {"enabled": False}
+    running = [i for i, w in list(fleet.workers.items()) if w.is_running()]
+    return {"enabled": True, **shards.stats(), "running": len(running),
+            "discovery": "broker" if membership is not None else "static"}
+
+@app.put("/shard/members")
+def set_shard_members(members: Dict[str, str]):
+    """Liste statique remplacée à chaud ({nom: url}) ; rééquilibrage après settle_ms."""
+    if shards is None:
+        raise HTTPException(409, "Sharding disabled")
+    _members_changed({k: v.rstrip("/") for k, v in members.items()})
+    return shards.stats()
+
+@app.post("/shard/handoff")
+async def shard_handoff(items: List[DroneHandoff]):
+    """États repris d'une autre réplique ; un drone déjà relancé ici repart de cet état."""
+    restart = []
+    for item in items:
+        data = item.model_dump()
+        fleet.saved[item.id] = SavedDrone(**{f: data[f] for f in SavedDrone._fields})
+        w = fleet.workers.get(item.id)
+        if w is not None and w.is_running():
+            restart.append(item.id)
+    if restart:
+        await run_in_threadpool(fleet.stop_many, restart)
+        for drone_id in restart:
+            d = registry.get(drone_id)
+            if d is not None:
+                fleet.start(d)
+    return {"ok": True, "received": len(items), "restarted": len(restart)}
+
+_startup("init", time.perf_counter() - _init_t0)
@@ -1,40 +1,108 @@
-import os
 import json
-from typing import Dict
+import time
+from typing import Dict, Optional, Union
 import paho.mqtt.client as mqtt
-from security import sign
+from security import Signer
+from commands import CommandTracker
+from metrics import SIGN
+from telemetry_policy import TelemetryPolicy, gate_for
+from checkpoint import SavedDrone
 from sim import DroneWorker
+from engine import SimEngine, ScheduledDrone, VectorEngine, VectorDrone
+from bus import Backoff, ClientBus, MqttPool, NullBus
+from telemetry import TelemetryBatcher
+from telemetry_codec import TelemetryEncoder
 from config import get_config
 
 class FleetManager:
     def __init__(self):
         cfg = get_config()
         self.cfg = cfg
-        self.workers: Dict[str, DroneWorker] = {}
+        self.signer = Signer(cfg["shared_secret"])
+        self.workers: Dict[str, Union[DroneWorker, ScheduledDrone, VectorDrone]] = {}
+        # états lus dans un point de reprise (cf. checkpoint.py), repris au prochain ensure_worker
+        self.saved: Dict[str, SavedDrone] = {}
+        # appelés avec (drone_id, DroneState) à chaque pas des simulateurs locaux
+        self.state_listeners = []
+        # commandes en vol / acks (cf. commands.py)
+        self.commands = CommandTracker(
+            timeout=cfg["commands"]["timeout_ms"] / 1000.0,
+            window=cfg["commands"]["latency_window"],
+        )
         self.client = None
+        self.engine = None
+        if cfg["sim"]["engine"] == "scheduler":
+            self.engine = SimEngine()
+        elif cfg["sim"]["engine"] == "vector":
+            self.engine = VectorEngine()
+        self.bus = NullBus()
+        self.pool = None
+        self.binary_prefixes = frozenset(cfg["telemetry"]["binary_prefixes"])
+        self.encoder = TelemetryEncoder()
+        self.batcher = None
+        if cfg["telemetry"]["batch"]:
+            self.batcher = TelemetryBatcher(
+                lambda topic, payload, qos: self.bus.publish(topic, payload, qos),
+                max_drones=cfg["telemetry"]["batch_max_drones"],
+                max_latency=cfg["telemetry"]["batch_latency_ms"] / 1000.0,
+                binary_prefixes=self.binary_prefixes,
+                encoder=self.encoder,
+            )
 
-        if os.getenv("DISABLE_MQTT", "").lower() in {"1", "true", "yes"}:
+        if cfg["mqtt"]["disabled"]:
             print("[FleetManager] MQTT disabled via DISABLE_MQTT env var")
             return
 
-        try:
-            self.client = mqtt.Client()
-            self.client.connect(cfg["mqtt"]["host"], cfg["mqtt"]["port"], keepalive=15)
-            self.client.loop_start()
-            print(f"[FleetManager] MQTT connected to {cfg['mqtt']['host']}:{cfg['mqtt']['port']}")
-        except Exception as e:
-            print(f"[FleetManager] MQTT unavailable at startup: {e}")
-            self.client = None
+        # clients créés ici, connectés par connect() (lifespan) sans bloquer
+        mcfg = cfg["mqtt"]
+
+        def backoff():
+            return Backoff(mcfg["reconnect_min_ms"] / 1000.0, mcfg["reconnect_max_ms"] / 1000.0)
+
+        if mcfg["pool_size"] > 0:
+            # Mode pool : quelques connexions partagées par tous les workers
+            # (télémétrie, events, commandes) au lieu d'un client par drone.
+            self.pool = MqttPool(
+                mcfg["host"], mcfg["port"],
+                size=mcfg["pool_size"],
+                max_queue=mcfg["pool_max_queue"],
+                backoff=backoff,
+            )
+            self.bus = self.pool
+            return
+
+        self.client = mqtt.Client()
+        self.bus = ClientBus(self.client, backoff(), max_buffer=mcfg["buffer_max"])
+
+    def connect(self):
+        """
+        Connexion au broker en arrière-plan : rend la main immédiatement,
+        broker joignable ou non (reconnexion à gigue, commandes en file).
+        """
+        mcfg = self.cfg["mqtt"]
+        if self.pool is not None:
+            self.pool.connect()
+            print(f"[FleetManager] MQTT pool of {mcfg['pool_size']} connections to {mcfg['host']}:{mcfg['port']} (async)")
+        elif self.client is not None:
+            self.bus.connect(mcfg["host"], mcfg["port"], keepalive=15)
+            print(f"[FleetManager] MQTT connecting to {mcfg['host']}:{mcfg['port']} (async)")
 
-    def ensure_worker(self, drone) -> DroneWorker:
-        if drone.id in self.workers and self.workers[drone.id].is_running():
-            return self.workers[drone.id]
+    def links(self) -> list:
+        """État des connexions MQTT du FleetManager (cf. bus.Link)."""
+        if self.pool is not None:
+            return [c.link for c in self.pool.conns]
+        if self.client is not None:
+            return [self.bus.link]
+        return []
 
-        w = DroneWorker(
+    def ensure_worker(self, drone) -> Union[DroneWorker, ScheduledDrone, VectorDrone]:
+        old = self.workers.get(drone.id)
+        if old is not None and old.is_running():
+            return old
+
+        params = dict(
             drone_id=drone.id,
             topic_prefix=drone.topic_prefix,
-            mqtt_host=self.cfg["mqtt"]["host"],
-            mqtt_port=self.cfg["mqtt"]["port"],
             shared_secret=self.cfg["shared_secret"],
             start_lat=drone.start_lat,
             start_lon=drone.start_lon,
@@ -44,9 +112,37 @@ class FleetManager:
             battery_drain=drone.battery_drain,
             heading_noise=drone.heading_noise,
         )
+        if isinstance(self.engine, VectorEngine):
+            w = VectorDrone(self.engine, self.bus, **params)
+        elif self.engine is not None:
+            w = ScheduledDrone(self.engine, self.bus, **params)
+        else:
+            w = DroneWorker(
+                mqtt_host=self.cfg["mqtt"]["host"],
+                mqtt_port=self.cfg["mqtt"]["port"],
+                bus=self.pool,
+                **params,
+            )
+        # reprend là où le drone s'était arrêté (worker précédent ou point de reprise)
+        saved = self.saved.pop(drone.id, None)
+        if saved is None and old is not None:
+            saved = old.saved()
+        if saved is not None:
+            w.resume_from(saved)
+        w.on_state = self._on_state
+        w.telemetry_gate = gate_for(TelemetryPolicy.from_drone(drone), drone.publish_interval_sec)
+        w.on_event = self.commands.ack
+        if self.batcher is not None:
+            w.telemetry_sink = self.batcher.add
+        elif drone.topic_prefix in self.binary_prefixes:
+            w.telemetry_encoder = self.encoder.encode
         self.workers[drone.id] = w
         return w
 
+    def _on_state(self, drone_id: str, state):
+        for listener in self.state_listeners:
+            listener(drone_id, state)
+
     def start(self, drone):
         w = self.ensure_worker(drone)
         w.start()
@@ -56,12 +152,89 @@ class FleetManager:
         if w:
             w.stop()
 
-    def publish_cmd(self, topic_prefix: str, drone_id: str, payload: dict):
-        if self.client is None:
+    @property
+    def connected(self) -> bool:
+        """
+        Commandes publiées sur un broker (sinon remises aux seuls simulateurs
+        locaux) ; broker configuré, pas forcément joignable : en file sinon.
+        """
+        return self.client is not None or self.pool is not None
+
+    def forget(self, drone_id: str):
+        """Drone supprimé : plus de worker ni d'état à reprendre."""
+        self.workers.pop(drone_id, None)
+        self.saved.pop(drone_id, None)
+
+    def snapshot(self) -> Dict[str, SavedDrone]:
+        """État de tous les drones locaux (démarrés, arrêtés, ou repris mais pas encore relancés)."""
+        out = dict(self.saved)
+        for drone_id, w in list(self.workers.items()):
+            out[drone_id] = w.saved()
+        return out
+
+    def stop_many(self, drone_ids):
+        # signale tous les workers avant d'attendre : ~1 intervalle au total
+        # au lieu d'un join séquentiel par drone
+        workers = [w for w in (self.workers.get(i) for i in drone_ids) if w]
+        for w in workers:
+            w.stop(wait=False)
+        for w in workers:
+            w.stop()
+
+    def publish_cmd(self, topic_prefix: str, drone_id: str, payload: dict,
+                    timeout: Optional[float] = None, wait: bool = False):
+        """
+        Signe et publie une commande avec un cid (QoS 1), suivie par self.commands.
+        Renvoie (topic, envelope, future) ; future n'est pas None que si wait=True
+        (à appeler depuis la boucle asyncio dans ce cas).
+        Sans broker, un simulateur local reçoit l'enveloppe directement.
+        """
+        local = self.workers.get(drone_id)
+        connected = self.connected
+        if not connected and (local is None or not local.is_running()):
             raise RuntimeError("MQTT client not connected")
 
-        sig = sign(payload, self.cfg["shared_secret"])
+        cid = self.commands.new_cid()
+        payload = {**payload, "cid": cid}
+        t0 = time.perf_counter()
+        sig, raw = self.signer.seal(payload)
+        SIGN.observe(time.perf_counter() - t0)
         envelope = {"sig": sig, "payload": payload}
         topic = f"{topic_prefix}/drone/{drone_id}/commands"
-        self.client.publish(topic, json.dumps(envelope), qos=0)
-        return topic, envelope
\ No newline at end of file
+        fut = self.commands.register(cid, drone_id, payload.get("cmd"), timeout=timeout, wait=wait)
+        try:
+            if connected:
+                self.bus.publish(topic, raw, 1)
+            else:
+                local.handle_message(raw)
+        except Exception as e:
+            self.commands.fail(cid, f"publish failed: {e!r}")
+            raise
+        return topic, envelope, fut
+
+    def publish_event(self, topic_prefix: str, drone_id: str, event: dict):
+        """Event émis par l'API vers un drone (QoS 1, non signé), sur .../events."""
+        self.bus.publish(f"{topic_prefix}/drone/{drone_id}/events", json.dumps(event), 1)
+
+    def shutdown(self):
+        """Arrêt propre (lifespan) : workers, moteur, batch, connexions MQTT."""
+        self.stop_many(list(self.workers))
+        if self.engine is not None:
+            self.engine.shutdown()
+        if self.batcher is not None:
+            self.batcher.shutdown()
+        if self.pool is not None:
+            self.pool.close()
+        if self.client is not None:
+            self.bus.close()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.workers),
+            "running": sum(1 for w in self.workers.values() if w.is_running()),
+            "engine": self.engine.stats() if self.engine is not None else None,
+            "mqtt_pool": self.pool.stats() if self.pool is not None else None,
+            "mqtt": self.bus.link.stats() if self.client is not None else None,
+            "telemetry_batch": self.batcher.stats() if self.batcher is not None else None,
+            "commands_in_flight": self.commands.stats()["in_flight"],
+        }
@@ -0,0 +1,177 @@
+"""
+Métriques Prometheus de fleet-api, exposées sur GET /metrics.
+Prévu pour rester actif en production :
+- les enfants de labels sont liés une fois (à l'import, ou au premier
+  passage d'une route puis gardés dans un dict) : un événement = un
+  observe()/inc() sur un objet existant, sans .labels() ni allocation ;
+- ce qui existe déjà sous forme de compteurs (pool MQTT, commandes,
+  workers, threads) est lu au moment du scrape par un collecteur, sans
+  rien ajouter sur le chemin chaud ;
+- le middleware HTTP est un middleware ASGI brut (pas BaseHTTPMiddleware).
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+_FAST = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+_HTTP = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_LATE = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HTTP_LATENCY = Histogram(
+    "fleet_http_request_duration_seconds", "Durée des requêtes HTTP par route",
+    ["method", "route", "status"], buckets=_HTTP)
+DB_SESSION = Histogram(
+    "fleet_db_session_seconds", "Détention d'une connexion base (checkout -> checkin)",
+    ["kind"], buckets=_HTTP)
+DB_SESSION_ASYNC = DB_SESSION.labels("async")
+DB_SESSION_SYNC = DB_SESSION.labels("sync")
+
+_tick = Histogram(
+    "fleet_tick_duration_seconds",
+    "Durée d'un pas de simulation (par drone ; par lot pour le moteur vector)",
+    ["engine"], buckets=_FAST)
+_late = Histogram(
+    "fleet_tick_lateness_seconds",
+    "Retard d'un pas sur son échéance (par drone ; max du lot pour le moteur vector)",
+    ["engine"], buckets=_LATE)
+TICK = {e: _tick.labels(e) for e in ("thread", "scheduler", "vector")}
+LATE = {e: _late.labels(e) for e in ("thread", "scheduler", "vector")}
+
+SIGN = Histogram("fleet_command_sign_seconds", "Signature d'une commande (HMAC + enveloppe)",
+                 buckets=_FAST)
+_publish = Counter("fleet_mqtt_client_publish_total",
+                   "Publications via le client MQTT du FleetManager", ["result"])
+MQTT_OK = _publish.labels("ok")
+MQTT_FAILED = _publish.labels("failed")
+CONFLICT_PASS = Histogram("fleet_conflict_pass_seconds", "Passe de détection de conflits (flotte entière)",
+                         buckets=_HTTP)
+# init : module main (hors imports) ; lifespan : jusqu'au premier /health servi ;
+# mqtt_connect : lifespan -> première connexion au broker (non bloquante)
+STARTUP = Gauge("fleet_startup_seconds", "Durée du démarrage par phase", ["phase"])
+
+KNOWN_COMMANDS = frozenset({"ping", "takeoff", "land", "goto", "rth", "mission"})
+
+
+# --- HTTP ---
+
+class MetricsMiddleware:
+    """Durée par (méthode, modèle de route, classe de statut) ; route = "/drones/{drone_id}"."""
+
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[Tuple[str, str, str], object] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            key = (scope["method"], path, f"{status[0] // 100}xx")
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = HTTP_LATENCY.labels(*key)
+            child.observe(time.perf_counter() - t0)
+
+
+# --- instantanés lus au scrape ---
+
+class FleetCollector:
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def collect(self):
+        fleet = self.fleet
+        workers = list(fleet.workers.values())
+        g = GaugeMetricFamily("fleet_workers", "Simulateurs locaux", labels=["state"])
+        running = sum(1 for w in workers if w.is_running())
+        g.add_metric(["running"], running)
+        g.add_metric(["stopped"], len(workers) - running)
+        yield g
+        yield GaugeMetricFamily("fleet_threads", "Threads du processus", value=threading.active_count())
+        # mode adaptatif (cf. telemetry_policy.py) : émissions filtrées
+        sent = suppressed = 0
+        for w in workers:
+            gate = w.telemetry_gate
+            if gate is not None:
+                sent += gate.sent
+                suppressed += gate.suppressed
+        c = CounterMetricFamily("fleet_adaptive_telemetry", "Pas des drones en mode adaptatif",
+                                labels=["result"])
+        c.add_metric(["sent"], sent)
+        c.add_metric(["suppressed"], suppressed)
+        yield c
+
+        pool = fleet.pool
+        if pool is not None:
+            conns = pool.stats()["connections"]
+            c = CounterMetricFamily("fleet_mqtt_pool_publish", "Publications du pool MQTT",
+                                    labels=["conn", "result"])
+            q = GaugeMetricFamily("fleet_mqtt_queue_depth", "Messages en attente d'envoi", labels=["conn"])
+            for s in conns:
+                i = str(s["index"])
+                c.add_metric([i, "ok"], s["published"])
+                c.add_metric([i, "failed"], s["failed"])
+                c.add_metric([i, "dropped"], s["dropped"])
+                q.add_metric([i], s["pending"])
+            yield c
+            yield q
+        elif fleet.client is not None:
+            # file interne paho (messages QoS>0 non acquittés / pas encore écrits)
+            q = GaugeMetricFamily("fleet_mqtt_queue_depth", "Messages en attente d'envoi", labels=["conn"])
+            q.add_metric(["client"], len(getattr(fleet.client, "_out_messages", ())))
+            yield q
+        links = fleet.links()
+        if links:
+            up = GaugeMetricFamily("fleet_mqtt_connected", "Connexions MQTT établies", value=sum(
+                1 for link in links if link.connected))
+            c = CounterMetricFamily("fleet_mqtt_link", "Connexions MQTT : (re)connexions, échecs, file hors ligne",
+                                    labels=["event"])
+            for event in ("connects", "failures", "buffered", "dropped"):
+                c.add_metric([event], sum(getattr(link, event) for link in links))
+            yield up
+            yield c
+
+        s = fleet.commands.stats()
+        yield GaugeMetricFamily("fleet_commands_in_flight", "Commandes sans ack", value=s["in_flight"])
+        c = CounterMetricFamily("fleet_commands", "Commandes par type et issue", labels=["cmd", "result"])
+        results = ("sent", "acked", "failed", "timeouts")
+        totals: Dict[str, Dict[str, int]] = {}
+        for cmd, counts in s["commands"].items():
+            # le nom vient du client : borné aux commandes connues (cardinalité)
+            t = totals.setdefault(cmd if cmd in KNOWN_COMMANDS else "other", dict.fromkeys(results, 0))
+            for result in results:  # pas les percentiles (None sans ack)
+                t[result] += counts[result]
+        for cmd, counts in totals.items():
+            for result in results:
+                c.add_metric([cmd, result], counts[result])
+        yield c
+        engine = fleet.engine
+        if engine is not None:
+            yield CounterMetricFamily("fleet_engine_resyncs", "Recalages du moteur (retard > 1 période)",
+                                      value=engine.stats()["resyncs"])
+
+
+_collector: Optional[FleetCollector] = None
+
+
+def register_fleet(fleet):
+    global _collector
+    if _collector is not None:
+        REGISTRY.unregister(_collector)
+    _collector = FleetCollector(fleet)
+    REGISTRY.register(_collector)
@@ -1,7 +1,12 @@
 # Modèles SQLModel (SQLite) + schémas API.
-from typing import Optional, List
+import time
+from typing import Literal, Optional, List, Tuple
+from sqlalchemy import Index, event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Field, SQLModel, create_engine, Session, select
-from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pydantic import BaseModel, Field as PydField
+from metrics import DB_SESSION_ASYNC, DB_SESSION_SYNC
 
 # --- DB models ---
 
@@ -15,10 +20,33 @@ class Drone(SQLModel, table=True):
     cruise_speed_mps: float = 8.0
     battery_drain: float = 0.005
     heading_noise: float = 0.0
+    # émission de la télémétrie (cf. telemetry_policy.py)
+    telemetry_mode: str = "periodic"             # "periodic" | "adaptive"
+    deadband_m: float = 2.0
+    deadband_alt_m: float = 1.0
+    deadband_battery_pct: float = 1.0
+    heartbeat_sec: float = 30.0
+    flying_interval_sec: float = 1.0
     status: str = "stopped"                      # "stopped" | "running"
 
+class TelemetryPoint(SQLModel, table=True):
+    __tablename__ = "telemetry_point"
+    __table_args__ = (Index("ix_telemetry_point_drone_ts", "drone_id", "ts"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    drone_id: str
+    ts: float
+    lat: float
+    lon: float
+    alt: float
+    speed_mps: float
+    battery_pct: float
+    status: str
+
 # --- API schemas ---
 
+TelemetryMode = Literal["periodic", "adaptive"]
+
 class DroneCreate(BaseModel):
     id: str
     topic_prefix: str = "lab"
@@ -29,6 +57,12 @@ class DroneCreate(BaseModel):
     cruise_speed_mps: float = 8.0
     battery_drain: float = 0.005
     heading_noise: float = 0.0
+    telemetry_mode: TelemetryMode = "periodic"
+    deadband_m: float = PydField(2.0, ge=0)
+    deadband_alt_m: float = PydField(1.0, ge=0)
+    deadband_battery_pct: float = PydField(1.0, ge=0)
+    heartbeat_sec: float = PydField(30.0, gt=0)
+    flying_interval_sec: float = PydField(1.0, gt=0)
     
 class DroneUpdate(SQLModel):
     topic_prefix: Optional[str] = None
@@ -39,6 +73,12 @@ class DroneUpdate(SQLModel):
     cruise_speed_mps: Optional[float] = None
     battery_drain: Optional[float] = None
     heading_noise: Optional[float] = None
+    telemetry_mode: Optional[TelemetryMode] = None
+    deadband_m: Optional[float] = PydField(None, ge=0)
+    deadband_alt_m: Optional[float] = PydField(None, ge=0)
+    deadband_battery_pct: Optional[float] = PydField(None, ge=0)
+    heartbeat_sec: Optional[float] = PydField(None, gt=0)
+    flying_interval_sec: Optional[float] = PydField(None, gt=0)
 
 class DroneRead(BaseModel):
     id: str
@@ -50,23 +90,164 @@ class DroneRead(BaseModel):
     cruise_speed_mps: float
     battery_drain: float
     heading_noise: float
+    telemetry_mode: str
+    deadband_m: float
+    deadband_alt_m: float
+    deadband_battery_pct: float
+    heartbeat_sec: float
+    flying_interval_sec: float
+    status: str
+
+class DroneBulkUpdate(DroneUpdate):
+    id: str
+
+class DroneIds(BaseModel):
+    ids: List[str]
+
+class BulkItemResult(BaseModel):
+    id: str
+    ok: bool
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    ok: int
+    failed: int
+    results: List[BulkItemResult]
+
+class DroneHandoff(BaseModel):
+    """État d'un drone passé d'une réplique à l'autre (cf. checkpoint.SavedDrone)."""
+    id: str
     status: str
+    lat: float
+    lon: float
+    alt: float
+    speed_mps: float
+    battery_pct: float
+    heading_deg: float
+    waypoints: List[Tuple[float, float, Optional[float]]] = []
 
 class CommandRequest(BaseModel):
-    cmd: str  # "ping" | "takeoff" | "land" | "goto" | "rth"
+    cmd: str  # "ping" | "takeoff" | "land" | "goto" | "rth" | "mission"
     args: Optional[dict] = None
 
 # --- DB helpers ---
+#
+# - moteur async (AsyncSession) pour les handlers HTTP : sqlite+aiosqlite ;
+# - moteur sync pour les threads de fond (historique de télémétrie) ;
+# - le schéma est créé au démarrage de l'app (init_db), plus à la 1re requête.
 
 _engine = None
+_async_engine = None
+
+def _db_settings() -> dict:
+    from config import get_config
+    return get_config()["db"]
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    # WAL : les lecteurs ne bloquent plus l'écriture (et inversement)
+    db = _db_settings()
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA busy_timeout={int(db['busy_timeout_ms'])}")
+    cur.execute(f"PRAGMA mmap_size={int(db['mmap_size'])}")
+    cur.execute(f"PRAGMA cache_size=-{int(db['cache_size_kb'])}")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+def _time_sessions(engine, child):
+    # durée de détention d'une connexion du pool (checkout -> checkin),
+    # cf. metrics.DB_SESSION
+    def checkout(dbapi_conn, record, proxy):
+        record.info["checkout_t0"] = time.perf_counter()
+
+    def checkin(dbapi_conn, record):
+        t0 = record.info.pop("checkout_t0", None)
+        if t0 is not None:
+            child.observe(time.perf_counter() - t0)
+
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+
+def async_url(database_url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db (les autres URL sont laissées telles quelles)."""
+    if database_url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + database_url[len("sqlite:"):]
+    return database_url
 
 def get_engine(database_url: str):
     global _engine
     if _engine is None:
         _engine = create_engine(database_url, echo=False)
-        SQLModel.metadata.create_all(_engine)
+        if database_url.startswith("sqlite"):
+            event.listen(_engine, "connect", _sqlite_pragmas)
+        _time_sessions(_engine, DB_SESSION_SYNC)
     return _engine
 
+def get_async_engine(database_url: str):
+    global _async_engine
+    if _async_engine is None:
+        db = _db_settings()
+        kwargs = {}
+        # SQLite en mémoire : StaticPool (une seule connexion), qui refuse
+        # les paramètres de dimensionnement
+        if not (database_url.startswith("sqlite") and ":memory:" in database_url):
+            kwargs = dict(pool_size=db["pool_size"], max_overflow=db["max_overflow"],
+                          pool_timeout=db["pool_timeout_sec"])
+        _async_engine = create_async_engine(async_url(database_url), echo=False, **kwargs)
+        if database_url.startswith("sqlite"):
+            event.listen(_async_engine.sync_engine, "connect", _sqlite_pragmas)
+        _time_sessions(_async_engine.sync_engine, DB_SESSION_ASYNC)
+    return _async_engine
+
+def add_missing_columns(conn) -> List[str]:
+    """
+    Migration minimale des bases existantes : create_all ne crée que les
+    tables absentes, les colonnes ajoutées depuis (ex: politique de
+    télémétrie de Drone) le sont ici par ALTER TABLE ... ADD COLUMN, avec la
+    valeur par défaut du modèle. Renvoie les colonnes ajoutées ("table.col").
+    """
+    insp = inspect(conn)
+    added = []
+    for table in SQLModel.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(conn.dialect)}"
+            default = col.default.arg if col.default is not None and col.default.is_scalar else None
+            if default is not None:
+                ddl += " DEFAULT " + (repr(default) if isinstance(default, str) else str(default))
+            elif not col.nullable:
+                continue  # pas de valeur pour les lignes existantes : laissé à une vraie migration
+            conn.execute(text(ddl))
+            added.append(f"{table.name}.{col.name}")
+    return added
+
+async def init_db(database_url: str):
+    """Création du schéma (et colonnes manquantes), appelée une fois au démarrage (lifespan)."""
+    async with get_async_engine(database_url).begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        added = await conn.run_sync(add_missing_columns)
+    if added:
+        print(f"[db] added columns: {', '.join(added)}")
+
+async def dispose_db():
+    global _async_engine, _engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:  # moteur sync des threads de fond (historique)
+        _engine.dispose()
+        _engine = None
+
 def get_session(database_url: str) -> Session:
     engine = get_engine(database_url)
     return Session(engine)
+
+def get_async_session(database_url: str) -> AsyncSession:
+    # expire_on_commit=False : les objets restent lisibles après commit
+    # sans nouvel aller-retour (pas de lazy-load en async)
+    return AsyncSession(get_async_engine(database_url), expire_on_commit=False)
@@ -0,0 +1,142 @@
+"""
+Registre en mémoire de la configuration des drones : source des lectures API.
+- chargé depuis la base au démarrage (load), puis tenu à jour par les
+  écritures de l'API en write-through (base d'abord, mémoire ensuite) ;
+- chaque drone garde sa réponse JSON pré-sérialisée et un numéro de version,
+  la collection a le sien : ETag / If-None-Match sans accès base ni
+  re-sérialisation ;
+- le statut "running"/"stopped" vient des workers (status_fn) : touch()
+  invalide la réponse d'un drone quand il démarre ou s'arrête.
+Utilisé uniquement depuis la boucle asyncio : pas de verrou de lecture, les
+écritures sont sérialisées par write_lock.
+"""
+
+import asyncio
+import bisect
+import json
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlmodel import select
+
+from models import Drone, DroneRead, get_async_session
+
+FIELDS = tuple(DroneRead.model_fields)
+
+
+class _Entry:
+    __slots__ = ("drone", "version", "body")
+
+    def __init__(self, drone: Drone, version: int):
+        self.drone = drone
+        self.version = version
+        self.body: Optional[bytes] = None
+
+
+class DroneRegistry:
+    def __init__(self, database_url: str, status_fn: Callable[[str], str]):
+        self.database_url = database_url
+        self.status_fn = status_fn
+        self.write_lock = asyncio.Lock()
+        self.loaded = False
+
+        self._entries: Dict[str, _Entry] = {}
+        self._ids: List[str] = []  # triés : pagination par clé
+        self.version = 0
+        self._list_body: Optional[bytes] = None
+        self._list_version = -1
+        # distingue les versions d'un processus à l'autre (ETag gardés par les clients)
+        self._epoch = format(int(time.time()), "x")
+
+        self.hits = 0
+        self.renders = 0
+
+    # --- chargement ---
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await self.load()
+
+    async def load(self):
+        async with self.write_lock:
+            async with get_async_session(self.database_url) as s:
+                rows = (await s.exec(select(Drone))).all()
+            self._entries.clear()
+            for d in rows:
+                self.version += 1
+                self._entries[d.id] = _Entry(d, self.version)
+            self._ids = sorted(self._entries)
+            self.loaded = True
+
+    # --- lecture ---
+
+    def __contains__(self, drone_id: str) -> bool:
+        return drone_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, drone_id: str) -> Optional[Drone]:
+        e = self._entries.get(drone_id)
+        return e.drone if e else None
+
+    def row(self, drone_id: str) -> dict:
+        d = self._entries[drone_id].drone
+        out = {f: getattr(d, f) for f in FIELDS}
+        out["status"] = self.status_fn(drone_id)
+        return out
+
+    def body(self, drone_id: str) -> Optional[Tuple[bytes, str]]:
+        """(JSON pré-sérialisé, ETag) d'un drone, ou None s'il est inconnu."""
+        e = self._entries.get(drone_id)
+        if e is None:
+            return None
+        if e.body is None:
+            e.body = json.dumps(self.row(drone_id)).encode()
+            self.renders += 1
+        else:
+            self.hits += 1
+        return e.body, f'"{self._epoch}-d{e.version}"'
+
+    def list_body(self) -> Tuple[bytes, str]:
+        """Toute la flotte, triée par id ; reconstruite seulement après un changement."""
+        if self._list_version != self.version:
+            self._list_body = b"[" + b",".join(self.body(i)[0] for i in self._ids) + b"]"
+            self._list_version = self.version
+        else:
+            self.hits += 1
+        return self._list_body, self.etag()
+
+    def etag(self) -> str:
+        return f'"{self._epoch}-c{self.version}"'
+
+    def ids_after(self, after: Optional[str]) -> Iterator[str]:
+        start = 0 if after is None else bisect.bisect_right(self._ids, after)
+        ids = self._ids
+        for k in range(start, len(ids)):
+            yield ids[k]
+
+    # --- écriture (après commit en base) ---
+
+    def put(self, drone: Drone):
+        self.version += 1
+        if drone.id not in self._entries:
+            bisect.insort(self._ids, drone.id)
+        self._entries[drone.id] = _Entry(drone, self.version)
+
+    def remove(self, drone_id: str):
+        if self._entries.pop(drone_id, None) is not None:
+            del self._ids[bisect.bisect_left(self._ids, drone_id)]
+            self.version += 1
+
+    def touch(self, drone_id: str):
+        """Le statut calculé a changé (start/stop) : nouvelle version."""
+        e = self._entries.get(drone_id)
+        if e is not None:
+            self.version += 1
+            e.version = self.version
+            e.body = None
+
+    def stats(self) -> dict:
+        return {"drones": len(self._entries), "version": self.version,
+                "hits": self.hits, "renders": self.renders}
@@ -1,10 +1,125 @@
-# HMAC signature pour sécuriser les commandes (même logique que l'agent).
-import hmac, hashlib, json
+"""
+Signature HMAC-SHA256 des commandes, partagée par fleet-api, l'agent drone
+et tools/. Ce fichier est dupliqué dans agents/drone/security.py.
+
+Format (inchangé) : sig = hex(HMAC(secret, json canonique du payload)),
+json canonique = clés triées, séparateurs compacts ; enveloppe
+{"sig": ..., "payload": {...}}.
+
+Chemin rapide :
+- Signer précalcule l'état HMAC après la clé et le copie par message
+  (pas de re-hachage de la clé ni de hmac.new à chaque appel) ;
+- l'encodeur JSON canonique est construit une fois (json.dumps avec
+  options en recrée un à chaque appel) ;
+- seal() écrit l'enveloppe avec le payload déjà canonique :
+  unseal() vérifie alors la signature sur les octets reçus, sans
+  re-sérialiser le payload décodé. Les enveloppes d'autres émetteurs
+  (outils, anciennes versions) passent par le chemin générique.
+"""
+
+import hashlib
+import hmac
+import json
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+_canonical = json.JSONEncoder(separators=(",", ":"), sort_keys=True).encode
+_decode = json.JSONDecoder().decode
+
+_HEAD = b'{"sig":"'
+_MID = b'","payload":'
+_SIG_LEN = 64  # hexdigest sha256
+_BODY_AT = len(_HEAD) + _SIG_LEN + len(_MID)
+
+
+def canonical(payload: dict) -> bytes:
+    return _canonical(payload).encode()
+
+
+class Signer:
+    def __init__(self, secret: str):
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+    # --- signature ---
+
+    def sign_bytes(self, body: bytes) -> str:
+        m = self._mac.copy()
+        m.update(body)
+        return m.hexdigest()
+
+    def sign(self, payload: dict) -> str:
+        return self.sign_bytes(canonical(payload))
+
+    def sign_many(self, payloads: Iterable[dict]) -> List[str]:
+        base, enc = self._mac, _canonical
+        out = []
+        for p in payloads:
+            m = base.copy()
+            m.update(enc(p).encode())
+            out.append(m.hexdigest())
+        return out
+
+    def seal(self, payload: dict) -> Tuple[str, bytes]:
+        """(sig, enveloppe JSON prête à publier), payload au format canonique."""
+        body = canonical(payload)
+        sig = self.sign_bytes(body)
+        return sig, b"".join((_HEAD, sig.encode(), _MID, body, b"}"))
+
+    def seal_many(self, payloads: Iterable[dict]) -> List[Tuple[str, bytes]]:
+        return [self.seal(p) for p in payloads]
+
+    # --- vérification ---
+
+    def verify_bytes(self, body: bytes, signature: str) -> bool:
+        if not isinstance(signature, str) or not signature.isascii():
+            return False
+        return hmac.compare_digest(self.sign_bytes(body), signature)
+
+    def verify(self, payload: dict, signature: str) -> bool:
+        return self.verify_bytes(canonical(payload), signature)
+
+    def verify_many(self, items: Iterable[Tuple[bytes, str]]) -> List[bool]:
+        """[(octets signés, sig)] -> [bool] ; pour un lot reçu d'un coup."""
+        return [self.verify_bytes(body, sig) for body, sig in items]
+
+    def unseal(self, raw: bytes) -> Tuple[Optional[dict], bool]:
+        """
+        Enveloppe brute -> (payload, signature valide).
+        payload None : enveloppe illisible (JSON invalide, sig/payload absents).
+        """
+        if (raw[:len(_HEAD)] == _HEAD and raw[_BODY_AT - len(_MID):_BODY_AT] == _MID
+                and raw[-1:] == b"}"):
+            # chemin rapide : la signature porte sur ces octets exacts
+            body = raw[_BODY_AT:-1]
+            try:
+                payload = _decode(body.decode())
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict):
+                sig = raw[len(_HEAD):len(_HEAD) + _SIG_LEN].decode("ascii", "replace")
+                if self.verify_bytes(body, sig):
+                    return payload, True
+                # sinon : chemin générique (sig échappée, payload non canonique...)
+        try:
+            data = _decode(raw.decode() if isinstance(raw, (bytes, bytearray)) else raw)
+        except ValueError:
+            return None, False
+        if not isinstance(data, dict):
+            return None, False
+        payload, sig = data.get("payload"), data.get("sig")
+        if not isinstance(payload, dict) or not isinstance(sig, str):
+            return None, False
+        return payload, self.verify(payload, sig)
+
+
+@lru_cache(maxsize=16)
+def signer_for(secret: str) -> Signer:
+    return Signer(secret)
+
 
 def sign(payload: dict, secret: str) -> str:
-    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
-    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return signer_for(secret).sign(payload)
+
 
 def verify(payload: dict, signature: str, secret: str) -> bool:
-    expected = sign(payload, secret)
-    return hmac.compare_digest(expected, signature)
+    return signer_for(secret).verify(payload, signature)
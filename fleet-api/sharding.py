@@ -0,0 +1,143 @@
+"""
+Répartition des drones simulés entre plusieurs répliques de fleet-api.
+- anneau de hachage cohérent (HashRing) : vnodes points par réplique,
+  hachage blake2b stable d'un processus à l'autre ; l'ajout ou le retrait
+  d'une réplique ne déplace que ~1/N des drones ;
+- ShardMap : nom de cette réplique, membres (nom -> URL de base de l'API),
+  propriétaire d'un drone ;
+- BrokerMembership : découverte des répliques par le broker, chaque
+  réplique publie son URL en message retenu sur
+  {prefix}/fleet-api/members/{nom} (vidé par son last will en cas de
+  perte de connexion) et s'abonne aux autres.
+Le rééquilibrage (arrêt des drones partis, passation de leur état au
+nouveau propriétaire, démarrage des drones arrivés) et le relais HTTP des
+requêtes start/stop/cmd sont dans main.py.
+"""
+
+import bisect
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import paho.mqtt.client as mqtt
+
+FORWARDED_HEADER = "x-fleet-forwarded-by"
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, members: Iterable[str] = (), vnodes: int = 64):
+        self.vnodes = vnodes
+        self.members: List[str] = sorted(set(members))
+        points = sorted((_hash(f"{m}#{v}"), m) for m in self.members for v in range(vnodes))
+        self._keys = [h for h, _ in points]
+        self._owners = [m for _, m in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        i = bisect.bisect(self._keys, _hash(key))
+        return self._owners[i % len(self._owners)]
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+def parse_members(raw: str) -> Dict[str, str]:
+    """ "nom=url,nom=url" -> {nom: url} (SHARD_MEMBERS)."""
+    out = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if item:
+            name, _, url = item.partition("=")
+            out[name.strip()] = url.strip().rstrip("/")
+    return out
+
+
+class ShardMap:
+    def __init__(self, name: str, url: str, members: Optional[Dict[str, str]] = None, vnodes: int = 64):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.vnodes = vnodes
+        self.members: Dict[str, str] = {}
+        self.ring = HashRing(vnodes=vnodes)
+        self.changes = 0
+        self.set_members(members or {name: self.url})
+
+    def set_members(self, members: Dict[str, str]) -> bool:
+        """Nouvelle liste de membres (cette réplique toujours incluse) ; True si elle a changé."""
+        members = {**members, self.name: self.url}
+        if members == self.members:
+            return False
+        # anneau reconstruit puis remplacé d'un bloc : lu sans verrou
+        self.ring = HashRing(members, self.vnodes)
+        self.members = members
+        self.changes += 1
+        return True
+
+    def owner(self, drone_id: str) -> str:
+        return self.ring.owner(drone_id)
+
+    def is_local(self, drone_id: str) -> bool:
+        return self.ring.owner(drone_id) == self.name
+
+    def url_of(self, name: str) -> str:
+        return self.members[name]
+
+    def stats(self) -> dict:
+        return {"name": self.name, "members": dict(self.members), "changes": self.changes}
+
+
+class BrokerMembership:
+    def __init__(self, host: str, port: int, topic_prefix: str, name: str, url: str,
+                 on_change: Callable[[Dict[str, str]], None]):
+        self.host = host
+        self.port = port
+        self.topic = f"{topic_prefix}/fleet-api/members"
+        self.name = name
+        self.url = url
+        self.on_change = on_change  # appelé depuis le thread réseau paho
+        self.members: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.client = mqtt.Client(client_id=f"fleet-api-members-{name}-{os.getpid()}")
+        # perte de connexion : le broker efface notre présence pour les autres
+        self.client.will_set(f"{self.topic}/{name}", b"", qos=1, retain=True)
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+
+    def start(self):
+        self.client.connect_async(self.host, self.port, keepalive=15)
+        self.client.loop_start()
+
+    def stop(self):
+        # départ propre : retrait immédiat plutôt qu'après le keepalive
+        info = self.client.publish(f"{self.topic}/{self.name}", b"", qos=1, retain=True)
+        try:
+            info.wait_for_publish(timeout=2.0)
+        except Exception:
+            pass
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        print(f"[BrokerMembership] MQTT connected rc={rc}")
+        client.subscribe(f"{self.topic}/+", qos=1)
+        client.publish(f"{self.topic}/{self.name}", self.url.encode(), qos=1, retain=True)
+
+    def _on_message(self, client, userdata, msg):
+        name = msg.topic.rsplit("/", 1)[-1]
+        url = msg.payload.decode(errors="replace").strip()
+        with self._lock:
+            if url:
+                self.members[name] = url.rstrip("/")
+            else:
+                self.members.pop(name, None)
+            members = dict(self.members)
+        try:
+            self.on_change(members)
+        except Exception as e:
+            print(f"[BrokerMembership] on_change failed: {e}")
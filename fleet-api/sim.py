@@ -1,15 +1,23 @@
 """
-Boucle simulateur d'UN drone : tourne dans un thread.
-- Publie la télémétrie périodiquement.
+Boucle simulateur d'UN drone : tourne dans un thread (DroneWorker)
+ou est cadencé par le planificateur commun (voir engine.py).
+- Publie la télémétrie périodiquement (ou sur changement, cf. telemetry_policy.py).
 - S'abonne aux commandes sur .../commands et vérifie la signature HMAC.
-- Met à jour l'état (takeoff/land/goto/rth/ping).
+- Met à jour l'état (takeoff/land/goto/rth/mission/ping) ; les déplacements
+  sont des segments analytiques (trajectory.py) évalués à chaque pas.
+- Acquitte les commandes portant un cid (event "ack" sur .../events).
 """
 
 import time, json, threading, math, random
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Callable, Optional
 import paho.mqtt.client as mqtt
-from security import verify
+from security import signer_for
+from bus import ClientBus, NullBus
+from trajectory import Trajectory
+from telemetry_policy import TelemetryGate
+from checkpoint import SavedDrone
+import metrics
 
 @dataclass
 class DroneState:
@@ -23,7 +31,9 @@ class DroneState:
 
 def move_towards(state: DroneState, target_lat: float, target_lon: float,
                  dt: float, speed_mps: float,
-                 drain_factor: float, noise_deg: float):
+                 drain_factor: float, noise_deg: float, rng=None):
+    """rng : générateur optionnel exposant uniform(a, b) (random.Random,
+    numpy.random.Generator...) pour un bruit de cap reproductible."""
     dlat = target_lat - state.lat
     dlon = target_lon - state.lon
     dist = math.hypot(dlat, dlon)
@@ -40,42 +50,46 @@ def move_towards(state: DroneState, target_lat: float, target_lon: float,
         state.speed_mps = speed_mps
     hdg = (math.degrees(math.atan2(dlon, dlat)) + 360) % 360
     if noise_deg:
-        hdg = (hdg + random.uniform(-noise_deg, noise_deg)) % 360
+        hdg = (hdg + (rng or random).uniform(-noise_deg, noise_deg)) % 360
     state.heading_deg = hdg
     state.battery_pct = max(0.0, state.battery_pct - drain_factor * speed_mps * dt)
 
-class DroneWorker:
+class DroneSimulator:
     """
-    Un worker = un simulateur de drone isolé,
-    alimenté par des paramètres (caractéristiques) et lié à un broker MQTT.
+    Coeur de simulation d'un drone, sans thread ni client MQTT :
+    état, application des commandes signées et calcul d'un pas de temps.
+    Les messages sortent par `bus` (interface de bus.py : publish,
+    subscribe, unsubscribe) ; NullBus si aucun n'est fourni.
     """
     def __init__(
         self,
         drone_id: str,
         topic_prefix: str,
-        mqtt_host: str,
-        mqtt_port: int,
         shared_secret: str,
         start_lat: float, start_lon: float, start_alt: float,
         publish_interval_sec: float,
         cruise_speed_mps: float,
         battery_drain: float,
         heading_noise: float,
+        bus=None,
     ):
+        self.bus = bus if bus is not None else NullBus()
         self.drone_id = drone_id
         self.topic_prefix = topic_prefix
-        self.mqtt_host = mqtt_host
-        self.mqtt_port = mqtt_port
         self.shared_secret = shared_secret
+        self.signer = signer_for(shared_secret)  # état HMAC partagé par secret
         self.publish_interval = publish_interval_sec
         self.cruise_speed = cruise_speed_mps
         self.battery_drain = battery_drain
         self.heading_noise = heading_noise
 
         self.state = DroneState(lat=start_lat, lon=start_lon, alt=start_alt)
-        self._waypoint: Optional[Tuple[float, float]] = None
-        self._running = threading.Event()
-        self._thread: Optional[threading.Thread] = None
+        self.home = (start_lat, start_lon)
+        # goto / rth / mission : segments analytiques évalués au temps simulé
+        # (self.t, avancé d'un publish_interval par pas), cf. trajectory.py
+        self.trajectory = Trajectory()
+        self.t = 0.0
+        self._t_clock: Optional[float] = None  # self.clock() au dernier pas
 
         # Topics
         self.base = f"{self.topic_prefix}/drone/{self.drone_id}"
@@ -83,95 +97,276 @@ class DroneWorker:
         self.t_events = f"{self.base}/events"
         self.t_commands = f"{self.base}/commands"
 
-        # MQTT client
-        self.client = mqtt.Client(client_id=self.drone_id)   # paho 1.x
-        self.client.on_connect = self._on_connect
-        self.client.on_message = self._on_message
+        # Si défini (mode batch, cf. telemetry.TelemetryBatcher), reçoit
+        # (topic_prefix, payload) au lieu d'une publication par drone.
+        self.telemetry_sink: Optional[Callable[[str, dict], None]] = None
+        # Si défini, encode le payload (ex: codec binaire) à la place de json.dumps.
+        self.telemetry_encoder: Optional[Callable[[dict], bytes]] = None
+        # Si défini, appelé avec (drone_id, state) après chaque pas (index spatial...).
+        self.on_state: Optional[Callable[[str, DroneState], None]] = None
+        # Si défini, reçoit les events émis (acks de commandes) sans passer par le broker.
+        self.on_event: Optional[Callable[[dict], None]] = None
+        # Horodatage de la télémétrie et des events ; horloge virtuelle en mode headless.
+        self.clock: Callable[[], float] = time.time
+        # Générateur du bruit de cap (random.Random / numpy Generator) ; None = module random.
+        self.rng = None
+        # Si défini (mode adaptatif, cf. telemetry_policy.py), filtre les émissions inchangées.
+        self.telemetry_gate: Optional[TelemetryGate] = None
 
-    # --- MQTT callbacks ---
+    def _publish(self, topic: str, payload: str, qos: int = 0):
+        self.bus.publish(topic, payload, qos)
 
-    def _on_connect(self, client, userdata, flags, rc):
-        print(f"[{self.drone_id}] MQTT connected rc={rc}")
-        client.subscribe(self.t_commands)
-        client.publish(self.t_events, json.dumps({
-            "type": "status", "message": "connected", "ts": time.time()
-        }), qos=1)
+    # --- commandes ---
 
-    def _on_message(self, client, userdata, msg):
-        try:
-            data = json.loads(msg.payload.decode())
-        except Exception as e:
-            print(f"[{self.drone_id}] invalid JSON cmd: {e}")
-            return
-        sig = data.get("sig")
-        payload = data.get("payload")
-        if not isinstance(payload, dict) or not isinstance(sig, str):
-            print(f"[{self.drone_id}] missing payload/sig")
+    def handle_message(self, raw: bytes):
+        payload, valid = self.signer.unseal(raw)
+        if payload is None:
+            print(f"[{self.drone_id}] invalid cmd envelope (JSON, payload/sig)")
             return
-        if not verify(payload, sig, self.shared_secret):
+        cid = payload.get("cid")  # corrélation (cf. fleet-api/commands.py)
+        cmd = payload.get("cmd")
+        if not valid:
             print(f"[{self.drone_id}] signature invalid")
+            self.ack(cid, cmd, False, "signature invalid")
             return
 
-        cmd = payload.get("cmd")
         args = payload.get("args") or {}
         print(f"[{self.drone_id}] CMD {cmd} {args}")
+        try:
+            self.apply_command(cmd, args)
+        except Exception as e:
+            # args manquants / invalides : refusée, sans remonter dans le thread réseau
+            print(f"[{self.drone_id}] cmd {cmd} failed: {e!r}")
+            self.ack(cid, cmd, False, f"{type(e).__name__}: {e}")
+            return
+        self.ack(cid, cmd, True)
+
+    def ack(self, cid, cmd, ok: bool, error: Optional[str] = None):
+        """Accusé de réception sur .../events (seulement si la commande porte un cid)."""
+        if not isinstance(cid, str):
+            return
+        event = {"type": "ack", "cid": cid, "cmd": cmd, "ok": ok, "error": error, "ts": self.clock()}
+        if self.on_event is not None:
+            self.on_event(event)
+        self._publish(self.t_events, json.dumps(event), 1)
 
+    def apply_command(self, cmd: str, args: dict):
         if cmd == "ping":
-            client.publish(self.t_events, json.dumps({"type": "pong", "ts": time.time()}))
+            self._publish(self.t_events, json.dumps({"type": "pong", "ts": self.clock()}))
         elif cmd == "takeoff":
             self.state.status = "flying"
             self.state.alt = max(self.state.alt, float(args.get("alt", 10.0)))
         elif cmd == "land":
             self.state.status = "landing"
             self.state.alt = 0.0
-            self._waypoint = None
+            self._hold()
         elif cmd == "goto":
+            wp = (float(args["lat"]), float(args["lon"]), None)
             self.state.status = "flying"
-            self._waypoint = (float(args["lat"]), float(args["lon"]))
             self.state.alt = float(args.get("alt", self.state.alt))
+            self._fly([wp])
         elif cmd == "rth":
-            # "home" = point de départ initial (on n'a pas stocké à part : c'est l'état actuel si tu veux)
-            # Pour un vrai RTH, tu peux stocker start_lat/lon comme attributs et les réutiliser ici.
-            pass
+            # Return-To-Home : retour au point de départ (start_lat/lon)
+            self.state.status = "flying"
+            self._fly([(self.home[0], self.home[1], None)])
+        elif cmd == "mission":
+            # {"waypoints": [{"lat", "lon", "alt"?}, ...], "append": false}
+            wps = [(float(w["lat"]), float(w["lon"]), float(w["alt"]) if "alt" in w else None)
+                   for w in args["waypoints"]]
+            if not wps:
+                raise ValueError("empty mission")
+            append = bool(args.get("append")) and self.state.status == "flying"
+            self.state.status = "flying"
+            self._fly(wps, append)
+        else:
+            raise ValueError(f"unknown cmd {cmd!r}")
+
+    # --- trajectoire ---
+
+    def _fly(self, waypoints, append: bool = False):
+        traj, st = self.trajectory, self.state
+        if append and traj and not traj.done(self.t):
+            traj.append(waypoints, self.cruise_speed, self.battery_drain)
+        else:
+            traj.plan(self.t, st.lat, st.lon, st.battery_pct, waypoints, self.cruise_speed, self.battery_drain)
+
+    def _hold(self):
+        self.trajectory.clear()
+        self.state.speed_mps = 0.0
+
+    def _sim_time(self, ts: float) -> float:
+        """Horodatage (self.clock) -> temps simulé."""
+        last = self._t_clock if self._t_clock is not None else self.clock()
+        return self.t + (ts - last)
+
+    def state_at(self, ts: float) -> DroneState:
+        """État à un instant quelconque (passé récent ou futur de la mission en cours), sans avancer."""
+        st = self.state
+        out = DroneState(lat=st.lat, lon=st.lon, alt=st.alt, speed_mps=st.speed_mps,
+                         battery_pct=st.battery_pct, status=st.status, heading_deg=st.heading_deg)
+        sample = self.trajectory.at(self._sim_time(ts)) if st.status == "flying" else None
+        if sample is not None:
+            out.lat, out.lon, out.speed_mps = sample.lat, sample.lon, sample.speed_mps
+            out.battery_pct, out.heading_deg = sample.battery_pct, sample.heading_deg
+            if sample.alt is not None:
+                out.alt = sample.alt
+            if self.trajectory.done(self._sim_time(ts)):
+                out.status = "idle"
+        return out
+
+    def mission(self, ts: float) -> list:
+        """Segments restants à l'instant ts, horodatés comme self.clock."""
+        t = self._sim_time(ts)
+        offset = ts - t
+        return [{**seg.as_dict(), "t0": seg.t0 + offset, "t1": seg.t1 + offset}
+                for seg in self.trajectory.remaining(t)]
+
+    # --- point de reprise (cf. checkpoint.py) ---
+
+    def saved(self) -> SavedDrone:
+        """État courant et waypoints restants, de quoi reprendre la mission ailleurs."""
+        st = self.state
+        wps = []
+        if st.status == "flying":
+            wps = [(seg.lat1, seg.lon1, seg.alt) for seg in self.trajectory.remaining(self.t)]
+        return SavedDrone(st.status, st.lat, st.lon, st.alt, st.speed_mps, st.battery_pct,
+                          st.heading_deg, wps)
+
+    def resume_from(self, saved: SavedDrone):
+        """Reprend un état sauvegardé (avant start) ; la mission restante repart de la position."""
+        st = self.state
+        st.lat, st.lon, st.alt = saved.lat, saved.lon, saved.alt
+        st.speed_mps, st.battery_pct, st.heading_deg = saved.speed_mps, saved.battery_pct, saved.heading_deg
+        st.status = saved.status
+        if saved.waypoints:
+            st.status = "flying"
+            self._fly(list(saved.waypoints))
+
+    # --- pas de simulation ---
+
+    def step(self):
+        self.t += self.publish_interval
+        self._t_clock = self.clock()
+        traj, st = self.trajectory, self.state
+        if st.status != "flying" or not traj:
+            return  # au repos : rien à calculer
+        sample = traj.at(self.t)
+        st.lat, st.lon, st.speed_mps, st.battery_pct = sample.lat, sample.lon, sample.speed_mps, sample.battery_pct
+        if sample.alt is not None:
+            st.alt = sample.alt
+        hdg = sample.heading_deg
+        if self.heading_noise:
+            hdg = (hdg + (self.rng or random).uniform(-self.heading_noise, self.heading_noise)) % 360
+        st.heading_deg = hdg
+        if traj.done(self.t):
+            traj.clear()
+            st.status = "idle"
+
+    def telemetry(self) -> dict:
+        return {
+            "drone_id": self.drone_id,
+            "ts": self.clock(),
+            "position": {"lat": self.state.lat, "lon": self.state.lon, "alt": self.state.alt},
+            "speed_mps": self.state.speed_mps,
+            "battery_pct": self.state.battery_pct,
+            "status": self.state.status,
+            "heading_deg": self.state.heading_deg,
+        }
+
+    def tick(self):
+        """Avance d'un pas (dt = publish_interval) puis publie la télémétrie."""
+        self.step()
+        self.publish_state(self.state, self.telemetry())
+
+    def publish_state(self, state, record: dict):
+        if self.on_state is not None:
+            self.on_state(self.drone_id, state)
+        gate = self.telemetry_gate
+        if gate is not None and not gate.should_publish(
+                record["ts"], state.lat, state.lon, state.alt, state.battery_pct, state.status):
+            return
+        if self.telemetry_sink is not None:
+            self.telemetry_sink(self.topic_prefix, record)
+        elif self.telemetry_encoder is not None:
+            self._publish(self.t_telemetry, self.telemetry_encoder(record), 0)
         else:
-            print(f"[{self.drone_id}] unknown cmd")
+            self._publish(self.t_telemetry, json.dumps(record), 0)
+
+
+class DroneWorker(DroneSimulator):
+    """
+    Un worker = un simulateur de drone isolé,
+    alimenté par des paramètres (caractéristiques) et lié à un broker MQTT.
+    Mode historique : un thread et une connexion MQTT par drone,
+    ou un thread par drone sur un bus partagé (pool de connexions).
+    """
+    def __init__(
+        self,
+        drone_id: str,
+        topic_prefix: str,
+        mqtt_host: str,
+        mqtt_port: int,
+        shared_secret: str,
+        start_lat: float, start_lon: float, start_alt: float,
+        publish_interval_sec: float,
+        cruise_speed_mps: float,
+        battery_drain: float,
+        heading_noise: float,
+        bus=None,
+    ):
+        # MQTT client (sauf si un bus partagé est fourni, cf. bus.MqttPool)
+        self.client = None
+        if bus is None:
+            self.client = mqtt.Client(client_id=drone_id)   # paho 1.x
+            bus = ClientBus(self.client)
+        super().__init__(
+            drone_id=drone_id,
+            topic_prefix=topic_prefix,
+            shared_secret=shared_secret,
+            start_lat=start_lat, start_lon=start_lon, start_alt=start_alt,
+            publish_interval_sec=publish_interval_sec,
+            cruise_speed_mps=cruise_speed_mps,
+            battery_drain=battery_drain,
+            heading_noise=heading_noise,
+            bus=bus,
+        )
+        self.mqtt_host = mqtt_host
+        self.mqtt_port = mqtt_port
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
 
     # --- loop ---
 
     def _loop(self):
-        self.client.connect(self.mqtt_host, self.mqtt_port, keepalive=30)
-        self.client.loop_start()
+        if self.client is not None:
+            # pas de connexion bloquante : le drone vole broker absent,
+            # son event "connected" attend en file (cf. bus.Link)
+            self.bus.connect(self.mqtt_host, self.mqtt_port, keepalive=30)
+        self.bus.subscribe(self.t_commands, self.handle_message)
+        self._publish(self.t_events, json.dumps({
+            "type": "status", "message": "connected", "ts": time.time()
+        }), 1)
         self._running.set()
 
+        tick_h, late_h = metrics.TICK["thread"], metrics.LATE["thread"]
+        deadline = time.monotonic()
         try:
             while self._running.is_set():
-                if self.state.status == "flying" and self._waypoint is not None:
-                    move_towards(
-                        self.state, self._waypoint[0], self._waypoint[1],
-                        dt=self.publish_interval,
-                        speed_mps=self.cruise_speed,
-                        drain_factor=self.battery_drain,
-                        noise_deg=self.heading_noise
-                    )
-                    # arrivé ?
-                    if abs(self.state.lat - self._waypoint[0]) < 1e-5 and abs(self.state.lon - self._waypoint[1]) < 1e-5:
-                        self._waypoint = None
-                        self.state.status = "idle"
-
-                payload = {
-                    "drone_id": self.drone_id,
-                    "ts": time.time(),
-                    "position": {"lat": self.state.lat, "lon": self.state.lon, "alt": self.state.alt},
-                    "speed_mps": self.state.speed_mps,
-                    "battery_pct": self.state.battery_pct,
-                    "status": self.state.status,
-                    "heading_deg": self.state.heading_deg,
-                }
-                self.client.publish(self.t_telemetry, json.dumps(payload), qos=0)
-                time.sleep(self.publish_interval)
+                start = time.monotonic()
+                late_h.observe(start - deadline if start > deadline else 0.0)
+                self.tick()
+                now = time.monotonic()
+                tick_h.observe(now - start)
+                # échéances fixes (la durée du pas ne décale pas la cadence),
+                # recalage sur "maintenant" au-delà d'une période de retard
+                deadline += self.publish_interval
+                if deadline < now:
+                    deadline = now + self.publish_interval
+                time.sleep(deadline - now)
         finally:
-            self.client.loop_stop()
-            self.client.disconnect()
+            self.bus.unsubscribe(self.t_commands)
+            if self.client is not None:
+                self.bus.close()
             print(f"[{self.drone_id}] stopped")
 
     # --- public API ---
@@ -182,9 +377,9 @@ class DroneWorker:
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
-    def stop(self):
+    def stop(self, wait: bool = True):
         self._running.clear()
-        if self._thread:
+        if wait and self._thread:
             self._thread.join(timeout=2.0)
 
     def is_running(self) -> bool:
@@ -0,0 +1,201 @@
+"""
+Index spatial des positions courantes des drones (grille uniforme lat/lon).
+- update() : O(1) — au pire le drone change de case (retrait + ajout dans un set).
+- bbox()   : ne parcourt que les cases recouvertes (ou les cases occupées si
+  elles sont moins nombreuses).
+- radius() : bbox englobante puis filtre par distance haversine.
+- nearest(): k plus proches voisins par anneaux de cases concentriques,
+  arrêté dès que le k-ième candidat est plus proche que l'anneau suivant.
+Alimenté par la télémétrie ingérée et par les simulateurs locaux.
+"""
+
+import heapq
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+EARTH_RADIUS_M = 6_371_000.0
+M_PER_DEG = 111_195.0  # 1° de latitude (sphère de rayon EARTH_RADIUS_M)
+
+Cell = Tuple[int, int]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    def __init__(self, cell_deg: float = 0.01):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._pos: Dict[str, Tuple[float, float, Cell]] = {}
+        self._lock = threading.Lock()
+        # étendue des cases déjà occupées (borne d'arrêt de nearest)
+        self._extent: Optional[List[int]] = None
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        c = self.cell_deg
+        return (math.floor(lat / c), math.floor(lon / c))
+
+    # --- mises à jour ---
+
+    def update(self, drone_id: str, lat: float, lon: float):
+        cell = self._cell(lat, lon)
+        with self._lock:
+            prev = self._pos.get(drone_id)
+            if prev is not None and prev[2] != cell:
+                members = self._cells[prev[2]]
+                members.discard(drone_id)
+                if not members:
+                    del self._cells[prev[2]]
+            if prev is None or prev[2] != cell:
+                self._cells.setdefault(cell, set()).add(drone_id)
+                ext = self._extent
+                if ext is None:
+                    if len(self._cells) == 1:
+                        self._extent = [cell[0], cell[0], cell[1], cell[1]]
+                    # sinon : recalcul paresseux au prochain nearest()
+                else:
+                    if cell[0] < ext[0]: ext[0] = cell[0]
+                    if cell[0] > ext[1]: ext[1] = cell[0]
+                    if cell[1] < ext[2]: ext[2] = cell[1]
+                    if cell[1] > ext[3]: ext[3] = cell[1]
+            self._pos[drone_id] = (lat, lon, cell)
+
+    def update_record(self, rec: dict):
+        """Listener de TelemetryCache."""
+        pos = rec.get("position") or {}
+        lat, lon = pos.get("lat"), pos.get("lon")
+        if lat is not None and lon is not None:
+            self.update(rec["drone_id"], lat, lon)
+
+    def remove(self, drone_id: str):
+        with self._lock:
+            prev = self._pos.pop(drone_id, None)
+            if prev is not None:
+                members = self._cells[prev[2]]
+                members.discard(drone_id)
+                if not members:
+                    del self._cells[prev[2]]
+                    self._extent = None
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def position(self, drone_id: str) -> Optional[Tuple[float, float]]:
+        p = self._pos.get(drone_id)
+        return (p[0], p[1]) if p else None
+
+    # --- requêtes ---
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[str]:
+        c0, c1 = self._cell(min_lat, min_lon), self._cell(max_lat, max_lon)
+        n_cells = (c1[0] - c0[0] + 1) * (c1[1] - c0[1] + 1)
+        out = []
+        with self._lock:
+            pos = self._pos
+            if n_cells > len(self._cells):
+                cells = [m for (ci, cj), m in self._cells.items()
+                         if c0[0] <= ci <= c1[0] and c0[1] <= cj <= c1[1]]
+            else:
+                cells = [self._cells[(ci, cj)]
+                         for ci in range(c0[0], c1[0] + 1)
+                         for cj in range(c0[1], c1[1] + 1)
+                         if (ci, cj) in self._cells]
+            for members in cells:
+                for drone_id in members:
+                    lat, lon, _ = pos[drone_id]
+                    if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                        out.append(drone_id)
+        return out
+
+    def radius(self, lat: float, lon: float, radius_m: float) -> List[Tuple[str, float]]:
+        dlat = radius_m / M_PER_DEG
+        dlon = radius_m / (M_PER_DEG * max(math.cos(math.radians(lat)), 1e-6))
+        out = []
+        for drone_id in self.bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            p = self._pos.get(drone_id)
+            if p is None:
+                continue
+            d = haversine_m(lat, lon, p[0], p[1])
+            if d <= radius_m:
+                out.append((drone_id, d))
+        out.sort(key=lambda x: x[1])
+        return out
+
+    def nearest(self, lat: float, lon: float, k: int = 10) -> List[Tuple[str, float]]:
+        if k <= 0:
+            return []
+        ci, cj = self._cell(lat, lon)
+        best: List[Tuple[float, str]] = []  # tas max via distances négatives
+        pos = self._pos
+
+        def consider(members):
+            for drone_id in members:
+                p = pos[drone_id]
+                d = haversine_m(lat, lon, p[0], p[1])
+                if len(best) < k:
+                    heapq.heappush(best, (-d, drone_id))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, drone_id))
+
+        with self._lock:
+            if not self._cells:
+                return []
+            ext = self._get_extent()
+            span = max(abs(ci - ext[0]), abs(ci - ext[1]), abs(cj - ext[2]), abs(cj - ext[3]))
+            # au-delà de ce budget de cases (vides pour la plupart : requête
+            # loin de la flotte, ou k >= nombre de drones), parcourir les
+            # cases occupées coûte moins cher que de continuer les anneaux
+            budget = 4 * len(self._cells) + 8
+            visited = 0
+            r = 0
+            while r <= span:
+                for cell in self._ring(ci, cj, r):
+                    members = self._cells.get(cell)
+                    if members:
+                        consider(members)
+                visited += 8 * r if r else 1
+                # les cases des anneaux > r sont à au moins r cases de distance
+                # (côté longitude, au cos de la latitude la plus défavorable)
+                if len(best) == k and -best[0][0] <= self._ring_min_m(lat, r):
+                    break
+                if len(best) == len(pos):
+                    break  # tous les drones déjà vus
+                r += 1
+                if visited + 8 * r > budget:
+                    for (cx, cy), members in self._cells.items():
+                        if max(abs(cx - ci), abs(cy - cj)) >= r:
+                            consider(members)
+                    break
+        return sorted(((drone_id, -nd) for nd, drone_id in best), key=lambda x: x[1])
+
+    def _get_extent(self) -> List[int]:
+        # recalculée paresseusement après un retrait (remove ne fait que l'invalider)
+        if self._extent is None:
+            xs = [c[0] for c in self._cells]
+            ys = [c[1] for c in self._cells]
+            self._extent = [min(xs), max(xs), min(ys), max(ys)]
+        return self._extent
+
+    def _ring_min_m(self, lat: float, r: int) -> float:
+        worst_lat = min(89.9, abs(lat) + (r + 1) * self.cell_deg)
+        return 0.99 * r * self.cell_deg * M_PER_DEG * math.cos(math.radians(worst_lat))
+
+    @staticmethod
+    def _ring(ci: int, cj: int, r: int):
+        if r == 0:
+            yield (ci, cj)
+            return
+        for dj in range(-r, r + 1):
+            yield (ci - r, cj + dj)
+            yield (ci + r, cj + dj)
+        for di in range(-r + 1, r):
+            yield (ci + di, cj - r)
+            yield (ci + di, cj + r)
+
+    def stats(self) -> dict:
+        return {"drones": len(self._pos), "cells": len(self._cells), "cell_deg": self.cell_deg}
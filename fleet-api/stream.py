@@ -0,0 +1,168 @@
+"""
+Diffusion temps réel de la télémétrie depuis fleet-api (WebSocket / SSE).
+Un seul abonnement broker (TelemetryIngestor) alimente TelemetryHub, qui
+répartit les états vers les clients connectés :
+- filtre par ensemble d'identifiants et/ou bounding box ;
+- file bornée par client, indexée par drone : si le client prend du retard,
+  seuls les derniers états de chaque drone sont conservés (coalescence) ;
+- encodage delta : après un premier état complet, seuls les champs modifiés
+  sont envoyés.
+"""
+
+import asyncio
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+FIELDS = ("ts", "lat", "lon", "alt", "speed_mps", "battery_pct", "status", "heading_deg")
+
+BBox = Tuple[float, float, float, float]  # min_lat, min_lon, max_lat, max_lon
+
+
+def flatten(rec: dict) -> dict:
+    pos = rec.get("position") or {}
+    return {
+        "ts": rec.get("ts"),
+        "lat": pos.get("lat"),
+        "lon": pos.get("lon"),
+        "alt": pos.get("alt"),
+        "speed_mps": rec.get("speed_mps"),
+        "battery_pct": rec.get("battery_pct"),
+        "status": rec.get("status"),
+        "heading_deg": rec.get("heading_deg"),
+    }
+
+
+def parse_ids(raw) -> Optional[Set[str]]:
+    """"a,b,c" (query string) ou ["a", "b"] (message WebSocket)."""
+    if not raw:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    elif not isinstance(raw, (list, tuple)) or not all(isinstance(i, str) for i in raw):
+        raise ValueError("ids must be a list of strings")
+    return {i for i in raw if i}
+
+
+def parse_bbox(raw) -> Optional[BBox]:
+    """"min_lat,min_lon,max_lat,max_lon" ou liste de 4 nombres."""
+    if not raw:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, (list, tuple)) or len(raw) != 4:
+        raise ValueError("bbox must be min_lat,min_lon,max_lat,max_lon")
+    try:
+        parts = [float(x) for x in raw]
+    except (TypeError, ValueError):
+        raise ValueError("bbox must contain 4 numbers")
+    if any(math.isnan(x) for x in parts):
+        raise ValueError("bbox must contain 4 numbers")
+    return (parts[0], parts[1], parts[2], parts[3])
+
+
+class StreamClient:
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 ids: Optional[Set[str]] = None, bbox: Optional[BBox] = None,
+                 max_pending: int = 10000):
+        self.loop = loop
+        self.ids = ids
+        self.bbox = bbox
+        self.max_pending = max_pending
+
+        self._pending: Dict[str, dict] = {}
+        self._sent: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._event = asyncio.Event()
+        self._armed = False
+
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def matches(self, rec: dict) -> bool:
+        if self.ids is not None and rec.get("drone_id") not in self.ids:
+            return False
+        if self.bbox is not None:
+            pos = rec.get("position") or {}
+            lat, lon = pos.get("lat"), pos.get("lon")
+            if lat is None or lon is None:
+                return False
+            min_lat, min_lon, max_lat, max_lon = self.bbox
+            if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                return False
+        return True
+
+    def offer(self, rec: dict):
+        """Appelé depuis le thread producteur (réseau MQTT)."""
+        drone_id = rec.get("drone_id")
+        with self._lock:
+            if drone_id in self._pending:
+                self.coalesced += 1
+            elif len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending[drone_id] = rec
+            if self._armed:
+                return
+            self._armed = True
+        try:
+            self.loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # boucle fermée : client en cours de déconnexion
+
+    def delta(self, drone_id: str, rec: dict) -> dict:
+        flat = flatten(rec)
+        prev = self._sent.get(drone_id)
+        self._sent[drone_id] = flat
+        if prev is None:
+            return {"id": drone_id, "full": True, **flat}
+        out = {"id": drone_id}
+        for k in FIELDS:
+            if flat[k] != prev[k]:
+                out[k] = flat[k]
+        return out
+
+    def drain(self) -> List[dict]:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._armed = False
+            self._event.clear()
+        self.delivered += len(batch)
+        return [self.delta(drone_id, rec) for drone_id, rec in batch.items()]
+
+    async def next_batch(self) -> List[dict]:
+        await self._event.wait()
+        return self.drain()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "delivered": self.delivered,
+                "coalesced": self.coalesced, "dropped": self.dropped}
+
+
+class TelemetryHub:
+    def __init__(self, max_pending: int = 10000):
+        self.max_pending = max_pending
+        self._clients: Tuple[StreamClient, ...] = ()
+        self._lock = threading.Lock()
+
+    def register(self, ids: Optional[Set[str]] = None, bbox: Optional[BBox] = None) -> StreamClient:
+        client = StreamClient(asyncio.get_running_loop(), ids=ids, bbox=bbox,
+                              max_pending=self.max_pending)
+        with self._lock:
+            self._clients = self._clients + (client,)
+        return client
+
+    def unregister(self, client: StreamClient):
+        with self._lock:
+            self._clients = tuple(c for c in self._clients if c is not client)
+
+    def publish(self, rec: dict):
+        # lecture sans verrou : _clients est un tuple remplacé en bloc
+        for client in self._clients:
+            if client.matches(rec):
+                client.offer(rec)
+
+    def stats(self) -> dict:
+        clients = self._clients
+        return {"clients": len(clients), "per_client": [c.stats() for c in clients]}
@@ -0,0 +1,217 @@
+"""
+Télémétrie groupée (mode batch, opt-in via TELEMETRY_BATCH=1).
+Au lieu d'un message par drone et par tick sur `{prefix}/drone/{id}/telemetry`,
+le simulateur publie des trames sur `{prefix}/fleet/telemetry` :
+
+    {"v": 1, "ts": <epoch>, "count": N, "drones": [<payload télémétrie>, ...]}
+
+Une trame part dès qu'elle contient `max_drones` états, ou au plus tard
+`max_latency` secondes après son premier état.
+Pour les préfixes en binaire, la trame suit le format de telemetry_codec.py.
+Côté consommateur, split_frame() redonne les enregistrements par drone et
+FanOutBridge les republie sur les topics par drone pour les abonnés existants.
+"""
+
+import argparse
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telemetry_codec import (
+    MAX_FRAME_RECORDS, TelemetryDecoder, TelemetryEncoder, decode_any, is_binary,
+)
+
+FRAME_VERSION = 1
+
+
+def fleet_topic(topic_prefix: str) -> str:
+    return f"{topic_prefix}/fleet/telemetry"
+
+
+def drone_topic(topic_prefix: str, drone_id: str) -> str:
+    return f"{topic_prefix}/drone/{drone_id}/telemetry"
+
+
+def encode_frame(records: List[dict], ts: Optional[float] = None) -> str:
+    return json.dumps({
+        "v": FRAME_VERSION,
+        "ts": time.time() if ts is None else ts,
+        "count": len(records),
+        "drones": records,
+    }, separators=(",", ":"))
+
+
+def split_frame(raw, decoder: Optional[TelemetryDecoder] = None) -> List[dict]:
+    """Découpe une trame (bytes/str/dict, JSON ou binaire) en enregistrements par drone."""
+    if isinstance(raw, (bytes, bytearray)) and is_binary(raw):
+        records = decode_any(raw, decoder=decoder)
+        if not isinstance(records, list):
+            raise ValueError("binary payload is not a telemetry frame")
+        return records
+    frame = json.loads(raw) if isinstance(raw, (bytes, bytearray, str)) else raw
+    if frame.get("v") != FRAME_VERSION:
+        raise ValueError(f"unsupported telemetry frame version: {frame.get('v')}")
+    return frame.get("drones") or []
+
+
+class TelemetryBatcher:
+    """
+    Regroupe les états publiés par les simulateurs, une trame par topic_prefix.
+    `publish(topic, payload, qos)` est typiquement FleetManager.bus.publish.
+    """
+
+    def __init__(self, publish: Callable[[str, str, int], None],
+                 max_drones: int = 500, max_latency: float = 0.2,
+                 binary_prefixes=(), encoder: Optional[TelemetryEncoder] = None):
+        self.publish = publish
+        self.binary_prefixes = frozenset(binary_prefixes)
+        self.encoder = encoder or TelemetryEncoder()
+        self.max_drones = max(1, max_drones)
+        if self.binary_prefixes:
+            # le nombre d'enregistrements d'une trame binaire tient sur un u16
+            self.max_drones = min(self.max_drones, MAX_FRAME_RECORDS)
+        self.max_latency = max_latency
+        self._buffers: Dict[str, Tuple[float, List[dict]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.frames = 0
+        self.records = 0
+
+    def add(self, topic_prefix: str, record: dict):
+        full = None
+        with self._lock:
+            entry = self._buffers.get(topic_prefix)
+            if entry is None:
+                entry = (time.monotonic(), [])
+                self._buffers[topic_prefix] = entry
+            entry[1].append(record)
+            if len(entry[1]) >= self.max_drones:
+                full = self._buffers.pop(topic_prefix)[1]
+        if full is not None:
+            self._send(topic_prefix, full)
+        self._ensure_thread()
+
+    def _send(self, topic_prefix: str, records: List[dict]):
+        self.frames += 1
+        self.records += len(records)
+        if topic_prefix in self.binary_prefixes:
+            payload = self.encoder.encode_frame(records)
+        else:
+            payload = encode_frame(records)
+        self.publish(fleet_topic(topic_prefix), payload, 0)
+
+    def flush_due(self, now: Optional[float] = None, force: bool = False) -> Optional[float]:
+        """Envoie les trames échues ; retourne la prochaine échéance (monotonic)."""
+        now = time.monotonic() if now is None else now
+        due, next_deadline = [], None
+        with self._lock:
+            for prefix, (first, records) in list(self._buffers.items()):
+                deadline = first + self.max_latency
+                if force or deadline <= now:
+                    due.append((prefix, records))
+                    del self._buffers[prefix]
+                elif next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+        for prefix, records in due:
+            self._send(prefix, records)
+        return next_deadline
+
+    def flush(self):
+        self.flush_due(force=True)
+
+    # --- minuterie de latence ---
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="telemetry-batcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            next_deadline = self.flush_due()
+            timeout = self.max_latency if next_deadline is None else max(0.0, next_deadline - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def shutdown(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "records": self.records,
+            "avg_frame_size": (self.records / self.frames) if self.frames else 0.0,
+            "max_drones": self.max_drones,
+            "max_latency_ms": self.max_latency * 1000.0,
+        }
+
+
+class FanOutBridge:
+    """
+    Pont local : s'abonne aux trames `{prefix}/fleet/telemetry` et republie
+    chaque état sur `{prefix}/drone/{id}/telemetry`, pour que les abonnés
+    par drone existants (front, outils) n'aient rien à changer.
+    """
+
+    def __init__(self, client, topic_prefix: str = "lab"):
+        self.client = client
+        self.topic_prefix = topic_prefix
+        self.decoder = TelemetryDecoder()
+        self.frames = 0
+        self.records = 0
+        self.errors = 0
+
+    def attach(self):
+        topic = fleet_topic(self.topic_prefix)
+        self.client.message_callback_add(topic, self._on_frame)
+        self.client.subscribe(topic)
+
+    def _on_frame(self, client, userdata, msg):
+        try:
+            records = split_frame(msg.payload, self.decoder)
+        except Exception as e:
+            self.errors += 1
+            print(f"[FanOutBridge] invalid frame: {e}")
+            return
+        self.frames += 1
+        for rec in records:
+            drone_id = rec.get("drone_id")
+            if not drone_id:
+                continue
+            self.records += 1
+            self.client.publish(drone_topic(self.topic_prefix, drone_id),
+                                json.dumps(rec), qos=0)
+
+
+def main():
+    import paho.mqtt.client as mqtt
+
+    p = argparse.ArgumentParser(description="Pont trames de flotte -> topics par drone")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=1883)
+    p.add_argument("--topic-prefix", default="lab")
+    args = p.parse_args()
+
+    client = mqtt.Client()
+    bridge = FanOutBridge(client, args.topic_prefix)
+    client.on_connect = lambda c, u, f, rc: bridge.attach()
+    client.connect(args.host, args.port, keepalive=30)
+    print(f"[FanOutBridge] {fleet_topic(args.topic_prefix)} -> {args.topic_prefix}/drone/+/telemetry")
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
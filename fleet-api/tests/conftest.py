@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+# Base SQLite jetable pour les tests (ne touche pas data/fleet.db)
+_tmp = tempfile.mkdtemp(prefix="fleet-api-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/fleet.db")
+os.environ.setdefault("CHECKPOINT_PATH", f"{_tmp}/fleet.ckpt")
+os.environ.setdefault("DISABLE_MQTT", "1")
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _schema():
+    # ASGITransport ne déclenche pas le lifespan de l'app : schéma créé ici
+    from sqlmodel import SQLModel
+    from models import get_engine
+    SQLModel.metadata.create_all(get_engine(os.environ["DATABASE_URL"]))
+    yield
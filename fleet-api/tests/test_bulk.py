@@ -0,0 +1,66 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_update_delete_with_per_item_results():
+    transport = ASGITransport(app=app)
+    ids = [f"bulk-{i:03d}" for i in range(120)]
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        resp = await ac.post("/drones/bulk", json=[{"id": i, "topic_prefix": "bulk"} for i in ids] + [{"id": ids[0]}])
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["ok"] == 120 and data["failed"] == 1
+        assert data["results"][-1] == {"id": ids[0], "ok": False, "error": "Drone already exists"}
+
+        resp = await ac.patch("/drones/bulk", json=[{"id": ids[1], "cruise_speed_mps": 12.5}, {"id": "nope"}])
+        assert resp.json()["ok"] == 1
+        assert (await ac.get(f"/drones/{ids[1]}")).json()["cruise_speed_mps"] == 12.5
+
+        # pagination par clé + projection
+        seen, after = [], None
+        for _ in range(10):  # borne anti-boucle si le curseur n'avance pas
+            params = {"limit": 50, "topic_prefix": "bulk", "fields": "id,status"}
+            if after:
+                params["after"] = after
+            resp = await ac.get("/drones", params=params)
+            page = resp.json()
+            seen += [d["id"] for d in page]
+            assert all(set(d) == {"id", "status"} for d in page)
+            after = resp.headers.get("X-Next-Cursor")
+            if not after:
+                break
+        assert seen == ids
+
+        resp = await ac.get("/drones", params={"topic_prefix": "bulk", "status": "running"})
+        assert resp.json() == []
+        assert (await ac.get("/drones", params={"fields": "bogus"})).status_code == 400
+
+        resp = await ac.request("DELETE", "/drones/bulk", json={"ids": ids + ["nope"]})
+        assert resp.json()["ok"] == 120 and resp.json()["failed"] == 1
+        assert (await ac.get("/drones", params={"topic_prefix": "bulk"})).json() == []
+
+
+@pytest.mark.asyncio
+async def test_list_drones_id_only_projection_advances_cursor():
+    transport = ASGITransport(app=app)
+    ids = [f"proj-{i}" for i in range(5)]
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones/bulk", json=[{"id": i, "topic_prefix": "proj"} for i in ids])
+        seen, after = [], None
+        for _ in range(10):  # borne : un curseur qui n'avance pas ne boucle pas
+            params = {"limit": 2, "topic_prefix": "proj", "fields": "id"}
+            if after:
+                params["after"] = after
+            resp = await ac.get("/drones", params=params)
+            page = resp.json()
+            assert all(set(d) == {"id"} for d in page)
+            seen += [d["id"] for d in page]
+            after = resp.headers.get("X-Next-Cursor")
+            if not after:
+                break
+            assert after == page[-1]["id"]
+        assert seen == ids
+        await ac.request("DELETE", "/drones/bulk", json={"ids": ids})
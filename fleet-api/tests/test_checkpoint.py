@@ -0,0 +1,125 @@
+import os
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlmodel import select
+
+import main
+from bus import NullBus
+from checkpoint import HEADER, Checkpointer, SavedDrone, read_checkpoint
+from engine import VectorDrone, VectorEngine
+from models import Drone, get_async_session
+from sim import DroneSimulator
+
+PARAMS = dict(topic_prefix="lab", shared_secret="s3cret", start_lat=48.0, start_lon=2.0, start_alt=0.0,
+              publish_interval_sec=1.0, cruise_speed_mps=8.0, battery_drain=0.005, heading_noise=0.0)
+
+
+def test_frames_append_compact_and_survive_torn_tail(tmp_path):
+    path = str(tmp_path / "fleet.ckpt")
+    state = {"a": SavedDrone("flying", 48.1, 2.1, 30.0, 8.0, 77.5, 45.0, [(48.2, 2.2, None), (48.3, 2.3, 50.0)]),
+             "é-b": SavedDrone("idle", 48.0, 2.0, 0.0, 0.0, 100.0, 0.0, [])}
+    ck = Checkpointer(path, lambda: dict(state), compact_every=3)
+    assert read_checkpoint(path) == ({}, None)
+
+    ck.write()
+    state["é-b"] = state["é-b"]._replace(battery_pct=99.0)
+    size = ck.write()
+    drones, ts = read_checkpoint(path)
+    assert drones == state and ts == ck.last_ts
+    assert os.path.getsize(path) == 2 * size
+
+    # arrêt brutal au milieu d'une écriture : la trame tronquée est ignorée...
+    with open(path, "ab") as f:
+        f.write(HEADER.pack(b"FCK1", 1, 0.0, 1000, 0) + b"partial")
+    assert read_checkpoint(path)[0] == state
+    # ... puis coupée par l'écriture suivante, qui reste lisible
+    ck2 = Checkpointer(path, lambda: dict(state), compact_every=3)
+    ck2.write()
+    assert os.path.getsize(path) == 3 * size and read_checkpoint(path)[0] == state
+    ck2.write()  # compact_every atteint : réécrit la seule dernière trame
+    assert os.path.getsize(path) == size and ck2.compactions == 1
+
+
+def test_simulator_resumes_mission_from_saved_state():
+    sim = DroneSimulator(drone_id="ck-s", **PARAMS)
+    sim.apply_command("mission", {"waypoints": [{"lat": 48.001, "lon": 2.0, "alt": 40},
+                                                {"lat": 48.001, "lon": 2.001}]})
+    for _ in range(5):
+        sim.step()
+    saved = sim.saved()
+    assert saved.status == "flying" and saved.waypoints == [(48.001, 2.0, 40.0), (48.001, 2.001, None)]
+
+    resumed = DroneSimulator(drone_id="ck-s", **PARAMS)
+    resumed.resume_from(saved)
+    assert (resumed.state.lat, resumed.state.battery_pct) == (sim.state.lat, sim.state.battery_pct)
+    while resumed.state.status == "flying":
+        resumed.step()
+    assert (resumed.state.lat, resumed.state.lon, resumed.state.alt) == (48.001, 2.001, 40.0)
+    assert resumed.home == (48.0, 2.0)  # rth : toujours le point de départ configuré
+
+
+def test_vector_drone_saved_state_round_trip():
+    engine = VectorEngine(threaded=False)
+    d = VectorDrone(engine, NullBus(), drone_id="ck-v", **{**PARAMS, "cruise_speed_mps": 100.0})
+    d.start()
+    d.apply_command("mission", {"waypoints": [{"lat": 48.01, "lon": 2.0}, {"lat": 48.01, "lon": 2.01}]})
+    engine.run_due(now=float(engine.fleet.next_due[0]))
+    saved = d.saved()
+    assert saved.waypoints == [(48.01, 2.0, None), (48.01, 2.01, None)] and saved.lat > 48.0
+    d.stop()
+
+    engine2 = VectorEngine(threaded=False)
+    d2 = VectorDrone(engine2, NullBus(), drone_id="ck-v", **{**PARAMS, "cruise_speed_mps": 100.0})
+    d2.resume_from(saved)
+    d2.start()
+    assert d2.state.lat == saved.lat and d2.state.status == "flying"
+    for _ in range(40):
+        engine2.run_due(now=float(engine2.fleet.next_due[0]))
+    assert (d2.state.lat, d2.state.lon, d2.state.status) == (48.01, 2.01, "idle")
+    d2.stop()
+
+
+async def _db_status(drone_id: str) -> str:
+    async with get_async_session(main.cfg["database_url"]) as s:
+        return (await s.exec(select(Drone.status).where(Drone.id == drone_id))).one()
+
+
+@pytest.mark.asyncio
+async def test_start_persists_status_and_restart_resumes(tmp_path, monkeypatch):
+    started = []
+
+    def fake_start(drone):  # pas de thread ni de broker : on garde ensure_worker (reprise d'état)
+        started.append(drone.id)
+        main.fleet.ensure_worker(drone)
+
+    monkeypatch.setattr(main.fleet, "start", fake_start)
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones", json={"id": "ck-api", "start_lat": 48.0, "start_lon": 2.0})
+        try:
+            assert (await ac.post("/drones/ck-api/start")).status_code == 200
+            assert await _db_status("ck-api") == "running"
+            w = main.fleet.workers["ck-api"]
+            w.apply_command("goto", {"lat": 48.01, "lon": 2.0})
+            for _ in range(10):
+                w.step()
+
+            # redémarrage : point de reprise, registre relu depuis la base, reprise
+            ck = Checkpointer(str(tmp_path / "fleet.ckpt"), main.fleet.snapshot)
+            ck.write()
+            main.fleet.workers.pop("ck-api")
+            main.fleet.saved.update(ck.restore())
+            await main.registry.load()
+            started.clear()
+            await main._resume_running()
+            assert started == ["ck-api"]
+            w2 = main.fleet.workers["ck-api"]
+            assert w2 is not w and (w2.state.lat, w2.state.status) == (w.state.lat, "flying")
+            assert w2.saved().waypoints == [(48.01, 2.0, None)]
+
+            assert (await ac.post("/drones/ck-api/stop")).status_code == 200
+            assert await _db_status("ck-api") == "stopped"
+        finally:
+            await ac.delete("/drones/ck-api")
+    assert "ck-api" not in main.fleet.workers and "ck-api" not in main.fleet.snapshot()
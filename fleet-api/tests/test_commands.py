@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import main
+from commands import CommandTracker, percentile
+from engine import VectorEngine
+from sim import DroneSimulator
+from security import sign
+
+
+def test_tracker_acks_timeouts_and_percentiles():
+    t = CommandTracker(timeout=1.0)
+    for i in range(10):
+        t.register(f"c{i}", "d-1", "goto")
+    t.register("late", "d-1", "land", timeout=0.5)
+
+    assert t.ack({"type": "ack", "cid": "c0", "ok": True})
+    assert t.ack({"type": "ack", "cid": "c1", "ok": False, "error": "ValueError: bad"})
+    assert not t.ack({"type": "ack", "cid": "c0", "ok": True})   # doublon
+    assert not t.ack({"type": "ack", "cid": "nope"})
+    assert not t.ack({"type": "pong", "cid": "c2"})
+    assert t.duplicates == 1 and t.unknown == 1
+    assert t.get("c1")["status"] == "failed" and t.get("c1")["error"] == "ValueError: bad"
+    assert t.get("c2")["status"] == "pending"
+
+    # échéances : seules les commandes sans ack passent en timeout
+    assert t.expire(time.monotonic() + 0.75) == 1
+    assert t.get("late")["status"] == "timeout"
+    assert t.expire(time.monotonic() + 2.0) == 8
+    stats = t.stats()
+    assert stats["in_flight"] == 0
+    goto = stats["commands"]["goto"]
+    assert (goto["sent"], goto["acked"], goto["failed"], goto["timeouts"]) == (10, 1, 1, 8)
+    assert goto["p50_ms"] is not None and stats["commands"]["land"]["p99_ms"] is None
+
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+
+
+@pytest.mark.asyncio
+async def test_wait_resolves_from_another_thread_and_times_out():
+    t = CommandTracker(timeout=0.05)
+    fut = t.register("a", "d-1", "ping", wait=True)
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, t.ack, {"type": "ack", "cid": "a", "ok": True})
+    assert (await t.wait("a", fut, 2.0))["status"] == "acked"
+
+    fut = t.register("b", "d-1", "ping", wait=True)
+    assert (await t.wait("b", fut, 0.05))["status"] == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_cmd_endpoint_fire_and_forget_and_await_ack(monkeypatch):
+    # simulateurs locaux sans broker : les commandes leur sont remises directement
+    monkeypatch.setattr(main.fleet, "engine", VectorEngine(threaded=False))
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones", json={"id": "cmd-1", "topic_prefix": "lab"})
+        assert (await ac.post("/drones/cmd-1/start")).status_code == 200
+        try:
+            r = await ac.post("/drones/cmd-1/cmd", params={"wait": "true", "timeout": 2},
+                              json={"cmd": "takeoff", "args": {"alt": 25}})
+            body = r.json()
+            assert r.status_code == 200 and body["status"] == "acked" and body["latency_ms"] >= 0
+            assert main.fleet.workers["cmd-1"].state.alt == 25
+
+            bad = (await ac.post("/drones/cmd-1/cmd", params={"wait": "true"},
+                                 json={"cmd": "goto", "args": {"lat": 48.0}})).json()
+            assert bad["status"] == "failed" and bad["ok"] is False and "lon" in bad["error"]
+
+            r = (await ac.post("/drones/cmd-1/cmd", json={"cmd": "ping"})).json()
+            assert r["envelope"]["payload"]["cid"] == r["cid"]
+            status = (await ac.get(f"/commands/{r['cid']}")).json()
+            assert status["status"] == "acked"
+            assert (await ac.get("/commands/nope")).status_code == 404
+
+            stats = (await ac.get("/commands/stats")).json()
+            assert stats["commands"]["takeoff"]["acked"] >= 1
+            assert stats["commands"]["goto"]["failed"] >= 1
+        finally:
+            await ac.post("/drones/cmd-1/stop")
+            await ac.delete("/drones/cmd-1")
+        main.fleet.engine.shutdown()
+
+
+def test_simulator_acks_only_commands_with_cid():
+    published, events = [], []
+    d = DroneSimulator(
+        drone_id="ack-1", topic_prefix="lab", shared_secret="s3cret",
+        start_lat=48.0, start_lon=2.0, start_alt=0.0, publish_interval_sec=1.0,
+        cruise_speed_mps=8.0, battery_drain=0.005, heading_noise=0.0,
+    )
+    d._publish = lambda topic, payload, qos=0: published.append((topic, json.loads(payload)))
+    d.on_event = events.append
+    for payload in ({"cmd": "ping"}, {"cmd": "ping", "cid": "x1"}, {"cmd": "warp", "cid": "x2"}):
+        d.handle_message(json.dumps({"sig": sign(payload, "s3cret"), "payload": payload}).encode())
+    forged = {"cmd": "land", "cid": "x3"}
+    d.handle_message(json.dumps({"sig": "00", "payload": forged}).encode())
+
+    assert [(e["cid"], e["ok"]) for e in events] == [("x1", True), ("x2", False), ("x3", False)]
+    acks = [p for t, p in published if t == "lab/drone/ack-1/events" and p["type"] == "ack"]
+    assert [a["cid"] for a in acks] == ["x1", "x2", "x3"]
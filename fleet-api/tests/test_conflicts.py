@@ -0,0 +1,99 @@
+import itertools
+
+import numpy as np
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import main
+from conflicts import ConflictDetector, find_conflicts
+from spatial import M_PER_DEG
+
+DEG_M = 1.0 / M_PER_DEG  # 1 m en degrés de latitude
+
+
+def test_head_on_pair_is_predicted_and_vertical_separation_excludes():
+    det = ConflictDetector(separation_m=50, vertical_m=15, horizon_sec=30, clock=lambda: 0.0)
+    # face à face : 400 m, 10 m/s chacun -> CPA à 20 s
+    det.update("a", 48.0, 2.0, 50.0, 10.0, 0.0)
+    det.update("b", 48.0 + 400 * DEG_M, 2.0, 50.0, 10.0, 180.0)
+    # même trajectoire mais 20 m plus haut : séparé verticalement
+    det.update("c", 48.0 + 400 * DEG_M, 2.0, 70.0, 10.0, 180.0)
+    # trop loin pour l'horizon : 2 km
+    det.update("d", 48.0 + 2000 * DEG_M, 2.0, 50.0, 10.0, 180.0)
+    events = det.detect(now=0.0)
+
+    [c] = det.conflicts()
+    assert c["drones"] == ["a", "b"] and c["kind"] == "predicted"
+    assert c["t_cpa_sec"] == pytest.approx(20.0, abs=0.01) and c["cpa_m"] == pytest.approx(0.0, abs=0.5)
+    assert c["distance_m"] == pytest.approx(400.0, abs=0.5)
+    assert {(e["drone_id"], e["with"], e["state"]) for e in events} == {("a", "b", "start"), ("b", "a", "start")}
+
+
+def test_proximity_events_start_and_end():
+    sent = []
+    det = ConflictDetector(separation_m=50, publish=lambda drone_id, ev: sent.append((drone_id, ev)),
+                           clock=lambda: 0.0)
+    det.update("x", 48.0, 2.0, 30.0, 0.0, 0.0)
+    det.update("y", 48.0 + 20 * DEG_M, 2.0, 30.0, 0.0, 0.0)
+    det.detect(now=0.0)
+    assert det.conflicts("x")[0]["kind"] == "proximity" and len(sent) == 2
+    det.detect(now=1.0)
+    assert len(sent) == 2  # conflit toujours actif : pas de nouvel event
+    assert det.conflicts("x")[0]["since"] == 0.0
+
+    det.update("y", 48.0 + 200 * DEG_M, 2.0, 30.0, 0.0, 0.0, ts=2.0)
+    det.update("x", 48.0, 2.0, 30.0, 0.0, 0.0, ts=2.0)
+    assert det.detect(now=2.0)[0]["state"] == "end"
+    assert det.conflicts() == [] and [ev["state"] for _, ev in sent] == ["start"] * 2 + ["end"] * 2
+    assert det.stats()["started"] == 1 and det.stats()["ended"] == 1
+
+    # plus de nouvelles depuis stale_sec : oublié
+    det.detect(now=100.0)
+    assert det.stats()["tracked"] == 0
+
+
+def test_grid_matches_brute_force():
+    rng = np.random.default_rng(7)
+    n = 600
+    lat = 48.0 + rng.uniform(0, 0.02, n)
+    lon = 2.0 + rng.uniform(0, 0.03, n)
+    alt = rng.uniform(0, 60, n)
+    speed = rng.uniform(0, 15, n)
+    heading = rng.uniform(0, 360, n)
+    res = find_conflicts(lat, lon, alt, speed, heading, 50.0, 15.0, 20.0)
+    got = {tuple(sorted(p)) for p in zip(res["i"].tolist(), res["j"].tolist())}
+    assert len(got) == res["i"].size  # chaque paire une seule fois
+
+    # même projection que find_conflicts, sans grille
+    kx = M_PER_DEG * np.cos(np.radians(lat.mean()))
+    x, y = (lon - lon.mean()) * kx, (lat - lat.mean()) * M_PER_DEG
+    vx, vy = speed * np.sin(np.radians(heading)), speed * np.cos(np.radians(heading))
+    expected = set()
+    for i, j in itertools.combinations(range(n), 2):
+        if abs(alt[i] - alt[j]) >= 15.0:
+            continue
+        px, py, rvx, rvy = x[j] - x[i], y[j] - y[i], vx[j] - vx[i], vy[j] - vy[i]
+        vv = rvx * rvx + rvy * rvy
+        t = min(max(-(px * rvx + py * rvy) / vv, 0.0), 20.0) if vv > 0 else 0.0
+        if np.hypot(px + rvx * t, py + rvy * t) < 50.0:
+            expected.add((i, j))
+    assert expected and got == expected
+    assert res["candidates"] < n * (n - 1) // 2
+
+
+@pytest.mark.asyncio
+async def test_conflicts_endpoint():
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        main.conflicts.update("cf-1", 48.0, 2.0, 30.0, 0.0, 0.0)
+        main.conflicts.update("cf-2", 48.0 + 10 * DEG_M, 2.0, 30.0, 0.0, 0.0)
+        try:
+            main.conflicts.detect()
+            body = (await ac.get("/conflicts", params={"drone": "cf-2"})).json()
+            assert body["count"] == 1 and body["items"][0]["drones"] == ["cf-1", "cf-2"]
+            assert body["stats"]["active"] >= 1
+            assert (await ac.get("/conflicts", params={"drone": "nope"})).json()["count"] == 0
+        finally:
+            main.conflicts.remove("cf-1")
+            main.conflicts.remove("cf-2")
+            main.conflicts.detect()
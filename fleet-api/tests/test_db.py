@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+
+from main import app, cfg
+from models import get_async_session
+
+
+@pytest.mark.asyncio
+async def test_concurrent_crud():
+    transport = ASGITransport(app=app)
+    ids = [f"db-{i}" for i in range(40)]
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        resps = await asyncio.gather(*(ac.post("/drones", json={"id": i}) for i in ids))
+        assert all(r.status_code == 200 for r in resps)
+
+        reads = await asyncio.gather(*(ac.get(f"/drones/{i}") for i in ids))
+        assert [r.json()["id"] for r in reads] == ids
+
+        dels = await asyncio.gather(*(ac.delete(f"/drones/{i}") for i in ids))
+        assert all(r.status_code == 200 for r in dels)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas_applied():
+    async with get_async_session(cfg["database_url"]) as s:
+        mode = (await s.execute(text("PRAGMA journal_mode"))).scalar()
+        sync = (await s.execute(text("PRAGMA synchronous"))).scalar()
+    assert mode == "wal"
+    assert sync == 1  # NORMAL
+
+
+@pytest.mark.asyncio
+async def test_in_memory_sqlite_engine_skips_pool_sizing(monkeypatch):
+    import models
+    monkeypatch.setattr(models, "_async_engine", None)
+    engine = models.get_async_engine("sqlite:///:memory:")
+    async with engine.connect() as conn:
+        assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+    await engine.dispose()
@@ -0,0 +1,67 @@
+import numpy as np
+
+from fleet_state import FleetState, FLYING, IDLE
+from sim import DroneState, move_towards
+
+
+def build(n, seed=7):
+    r = np.random.default_rng(seed)
+    fleet, scalar = FleetState(capacity=8), []
+    for i in range(n):
+        lat, lon = 48.0 + r.uniform(-0.01, 0.01), 2.0 + r.uniform(-0.01, 0.01)
+        params = dict(
+            cruise_speed_mps=float(r.uniform(2, 30)),
+            battery_drain=float(r.choice([0.005, 0.5])),
+            heading_noise=float(r.choice([0.0, 5.0])),
+        )
+        fleet.add(f"d-{i}", lat, lon, 10.0, **params)
+        scalar.append((DroneState(lat=lat, lon=lon, alt=10.0), params))
+        if i % 4:  # un drone sur quatre reste au sol
+            wlat, wlon = 48.0 + r.uniform(-0.01, 0.01), 2.0 + r.uniform(-0.01, 0.01)
+            fleet.set_waypoint(f"d-{i}", wlat, wlon)
+            scalar[-1][0].status = "flying"
+            scalar[-1][1]["wp"] = (wlat, wlon)
+    return fleet, scalar
+
+
+def test_batch_matches_scalar_move_towards():
+    fleet, scalar = build(300)
+    rng_batch, rng_scalar = np.random.default_rng(42), np.random.default_rng(42)
+
+    for _ in range(400):
+        fleet.step(5.0, rng=rng_batch)
+        for st, p in scalar:
+            wp = p.get("wp")
+            if st.status == "flying" and wp is not None:
+                move_towards(st, wp[0], wp[1], dt=5.0, speed_mps=p["cruise_speed_mps"],
+                             drain_factor=p["battery_drain"], noise_deg=p["heading_noise"],
+                             rng=rng_scalar)
+                if abs(st.lat - wp[0]) < 1e-5 and abs(st.lon - wp[1]) < 1e-5:
+                    p["wp"] = None
+                    st.status = "idle"
+
+    for i, (st, _) in enumerate(scalar):
+        got = fleet.get(f"d-{i}")
+        assert got.status == st.status
+        assert got.lat == st.lat and got.lon == st.lon
+        assert got.speed_mps == st.speed_mps
+        assert got.battery_pct == st.battery_pct
+        assert abs(got.heading_deg - st.heading_deg) < 1e-9
+
+    # tout le monde est arrivé, et les gros consommateurs sont à 0 %
+    assert not (fleet.status[:fleet.n] == FLYING).any()
+    assert (fleet.battery[:fleet.n] >= 0.0).all()
+    assert (fleet.battery[:fleet.n] == 0.0).any()
+    assert fleet.get("d-0").status == "idle" and fleet.status[0] == IDLE
+
+
+def test_remove_keeps_other_drones_intact():
+    fleet, _ = build(10)
+    before = {f"d-{i}": fleet.get(f"d-{i}") for i in range(10)}
+    fleet.remove("d-3")
+    fleet.remove("d-9")
+    assert len(fleet) == 8 and "d-3" not in fleet.index
+    for drone_id, st in before.items():
+        if drone_id not in ("d-3", "d-9"):
+            assert fleet.get(drone_id) == st
+            assert fleet.ids[fleet.index[drone_id]] == drone_id
@@ -0,0 +1,72 @@
+import json
+import time
+
+import pytest
+
+from headless import FileSink, HeadlessSim, VirtualClock, from_scenario, main
+
+
+def mission(count=20, seed=None):
+    # ~1,1 km vers le nord à 8 m/s : arrivée vers t = 140 s
+    return {
+        "seed": seed,
+        "drones": [{"id": f"m-{i}", "start_lat": 48.0, "start_lon": 2.0 + i * 1e-3,
+                    "heading_noise": 5.0 if seed is not None else 0.0} for i in range(count)],
+        "commands": [
+            {"t": 0, "drone": "*", "cmd": "takeoff", "args": {"alt": 30}},
+            {"t": 2, "drone": "*", "cmd": "goto", "args": {"lat": 48.01, "lon": 2.0}},
+            {"t": 3, "drone": "m-0", "cmd": "goto", "args": {"lat": 48.01}},
+            {"t": 4, "drone": "ghost", "cmd": "land"},
+        ],
+    }
+
+
+def test_two_hour_mission_runs_in_seconds_with_battery_budget():
+    records = []
+    sim = from_scenario(mission(), sink=records.append)
+    t0 = time.perf_counter()
+    res = sim.run(2 * 3600)
+    assert time.perf_counter() - t0 < 10
+    assert res["virtual_sec"] == 7200 and res["steps"] == 20 * 7201
+
+    d = res["drones"]["m-1"]
+    assert d["status"] == "idle" and d["lat"] == pytest.approx(48.01)
+    # hypot(0,01°, 0,001°) ; batterie : drain * vitesse * durée de vol exacte
+    # (segment analytique : le dernier pas n'est plus compté en entier)
+    assert d["flown_m"] == pytest.approx(0.01005 * 111_000, rel=1e-3)
+    assert 100 - d["battery_pct"] == pytest.approx(0.005 * 8.0 * d["flown_m"] / 8.0)
+    assert d["min_battery_pct"] == d["battery_pct"]
+    assert [e["drone"] for e in res["errors"]] == ["m-0", "ghost"]
+
+    # horodatage virtuel, un état par pas et par drone
+    ts = [r["ts"] for r in records if r["drone_id"] == "m-3"]
+    assert ts[:3] == [0.0, 1.0, 2.0] and len(ts) == 7201
+
+
+def test_seeded_runs_are_reproducible():
+    a = from_scenario(mission(5, seed=7)).run(300)["drones"]
+    b = from_scenario(mission(5, seed=7)).run(300)["drones"]
+    assert a == b
+
+
+def test_warp_factor_paces_against_wall_clock():
+    sim = HeadlessSim(clock=VirtualClock(warp=50.0))
+    sim.add("w-1")
+    t0 = time.perf_counter()
+    sim.run(5.0)  # 5 s simulées à x50 : ~0,1 s réelle
+    assert time.perf_counter() - t0 >= 0.09
+
+
+def test_cli_writes_jsonl_and_summary(tmp_path):
+    scenario = tmp_path / "scenario.json"
+    scenario.write_text(json.dumps({**mission(2), "duration": 60}))
+    out, summary = tmp_path / "telemetry.jsonl", tmp_path / "summary.json"
+    main([str(scenario), "--out", str(out), "--summary", str(summary)])
+    lines = out.read_text().splitlines()
+    assert len(lines) == 2 * 61 and json.loads(lines[0])["drone_id"] in {"m-0", "m-1"}
+    assert json.loads(summary.read_text())["steps"] == 2 * 61
+
+    sink = FileSink(str(tmp_path / "x.jsonl"))
+    sink({"a": 1})
+    sink.close()
+    assert (tmp_path / "x.jsonl").read_text() == '{"a":1}\n'
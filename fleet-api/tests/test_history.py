@@ -0,0 +1,81 @@
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from history import TelemetryHistory
+
+
+def rec(ts, battery, alt=10.0):
+    return {"drone_id": "hist-1", "ts": ts, "position": {"lat": 48.0, "lon": 2.0 + ts * 1e-6, "alt": alt},
+            "speed_mps": 5.0, "battery_pct": battery, "status": "flying", "heading_deg": 0.0}
+
+
+def history(**kw):
+    return TelemetryHistory(os.environ["DATABASE_URL"], **kw)
+
+
+def test_history_downsamples_from_db_and_ring_identically():
+    h = history(ring_size=1000)
+    for i in range(100):
+        h.record(rec(1000.0 + i, 100.0 - i * 0.1, alt=10.0 + (i % 7)))
+    from_ring = h.query("hist-1", 1000.0, 1100.0, 10.0)
+    assert h.flush() == 100
+
+    h2 = history(ring_size=1000)  # buffer vide : requête SQL
+    from_db = h2.query("hist-1", 1000.0, 1100.0, 10.0)
+    assert len(from_db) == 10
+    assert from_db == from_ring
+    first = from_db[0]
+    assert first["n"] == 10
+    assert first["battery_pct"]["max"] == 100.0
+    assert first["alt"] == {"min": 10.0, "max": 16.0}
+    assert first["last"]["ts"] == 1009.0
+
+
+def test_history_retention_and_compaction():
+    h = history(retention_sec=1000, compact_after_sec=100, compact_step_sec=50)
+    for i in range(300):
+        h.record({**rec(5000.0 + i, 50.0), "drone_id": "hist-2"})
+    h.flush()
+    h.maintain(now=5400.0)  # < 4400 supprimé (rien), [4400, 5300) compacté par 50 s
+    pts = history().query("hist-2", 5000.0, 5300.0, 1.0)
+    assert [p["last"]["ts"] for p in pts] == [5049.0, 5099.0, 5149.0, 5199.0, 5249.0, 5299.0]
+    h.maintain(now=7000.0)
+    assert history().query("hist-2", 5000.0, 5300.0, 1.0) == []
+
+
+def test_history_rejects_incomplete_records_and_keeps_valid_batch():
+    h = history()
+    h.record({"drone_id": "hist-3", "position": {"lat": 1.0, "lon": 1.0, "alt": 1.0}})  # pas de ts
+    h.record({"drone_id": "hist-3", "ts": 1.0})  # pas de position
+    h.record({**rec(2000.0, 90.0), "drone_id": "hist-3"})
+    assert h.stats()["rejected"] == 2
+    assert h.flush() == 1 and h.stats()["pending"] == 0
+
+
+def test_history_query_merges_unflushed_points_without_writing():
+    h = history(ring_size=5)
+    for i in range(20):
+        h.record({**rec(3000.0 + i, 80.0 - i), "drone_id": "hist-4"})
+    h.flush()
+    for i in range(20, 30):
+        h.record({**rec(3000.0 + i, 80.0 - i), "drone_id": "hist-4"})
+    pts = h.query("hist-4", 2990.0, 3100.0, 10.0)  # hors buffer : SQL + mémoire
+    assert h.stats()["pending"] == 10  # la lecture n'a rien écrit
+    assert [p["n"] for p in pts] == [10, 10, 10]
+    assert pts[-1]["last"]["ts"] == 3029.0
+
+
+def test_history_requeues_batch_when_database_is_unavailable():
+    h = history(max_pending=3)
+    for i in range(5):
+        h.record(rec(4000.0 + i, 50.0))
+
+    def locked(rows):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+    h._insert = locked
+    with pytest.raises(OperationalError):
+        h.flush()
+    st = h.stats()
+    assert st["failed_flushes"] == 1 and st["pending"] == 3 and st["lost"] == 2
@@ -0,0 +1,47 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from prometheus_client.parser import text_string_to_metric_families
+
+import main
+from engine import VectorEngine
+
+
+def samples(text):
+    return {(s.name, tuple(sorted(s.labels.items()))): s.value
+            for fam in text_string_to_metric_families(text) for s in fam.samples}
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_routes_db_and_commands(monkeypatch):
+    monkeypatch.setattr(main.fleet, "engine", VectorEngine(threaded=False))
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones", json={"id": "met-1", "topic_prefix": "lab"})
+        await ac.post("/drones/met-1/start")
+        try:
+            await ac.get("/drones/met-1")
+            await ac.get("/drones/nope-404")
+            await ac.post("/drones/met-1/cmd", params={"wait": "true"}, json={"cmd": "ping"})
+            await ac.post("/drones/met-1/cmd", params={"wait": "true"}, json={"cmd": "x" * 40})
+            r = await ac.get("/metrics")
+        finally:
+            await ac.post("/drones/met-1/stop")
+            await ac.delete("/drones/met-1")
+        main.fleet.engine.shutdown()
+
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    s = samples(r.text)
+    # modèle de route, pas le chemin réel (cardinalité bornée)
+    route = (("method", "GET"), ("route", "/drones/{drone_id}"), ("status", "2xx"))
+    assert s[("fleet_http_request_duration_seconds_count", route)] >= 1
+    route_404 = (("method", "GET"), ("route", "/drones/{drone_id}"), ("status", "4xx"))
+    assert s[("fleet_http_request_duration_seconds_count", route_404)] >= 1
+    assert not any("nope-404" in str(k) for k in s)
+
+    assert s[("fleet_db_session_seconds_count", (("kind", "async"),))] >= 1
+    assert s[("fleet_command_sign_seconds_count", ())] >= 2
+    assert s[("fleet_workers", (("state", "running"),))] >= 0
+    assert s[("fleet_commands_in_flight", ())] >= 0
+    assert s[("fleet_commands_total", (("cmd", "ping"), ("result", "acked")))] >= 1
+    # nom de commande inconnu : regroupé
+    assert s[("fleet_commands_total", (("cmd", "other"), ("result", "failed")))] >= 1
@@ -0,0 +1,92 @@
+import time
+
+from bus import Backoff, ClientBus, MqttPool
+
+
+class FakeClient:
+    """Client paho minimal : enregistre publications et délais de reconnexion."""
+
+    def __init__(self):
+        self.sent = []
+        self.delays = []
+        self.subscribed = []
+        self.on_connect = self.on_disconnect = self.on_connect_fail = None
+
+    def publish(self, topic, payload, qos=0):
+        self.sent.append((topic, payload, qos))
+        return type("Info", (), {"rc": 0})()
+
+    def reconnect_delay_set(self, min_delay, max_delay):
+        self.delays.append(min_delay)
+
+    def connect_async(self, host, port, keepalive=60):
+        self.target = (host, port)
+
+    def loop_start(self):
+        pass
+
+    def subscribe(self, topic):
+        self.subscribed.append(topic)
+
+    def message_callback_add(self, topic, cb):
+        pass
+
+
+def test_backoff_is_exponential_jittered_and_capped():
+    lo = Backoff(base=1.0, cap=8.0, rng=lambda: 0.0)
+    hi = Backoff(base=1.0, cap=8.0, rng=lambda: 1.0)
+    assert [lo.next() for _ in range(6)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+    assert [hi.next() for _ in range(6)] == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+    lo.reset()
+    assert lo.next() == 0.5
+    delays = {Backoff(base=1.0, cap=8.0).next() for _ in range(50)}
+    assert len(delays) > 1 and all(0.5 <= d <= 1.0 for d in delays)
+
+
+def test_client_bus_buffers_commands_until_connected():
+    client = FakeClient()
+    bus = ClientBus(client, Backoff(base=1.0, rng=lambda: 1.0), max_buffer=2)
+    bus.subscribe("lab/drone/d-1/commands", lambda raw: None)
+    t0 = time.perf_counter()
+    bus.connect("broker.invalid", 1883)
+    assert time.perf_counter() - t0 < 0.05 and client.target == ("broker.invalid", 1883)
+
+    # broker injoignable : échecs espacés par le backoff
+    client.on_connect_fail(client, None)
+    client.on_connect_fail(client, None)
+    assert client.delays == [1.0, 2.0] and bus.link.failures == 2
+
+    bus.publish("lab/drone/d-1/commands", b"takeoff", 1)
+    bus.publish("lab/drone/d-1/telemetry", b"{}", 0)  # QoS 0 : pas gardé
+    bus.publish("lab/drone/d-1/commands", b"goto", 1)
+    bus.publish("lab/drone/d-1/commands", b"land", 1)  # file pleine
+    assert client.sent == [("lab/drone/d-1/telemetry", b"{}", 0)]
+    assert bus.link.stats()["queued"] == 2 and bus.link.dropped == 1
+
+    client.on_connect(client, None, {}, 0)
+    assert client.subscribed == ["lab/drone/d-1/commands"] * 2  # abonnement rejoué
+    assert client.sent[1:] == [("lab/drone/d-1/commands", b"takeoff", 1), ("lab/drone/d-1/commands", b"goto", 1)]
+    bus.publish("lab/drone/d-1/commands", b"rth", 1)
+    assert client.sent[-1] == ("lab/drone/d-1/commands", b"rth", 1)
+    assert bus.link.stats()["queued"] == 0 and bus.link.first_connect_sec is not None
+
+    # coupure : backoff repart du premier palier
+    client.on_disconnect(client, None, 7)
+    assert not bus.link.connected and client.delays[-1] == 1.0
+
+
+def test_pool_connect_returns_immediately_without_broker():
+    pool = MqttPool("127.0.0.1", 9, size=2, backoff=lambda: Backoff(base=0.05, cap=0.05))
+    t0 = time.perf_counter()
+    pool.connect()
+    try:
+        assert time.perf_counter() - t0 < 0.5
+        pool.publish("lab/drone/d-1/commands", b"ping", 1)
+        deadline = time.monotonic() + 5.0
+        while sum(c.link.failures for c in pool.conns) < 4 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        stats = [c["link"] for c in pool.stats()["connections"]]
+        assert sum(s["failures"] for s in stats) >= 4  # ~50 ms entre deux tentatives
+        assert sum(s["queued"] for s in stats) == 1 and not any(s["connected"] for s in stats)
+    finally:
+        pool.close()
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from bus import MqttPool
+
+
+def test_pool_routes_commands_by_topic_and_keeps_drone_on_one_connection():
+    pool = MqttPool("localhost", 1883, size=3, max_queue=2)
+    got = []
+    pool.subscribe("lab/drone/d-1/commands", lambda raw: got.append(("d-1", raw)))
+    pool.subscribe("lab/drone/d-2/commands", lambda raw: got.append(("d-2", raw)))
+
+    pool._on_message(None, None, SimpleNamespace(topic="lab/drone/d-2/commands", payload=b"x"))
+    pool._on_message(None, None, SimpleNamespace(topic="lab/drone/d-9/commands", payload=b"y"))
+    assert got == [("d-2", b"x")]
+    assert pool.stats()["unrouted"] == 1
+
+    assert pool.connection_for("lab/drone/d-1/telemetry") is pool.connection_for("lab/drone/d-1/events")
+
+    pool.unsubscribe("lab/drone/d-1/commands")
+    pool.unsubscribe("lab/drone/d-2/commands")
+    assert pool.stats()["routes"] == 0
+
+
+def test_pool_connection_drops_when_queue_is_full():
+    pool = MqttPool("localhost", 1883, size=1, max_queue=2)
+    conn = pool.conns[0]
+    conn.pending = 2  # file pleine
+    pool.publish("lab/drone/d-1/telemetry", b"{}")
+    assert conn.dropped == 1
+
+    conn.pending = 0  # pas de broker : publication refusée par paho
+    pool.publish("lab/drone/d-1/telemetry", b"{}")
+    assert conn.failed == 1 and conn.pending == 0
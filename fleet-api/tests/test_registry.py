@@ -0,0 +1,41 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from main import app, registry
+from registry import DroneRegistry
+
+
+@pytest.mark.asyncio
+async def test_conditional_gets_and_write_through():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones", json={"id": "reg-1", "topic_prefix": "reg"})
+
+        r1 = await ac.get("/drones/reg-1")
+        etag = r1.headers["ETag"]
+        r2 = await ac.get("/drones/reg-1", headers={"If-None-Match": etag})
+        assert r2.status_code == 304 and r2.headers["ETag"] == etag
+
+        lst = await ac.get("/drones")
+        assert (await ac.get("/drones", headers={"If-None-Match": lst.headers["ETag"]})).status_code == 304
+
+        # une écriture change la version du drone et de la collection
+        await ac.patch("/drones/reg-1", json={"cruise_speed_mps": 3.0})
+        r3 = await ac.get("/drones/reg-1", headers={"If-None-Match": etag})
+        assert r3.status_code == 200 and r3.json()["cruise_speed_mps"] == 3.0
+        assert (await ac.get("/drones", headers={"If-None-Match": lst.headers["ETag"]})).status_code == 200
+
+        resp = await ac.patch("/drones/bulk", json=[{"id": "reg-1", "battery_drain": 0.5}])
+        assert resp.json()["ok"] == 1
+
+        # la base a bien reçu les écritures : un registre rechargé voit la même chose
+        fresh = DroneRegistry(registry.database_url, registry.status_fn)
+        await fresh.load()
+        assert fresh.row("reg-1") == registry.row("reg-1")
+        assert fresh.row("reg-1")["battery_drain"] == 0.5
+
+        await ac.delete("/drones/reg-1")
+        assert (await ac.get("/drones/reg-1")).status_code == 404
+        fresh = DroneRegistry(registry.database_url, registry.status_fn)
+        await fresh.load()
+        assert "reg-1" not in fresh
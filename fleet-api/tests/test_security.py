@@ -0,0 +1,51 @@
+import hashlib
+import hmac
+import json
+
+from security import Signer, sign, verify
+
+
+def legacy_sign(payload, secret):
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+PAYLOADS = [
+    {"cmd": "ping"},
+    {"cmd": "goto", "cid": "a-1", "args": {"lon": 2.35, "lat": 48.85, "alt": 20}},
+    {"cmd": "takeoff", "args": {"alt": 10.0, "note": "é"}},
+]
+
+
+def test_signatures_are_wire_compatible():
+    s = Signer("s3cret")
+    for p in PAYLOADS:
+        assert s.sign(p) == sign(p, "s3cret") == legacy_sign(p, "s3cret")
+        assert verify(p, legacy_sign(p, "s3cret"), "s3cret")
+    assert s.sign_many(PAYLOADS) == [legacy_sign(p, "s3cret") for p in PAYLOADS]
+    assert not verify(PAYLOADS[0], legacy_sign(PAYLOADS[0], "other"), "s3cret")
+    assert not verify(PAYLOADS[0], "é" * 64, "s3cret")  # sig non ASCII : refusée, pas d'exception
+
+
+def test_unseal_fast_path_and_legacy_envelopes():
+    s = Signer("s3cret")
+    for p in PAYLOADS:
+        sig, raw = s.seal(p)
+        assert json.loads(raw) == {"sig": sig, "payload": p}
+        assert s.unseal(raw) == (p, True)
+        # enveloppe d'un ancien émetteur (séparateurs par défaut, ordre quelconque)
+        legacy = json.dumps({"payload": p, "sig": legacy_sign(p, "s3cret")}).encode()
+        assert s.unseal(legacy) == (p, True)
+
+    sig, raw = s.seal(PAYLOADS[1])
+    tampered = raw.replace(b'"alt":20', b'"alt":99')
+    payload, ok = s.unseal(tampered)
+    assert payload["args"]["alt"] == 99 and not ok
+    assert Signer("other").unseal(raw) == (PAYLOADS[1], False)
+    assert s.unseal(b"not json") == (None, False)
+    assert s.unseal(b'{"sig": 1, "payload": {}}') == (None, False)
+
+    bodies = [json.dumps(p, separators=(",", ":"), sort_keys=True).encode() for p in PAYLOADS]
+    sigs = s.sign_many(PAYLOADS)
+    assert s.verify_many(zip(bodies, sigs)) == [True, True, True]
+    assert s.verify_many(zip(bodies, reversed(sigs))) == [False, True, False]
@@ -0,0 +1,128 @@
+import json
+from collections import Counter
+
+import httpx
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import main
+from checkpoint import SavedDrone
+from sharding import FORWARDED_HEADER, HashRing, ShardMap, parse_members
+
+IDS = [f"drone-{i:05d}" for i in range(10_000)]
+
+
+def test_ring_is_balanced_and_moves_few_drones_on_membership_change():
+    ring = HashRing(["a", "b", "c"])
+    before = {i: ring.owner(i) for i in IDS}
+    assert HashRing(["c", "b", "a"]).owner("drone-00042") == before["drone-00042"]  # ordre indifférent
+    for n in Counter(before.values()).values():
+        assert 2500 < n < 4200
+
+    grown = HashRing(["a", "b", "c", "d"])
+    after = {i: grown.owner(i) for i in IDS}
+    moved = [i for i in IDS if after[i] != before[i]]
+    assert all(after[i] == "d" for i in moved)  # seuls les drones repris par "d" bougent
+    assert 1800 < len(moved) < 3200
+    assert HashRing().owner("x") is None
+
+
+def test_shard_map_always_includes_itself():
+    assert parse_members(" a=http://a:8000/, b=http://b:8000 ,") == {"a": "http://a:8000", "b": "http://b:8000"}
+    m = ShardMap("a", "http://a:8000", {"b": "http://b:8000"})
+    assert sorted(m.members) == ["a", "b"] and m.changes == 1
+    assert not m.set_members({"b": "http://b:8000"})  # inchangé
+    assert m.set_members({}) and m.members == {"a": "http://a:8000"} and m.is_local("anything")
+
+
+@pytest.fixture
+def two_replicas(monkeypatch):
+    """Cette app est la réplique "a" ; "b" est simulée par un transport httpx."""
+    shards = ShardMap("a", "http://a", {"b": "http://b"})
+    sent = []
+
+    def handler(request: httpx.Request):
+        sent.append(request)
+        return httpx.Response(200, json={"ok": True, "replica": "b", "path": request.url.path})
+
+    monkeypatch.setattr(main, "shards", shards)
+    monkeypatch.setattr(main, "_http", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    started = []
+
+    def fake_start(drone):  # pas de thread : ensure_worker seulement, marqué en marche
+        started.append(drone.id)
+        w = main.fleet.ensure_worker(drone)
+        w.is_running = lambda: True
+        w.stop = lambda wait=True: setattr(w, "is_running", lambda: False)
+
+    monkeypatch.setattr(main.fleet, "start", fake_start)
+    local = next(i for i in IDS if shards.is_local(i))
+    remote = next(i for i in IDS if not shards.is_local(i))
+    return shards, sent, started, local, remote
+
+
+@pytest.mark.asyncio
+async def test_requests_for_other_shard_are_forwarded(two_replicas):
+    shards, sent, started, local, remote = two_replicas
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones/bulk", json=[{"id": local}, {"id": remote}])
+        try:
+            r = await ac.post(f"/drones/{remote}/cmd", params={"wait": "false"}, json={"cmd": "ping"})
+            assert r.json() == {"ok": True, "replica": "b", "path": f"/drones/{remote}/cmd"}
+            assert sent[0].headers[FORWARDED_HEADER] == "a" and sent[0].url.query == b"wait=false"
+            assert json.loads(sent[0].content) == {"cmd": "ping"}
+            assert (await ac.post(f"/drones/{remote}/start")).json()["replica"] == "b"
+            assert started == []
+
+            # propriétaire local, ou requête déjà relayée : traitée ici
+            assert (await ac.post(f"/drones/{local}/start")).json() == {"ok": True, "status": "running"}
+            r = await ac.post(f"/drones/{remote}/start", headers={FORWARDED_HEADER: "b"})
+            assert r.json()["status"] == "running" and started == [local, remote]
+            assert len(sent) == 2
+        finally:
+            sent.clear()
+            await ac.request("DELETE", "/drones/bulk", json={"ids": [local, remote]})
+    # supprimé ici : arrêt demandé au propriétaire
+    assert [r.url.path for r in sent] == [f"/drones/{remote}/stop"]
+
+
+@pytest.mark.asyncio
+async def test_rebalance_hands_off_leaving_drones_and_resumes_arrivals(two_replicas):
+    shards, sent, started, local, remote = two_replicas
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones/bulk", json=[{"id": local}, {"id": remote}])
+        try:
+            # "b" absente : "a" simule les deux
+            shards.set_members({})
+            await main._persist_status([local, remote], "running")
+            await main._rebalance()
+            assert sorted(started) == sorted([local, remote])
+            main.fleet.workers[remote].apply_command("goto", {"lat": 49.0, "lon": 2.0})
+
+            # "b" revient : son drone lui est rendu avec son état
+            shards.set_members({"b": "http://b"})
+            started.clear()
+            await main._rebalance()
+            assert started == []
+            [handoff] = sent
+            assert handoff.url.path == "/shard/handoff"
+            [item] = json.loads(handoff.content)
+            assert item["id"] == remote and item["status"] == "flying" and item["waypoints"] == [[49.0, 2.0, None]]
+            assert remote not in main.fleet.workers and main.fleet.workers[local].is_running()
+
+            # passation reçue par "a" : reprise au prochain démarrage
+            sent.clear()
+            r = await ac.post("/shard/handoff", json=[{**item, "id": local, "battery_pct": 42.0}])
+            assert r.json() == {"ok": True, "received": 1, "restarted": 1}
+            assert main.fleet.workers[local].state.battery_pct == 42.0
+            assert (await ac.get("/shard")).json()["members"] == {"a": "http://a", "b": "http://b"}
+        finally:
+            main.fleet.saved.pop(local, None)
+            await ac.request("DELETE", "/drones/bulk", json={"ids": [local, remote]})
+
+
+def test_saved_drone_fields_match_handoff_model():
+    from models import DroneHandoff
+    assert set(SavedDrone._fields) | {"id"} == set(DroneHandoff.model_fields)
@@ -0,0 +1,74 @@
+import random
+import time
+
+from spatial import GridIndex, haversine_m
+
+
+def populate(n=3000, seed=3):
+    r = random.Random(seed)
+    idx, pts = GridIndex(cell_deg=0.01), {}
+    for i in range(n):
+        lat, lon = 48.8 + r.uniform(0, 0.2), 2.2 + r.uniform(0, 0.3)
+        idx.update(f"d-{i}", lat, lon)
+        pts[f"d-{i}"] = (lat, lon)
+    # déplacements (changement de case ou non) et suppressions
+    for i in range(0, n, 3):
+        lat, lon = 48.8 + r.uniform(0, 0.2), 2.2 + r.uniform(0, 0.3)
+        idx.update(f"d-{i}", lat, lon)
+        pts[f"d-{i}"] = (lat, lon)
+    for i in range(0, n, 10):
+        idx.remove(f"d-{i}")
+        del pts[f"d-{i}"]
+    return idx, pts
+
+
+def test_grid_queries_match_brute_force():
+    idx, pts = populate()
+    assert len(idx) == len(pts)
+
+    box = (48.85, 2.30, 48.90, 2.41)
+    expected = {d for d, (la, lo) in pts.items() if box[0] <= la <= box[2] and box[1] <= lo <= box[3]}
+    assert set(idx.bbox(*box)) == expected
+    assert set(idx.bbox(40.0, -5.0, 55.0, 10.0)) == set(pts)  # grande zone : parcours des cases occupées
+
+    center = (48.87, 2.33)
+    dist = sorted((haversine_m(*center, la, lo), d) for d, (la, lo) in pts.items())
+    got = idx.radius(*center, 1500.0)
+    assert [d for d, _ in got] == [d for m, d in dist if m <= 1500.0]
+
+    assert [d for d, _ in idx.nearest(*center, k=10)] == [d for _, d in dist[:10]]
+    far = (49.5, 3.5)  # hors de la zone peuplée
+    far_dist = sorted((haversine_m(*far, la, lo), d) for d, (la, lo) in pts.items())
+    assert [d for d, _ in idx.nearest(*far, k=3)] == [d for _, d in far_dist[:3]]
+
+
+def test_spatial_endpoints():
+    from fastapi.testclient import TestClient
+    from main import app, spatial
+
+    spatial.update("sp-1", 10.0, 10.0)
+    spatial.update("sp-2", 10.001, 10.0)
+    spatial.update("sp-3", 11.0, 11.0)
+    tc = TestClient(app)
+    ids = lambda r: [i["id"] for i in r.json()["items"]]  # noqa: E731
+    assert sorted(ids(tc.get("/spatial/bbox", params=dict(min_lat=9.9, min_lon=9.9, max_lat=10.1, max_lon=10.1)))) == ["sp-1", "sp-2"]
+    assert ids(tc.get("/spatial/radius", params=dict(lat=10.0, lon=10.0, radius_m=50))) == ["sp-1"]
+    near = tc.get("/spatial/nearest", params=dict(lat=10.0, lon=10.0, k=2)).json()["items"]
+    assert [i["id"] for i in near] == ["sp-1", "sp-2"] and near[1]["distance_m"] > 100
+
+
+def test_nearest_far_from_fleet_or_large_k_stays_bounded():
+    idx, pts = populate(n=1000)
+    idx.update("outlier", -33.9, 151.2)  # une case isolée à l'autre bout du monde
+    pts["outlier"] = (-33.9, 151.2)
+    t0 = time.perf_counter()
+    far = (35.7, 139.7)
+    got = idx.nearest(*far, k=5)
+    everyone = idx.nearest(48.9, 2.3, k=len(pts) + 1)
+    assert time.perf_counter() - t0 < 1.0
+    far_dist = sorted((haversine_m(*far, la, lo), d) for d, (la, lo) in pts.items())
+    assert [d for d, _ in got] == [d for _, d in far_dist[:5]]
+    assert len(everyone) == len(pts)
+
+    idx.remove("outlier")  # l'étendue se recalcule après retrait
+    assert idx._get_extent()[0] > 0
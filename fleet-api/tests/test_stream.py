@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from main import app, hub
+from stream import StreamClient, parse_bbox, parse_ids
+
+
+def rec(drone_id, lat=48.0, lon=2.0, battery=90.0, ts=1.0):
+    return {"drone_id": drone_id, "ts": ts, "position": {"lat": lat, "lon": lon, "alt": 10.0},
+            "speed_mps": 0.0, "battery_pct": battery, "status": "idle", "heading_deg": 0.0}
+
+
+def test_stream_client_coalesces_bounds_and_sends_deltas():
+    async def scenario():
+        c = StreamClient(asyncio.get_running_loop(), bbox=(47.0, 1.0, 49.0, 3.0), max_pending=2)
+        assert not c.matches(rec("far", lat=10.0))
+        for ts in (1.0, 2.0, 3.0):
+            c.offer(rec("a", ts=ts))
+        c.offer(rec("b"))
+        c.offer(rec("c"))  # file pleine : écarté
+        first = await c.next_batch()
+        assert [u["id"] for u in first] == ["a", "b"]
+        assert first[0]["full"] and first[0]["ts"] == 3.0
+        assert (c.coalesced, c.dropped) == (2, 1)
+
+        c.offer(rec("a", ts=4.0, battery=89.5))
+        (delta,) = await c.next_batch()
+        assert delta == {"id": "a", "ts": 4.0, "battery_pct": 89.5}
+
+    asyncio.run(scenario())
+
+
+def test_websocket_fans_out_filtered_telemetry():
+    with TestClient(app) as tc:
+        with tc.websocket_connect("/ws/telemetry?ids=ws-1") as ws:
+            for _ in range(100):
+                if hub.stats()["clients"]:
+                    break
+                time.sleep(0.01)
+            hub.publish(rec("ws-2"))
+            hub.publish(rec("ws-1", ts=7.0))
+            msg = json.loads(ws.receive_text())
+            assert msg["type"] == "telemetry"
+            assert [u["id"] for u in msg["updates"]] == ["ws-1"]
+            assert msg["updates"][0]["ts"] == 7.0
+
+
+def test_filter_parsing_rejects_malformed_values():
+    assert parse_ids(["a", "b"]) == {"a", "b"}
+    assert parse_ids("a,b") == {"a", "b"}
+    assert parse_bbox([1, 2, 3, 4]) == (1.0, 2.0, 3.0, 4.0)
+    for bad in ([1, 2], ["a", "b", "c", "d"], {"x": 1}, [None, 1, 2, 3]):
+        with pytest.raises(ValueError):
+            parse_bbox(bad)
+    with pytest.raises(ValueError):
+        parse_ids([1, 2])
+
+
+def test_websocket_closes_on_invalid_filter_update():
+    with TestClient(app) as tc:
+        with tc.websocket_connect("/ws/telemetry") as ws:
+            ws.send_text(json.dumps({"bbox": [1, 2]}))
+            with pytest.raises(WebSocketDisconnect) as exc:
+                ws.receive_text()
+            assert exc.value.code == 1008
+        # le client fautif n'est plus enregistré : la diffusion continue
+        for _ in range(100):
+            if not hub.stats()["clients"]:
+                break
+            time.sleep(0.01)
+        hub.publish(rec("ws-3"))
+        assert hub.stats()["clients"] == 0
@@ -0,0 +1,72 @@
+import os
+os.environ["DISABLE_MQTT"] = "1"
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from main import app, ingestor, telemetry_cache
+from telemetry_codec import TelemetryEncoder
+
+
+def rec(drone_id, ts=1.0):
+    return {"drone_id": drone_id, "ts": ts, "position": {"lat": 48.0, "lon": 2.0, "alt": 10.0},
+            "speed_mps": 0.0, "battery_pct": 99.0, "status": "idle", "heading_deg": 0.0}
+
+
+def test_ingestor_decodes_json_binary_and_frames():
+    msg = lambda topic, payload: SimpleNamespace(topic=topic, payload=payload)  # noqa: E731
+    ingestor._on_message(None, None, msg("lab/drone/ing-1/telemetry", json.dumps(rec("ing-1")).encode()))
+    ingestor._on_message(None, None, msg("lab/drone/ing-2/telemetry", TelemetryEncoder().encode(rec("ing-2"))))
+    frame = {"v": 1, "ts": 1.0, "count": 2, "drones": [rec("ing-3"), rec("ing-4")]}
+    ingestor._on_message(None, None, msg("lab/fleet/telemetry", json.dumps(frame).encode()))
+    ingestor._on_message(None, None, msg("lab/drone/ing-1/telemetry", b"not json"))
+    assert all(telemetry_cache.get(f"ing-{i}") for i in range(1, 5))
+    assert ingestor.errors >= 1
+
+    # un message plus ancien n'écrase pas le dernier état
+    assert not telemetry_cache.update(rec("ing-1", ts=0.5))
+
+
+@pytest.mark.asyncio
+async def test_latest_telemetry_endpoints():
+    telemetry_cache.update(rec("lat-1", ts=5.0))
+    telemetry_cache.update(rec("lat-2", ts=6.0))
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        one = await ac.get("/drones/lat-1/telemetry/latest")
+        assert one.status_code == 200 and one.json()["ts"] == 5.0
+        assert (await ac.get("/drones/nope/telemetry/latest")).status_code == 404
+
+        bulk = (await ac.get("/telemetry/latest", params={"ids": "lat-1,lat-2,nope"})).json()
+        assert set(bulk["items"]) == {"lat-1", "lat-2"}
+        assert bulk["missing"] == ["nope"]
+
+        stats = (await ac.get("/telemetry/stats")).json()
+        assert stats["messages"] >= 2
+
+
+def test_bad_payloads_and_failing_listener_do_not_escape():
+    msg = lambda topic, payload: SimpleNamespace(topic=topic, payload=payload)  # noqa: E731
+    no_ts = {k: v for k, v in rec("bad-1").items() if k != "ts"}
+    # aucun de ces messages ne doit lever dans le thread paho
+    ingestor._on_message(None, None, msg("lab/drone/bad-1/telemetry", b"[1]"))
+    ingestor._on_message(None, None, msg("lab/drone/bad-1/telemetry", json.dumps(no_ts).encode()))
+    ingestor._on_message(None, None, msg("lab/drone/bad-1/telemetry",
+                                         json.dumps({"drone_id": "bad-1", "ts": 1.0}).encode()))
+    assert telemetry_cache.get("bad-1") is None
+
+    seen = []
+    def boom(_rec):
+        raise RuntimeError("listener down")
+    telemetry_cache.listeners.insert(0, boom)
+    telemetry_cache.listeners.append(seen.append)
+    try:
+        assert telemetry_cache.update(rec("bad-2"))
+    finally:
+        telemetry_cache.listeners.remove(boom)
+        telemetry_cache.listeners.remove(seen.append)
+    assert [r["drone_id"] for r in seen] == ["bad-2"]
+    assert telemetry_cache.stats()["listener_errors"] >= 1
@@ -0,0 +1,38 @@
+import json
+import time
+from types import SimpleNamespace
+
+from telemetry import FanOutBridge, TelemetryBatcher, split_frame
+
+
+def rec(i):
+    return {"drone_id": f"d-{i}", "ts": 1.0, "position": {"lat": 1.0, "lon": 2.0, "alt": 0.0},
+            "speed_mps": 0.0, "battery_pct": 100.0, "status": "idle", "heading_deg": 0.0}
+
+
+def test_batcher_flushes_on_size_and_on_latency():
+    sent = []
+    b = TelemetryBatcher(lambda t, p, q: sent.append((t, p)), max_drones=3, max_latency=0.05)
+    for i in range(4):
+        b.add("lab", rec(i))
+    assert len(sent) == 1
+    assert sent[0][0] == "lab/fleet/telemetry"
+    assert [r["drone_id"] for r in split_frame(sent[0][1])] == ["d-0", "d-1", "d-2"]
+
+    time.sleep(0.2)  # le reste part à l'échéance de latence
+    b.shutdown()
+    assert len(sent) == 2
+    assert [r["drone_id"] for r in split_frame(sent[1][1])] == ["d-3"]
+
+
+def test_fan_out_bridge_republishes_per_drone():
+    published = []
+    client = SimpleNamespace(publish=lambda t, p, qos=0: published.append((t, json.loads(p))))
+    bridge = FanOutBridge(client, "lab")
+    sent = []
+    b = TelemetryBatcher(lambda t, p, q: sent.append(p), max_drones=2)
+    b.add("lab", rec(1))
+    b.add("lab", rec(2))
+    bridge._on_frame(client, None, SimpleNamespace(payload=sent[0].encode()))
+    assert [t for t, _ in published] == ["lab/drone/d-1/telemetry", "lab/drone/d-2/telemetry"]
+    assert published[0][1] == rec(1)
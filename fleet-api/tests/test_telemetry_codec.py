@@ -0,0 +1,51 @@
+import json
+
+from telemetry import TelemetryBatcher, split_frame
+from telemetry_codec import MAX_FRAME_RECORDS, TelemetryDecoder, TelemetryEncoder, decode_any
+
+
+def rec(drone_id="drone-007", status="flying"):
+    return {"drone_id": drone_id, "ts": 1700000000.25,
+            "position": {"lat": 48.8566123, "lon": 2.3522456, "alt": 35.5},
+            "speed_mps": 8.0, "battery_pct": 87.25, "status": status, "heading_deg": 123.5}
+
+
+def test_binary_roundtrip_and_id_interning():
+    enc, dec = TelemetryEncoder(announce_every=100), TelemetryDecoder()
+    first, second = enc.encode(rec()), enc.encode(rec())
+    assert len(second) == 52 and len(first) == 52 + 1 + len("drone-007")
+    assert dec.decode(first) == rec()
+    assert dec.decode(second) == rec()  # id retrouvé via la table
+
+
+def test_decode_any_accepts_json_and_uses_topic_for_unknown_ref():
+    assert decode_any(json.dumps(rec()).encode()) == rec()
+
+    enc = TelemetryEncoder()
+    enc.encode(rec("d-x"))  # annonce perdue (abonné arrivé en retard)
+    late = TelemetryDecoder()
+    got = decode_any(enc.encode(rec("d-x", "weird")), topic="lab/drone/d-x/telemetry", decoder=late)
+    assert got["drone_id"] == "d-x" and got["status"] == "unknown"
+
+
+def test_binary_batch_frame_splits_back():
+    sent = []
+    b = TelemetryBatcher(lambda t, p, q: sent.append(p), max_drones=2, binary_prefixes={"lab"})
+    b.add("lab", rec("a"))
+    b.add("lab", rec("b"))
+    assert isinstance(sent[0], bytes)
+    assert [r["drone_id"] for r in split_frame(sent[0], TelemetryDecoder())] == ["a", "b"]
+
+
+def test_frames_always_carry_ids_for_late_subscribers():
+    enc = TelemetryEncoder()
+    enc.encode_frame([rec("a"), rec("b")])  # premières annonces perdues
+    late = TelemetryDecoder()
+    again = enc.encode_frame([rec("a"), rec("b")])
+    assert [r["drone_id"] for r in late.decode(again)] == ["a", "b"]
+
+
+def test_binary_batcher_clamps_frame_size_to_u16():
+    b = TelemetryBatcher(lambda t, p, q: None, max_drones=100_000, binary_prefixes={"lab"})
+    assert b.max_drones == MAX_FRAME_RECORDS
+    assert TelemetryBatcher(lambda t, p, q: None, max_drones=100_000).max_drones == 100_000
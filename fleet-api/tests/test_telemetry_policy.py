@@ -0,0 +1,91 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, inspect, text
+
+import main
+from headless import from_scenario
+from models import add_missing_columns
+from telemetry_policy import ADAPTIVE, TelemetryGate, TelemetryPolicy, gate_for
+
+
+def test_gate_deadbands_heartbeat_and_flying_rate():
+    assert gate_for(TelemetryPolicy(), 1.0) is None
+    with pytest.raises(ValueError):
+        gate_for(TelemetryPolicy(mode="sometimes"), 1.0)
+
+    g = TelemetryGate(TelemetryPolicy(mode=ADAPTIVE, heartbeat_sec=30.0, flying_interval_sec=2.0), 1.0)
+    # posé, immobile : premier état puis un battement toutes les 30 s
+    # (pas légèrement en avance : arrondi au pas le plus proche)
+    idle = [g.should_publish(t - 0.001 * (t % 3), 48.0, 2.0, 0.0, 100.0, "idle") for t in range(61)]
+    assert [t for t, sent in enumerate(idle) if sent] == [0, 30, 60]
+
+    assert g.should_publish(61, 48.0, 2.0, 0.0, 100.0, "flying")        # statut
+    assert not g.should_publish(62, 48.0 + 1e-5, 2.0, 0.0, 100.0, "flying")  # 1,1 m < 2 m
+    assert g.should_publish(63, 48.0, 2.0, 0.0, 100.0, "flying")        # cadence en vol
+    assert g.should_publish(64, 48.0 + 3e-5, 2.0, 0.0, 100.0, "flying")  # 3,3 m
+    assert g.should_publish(65, 48.0 + 3e-5, 2.0, 1.5, 100.0, "flying")  # altitude
+    assert g.should_publish(66, 48.0 + 3e-5, 2.0, 1.5, 98.9, "flying")   # batterie
+    assert (g.sent, g.suppressed) == (8, 59)
+
+    g.reset()
+    assert g.should_publish(66.5, 48.0 + 3e-5, 2.0, 1.5, 98.9, "flying")
+
+
+def test_adaptive_mission_publishes_less_with_same_outcome():
+    def scenario(mode):
+        return {
+            "drones": [{"id": f"a-{i}", "start_lat": 48.0, "start_lon": 2.0 + i * 1e-3,
+                        "telemetry_mode": mode} for i in range(3)],
+            "commands": [{"t": 10, "drone": "a-0", "cmd": "goto", "args": {"lat": 48.005, "lon": 2.0}}],
+        }
+
+    periodic = from_scenario(scenario("periodic")).run(600)
+    adaptive = from_scenario(scenario("adaptive")).run(600)
+    for drone_id, d in periodic["drones"].items():
+        a = adaptive["drones"][drone_id]
+        assert {k: v for k, v in a.items() if k != "records"} == {k: v for k, v in d.items() if k != "records"}
+    assert periodic["drones"]["a-1"]["records"] == 601
+    assert adaptive["drones"]["a-1"]["records"] == 21          # t = 0, 30, ..., 600
+    # vol de ~70 pas (555 m à 8 m/s) : une émission par pas, puis battements
+    assert 70 < adaptive["drones"]["a-0"]["records"] < 100
+
+
+@pytest.mark.asyncio
+async def test_policy_set_through_api():
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/drones", json={"id": "tp-1", "telemetry_mode": "adaptive", "heartbeat_sec": 10})
+        assert r.status_code == 200
+        body = r.json()
+        assert body["telemetry_mode"] == "adaptive" and body["heartbeat_sec"] == 10
+        assert body["deadband_m"] == 2.0
+        try:
+            assert (await ac.patch("/drones/tp-1", json={"telemetry_mode": "never"})).status_code == 422
+            assert (await ac.patch("/drones/tp-1", json={"heartbeat_sec": 0})).status_code == 422
+            r = await ac.patch("/drones/tp-1", json={"deadband_m": 5.0})
+            assert r.json()["deadband_m"] == 5.0 and r.json()["telemetry_mode"] == "adaptive"
+
+            w = main.fleet.ensure_worker(main.registry.get("tp-1"))
+            assert w.telemetry_gate.policy.deadband_m == 5.0 and w.telemetry_gate.policy.heartbeat_sec == 10
+        finally:
+            main.fleet.workers.pop("tp-1", None)
+            await ac.delete("/drones/tp-1")
+
+
+def test_add_missing_columns_migrates_old_drone_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE drone (id VARCHAR PRIMARY KEY, topic_prefix VARCHAR NOT NULL, "
+                          "start_lat FLOAT NOT NULL, start_lon FLOAT NOT NULL, start_alt FLOAT NOT NULL, "
+                          "publish_interval_sec FLOAT NOT NULL, cruise_speed_mps FLOAT NOT NULL, "
+                          "battery_drain FLOAT NOT NULL, heading_noise FLOAT NOT NULL, status VARCHAR NOT NULL)"))
+        conn.execute(text("INSERT INTO drone VALUES ('old-1', 'lab', 48, 2, 0, 1, 8, 0.005, 0, 'stopped')"))
+    with engine.begin() as conn:
+        added = add_missing_columns(conn)
+    assert "drone.telemetry_mode" in added and "drone.heartbeat_sec" in added
+    assert not any(a.startswith("telemetry_point.") for a in added)  # table absente : ignorée
+    with engine.begin() as conn:
+        assert add_missing_columns(conn) == []
+        row = conn.execute(text("SELECT telemetry_mode, deadband_m, heartbeat_sec FROM drone")).one()
+    assert tuple(row) == ("periodic", 2.0, 30.0)
+    assert "flying_interval_sec" in {c["name"] for c in inspect(engine).get_columns("drone")}
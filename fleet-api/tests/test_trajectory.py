@@ -0,0 +1,112 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+import main
+from bus import NullBus
+from engine import VectorDrone, VectorEngine
+from sim import DroneSimulator
+from trajectory import M_PER_DEG, Trajectory
+
+
+def make_sim(**kw):
+    params = dict(
+        drone_id="traj-1", topic_prefix="lab", shared_secret="s3cret",
+        start_lat=48.0, start_lon=2.0, start_alt=0.0, publish_interval_sec=1.0,
+        cruise_speed_mps=8.0, battery_drain=0.005, heading_noise=0.0,
+    )
+    params.update(kw)
+    return DroneSimulator(**params)
+
+
+def test_segments_evaluate_position_battery_and_heading_at_any_time():
+    tr = Trajectory()
+    # 0,001° = 111 m vers le nord (13,875 s), puis 111 m vers l'est
+    tr.plan(10.0, 48.0, 2.0, 50.0, [(48.001, 2.0, 30.0), (48.001, 2.001, None)], 8.0, 0.005)
+    leg = 0.001 * M_PER_DEG / 8.0
+    assert tr.end_time == pytest.approx(10.0 + 2 * leg)
+
+    mid = tr.at(10.0 + leg / 2)
+    assert (mid.lat, mid.lon, mid.alt, mid.speed_mps) == (pytest.approx(48.0005), 2.0, 30.0, 8.0)
+    assert mid.heading_deg == 0.0 and mid.battery_pct == pytest.approx(50.0 - 0.04 * leg / 2)
+    second = tr.at(10.0 + leg * 1.5)
+    assert second.lon == pytest.approx(2.0005) and second.heading_deg == pytest.approx(90.0)
+    assert tr.at(0.0).lat == 48.0                         # avant le départ : point de départ
+    end = tr.at(1e9)
+    assert (end.lat, end.lon, end.speed_mps) == (48.001, 2.001, 0.0)
+    assert end.battery_pct == pytest.approx(50.0 - 0.04 * 2 * leg)
+    assert len(tr.remaining(10.0 + leg * 1.5)) == 1 and tr.done(10.0 + 2 * leg)
+
+    tr.append([(48.0, 2.001, None)], 8.0, 0.005)
+    assert len(tr.segments) == 3 and tr.segments[2].t0 == tr.segments[1].t1
+    # batterie vide : plancher à 0
+    tr.plan(0.0, 48.0, 2.0, 0.01, [(49.0, 2.0, None)], 8.0, 0.005)
+    assert tr.at(100.0).battery_pct == 0.0
+
+
+def test_simulator_mission_rth_and_lazy_queries():
+    sim = make_sim()
+    sim.clock = lambda: 1000.0 + sim.t  # horloge alignée sur le temps simulé
+    sim.apply_command("mission", {"waypoints": [{"lat": 48.001, "lon": 2.0, "alt": 40},
+                                                {"lat": 48.001, "lon": 2.001}]})
+    for _ in range(5):
+        sim.step()
+    assert sim.state.alt == 40.0 and sim.state.lat == pytest.approx(48.0 + 40.0 / M_PER_DEG)
+
+    # prédiction à t+10 s sans avancer, puis vérification en avançant
+    predicted = sim.state_at(sim.clock() + 10.0)
+    assert sim.t == 5.0
+    for _ in range(10):
+        sim.step()
+    assert (sim.state.lat, sim.state.lon) == (pytest.approx(predicted.lat), pytest.approx(predicted.lon))
+    # 15 s : premier segment terminé, reste le second
+    assert [s["t1"] - 1000.0 for s in sim.mission(sim.clock())] == [pytest.approx(2 * 0.001 * M_PER_DEG / 8.0)]
+
+    sim.apply_command("mission", {"waypoints": [{"lat": 48.0, "lon": 2.001}], "append": True})
+    assert len(sim.trajectory.segments) == 3
+    while sim.state.status == "flying":
+        sim.step()
+    assert (sim.state.lat, sim.state.lon, sim.state.speed_mps) == (48.0, 2.001, 0.0)
+
+    # rth : retour réel au point de départ
+    sim.apply_command("rth", {})
+    while sim.state.status == "flying":
+        sim.step()
+    assert (sim.state.lat, sim.state.lon) == (48.0, 2.0)
+    assert sim.state_at(sim.clock() + 100).status == "idle"
+
+    with pytest.raises(ValueError):
+        sim.apply_command("mission", {"waypoints": []})
+
+
+def test_vector_drone_follows_mission_legs():
+    engine = VectorEngine(threaded=False)
+    d = VectorDrone(engine, NullBus(), drone_id="traj-v", topic_prefix="lab", shared_secret="s3cret",
+                    start_lat=48.0, start_lon=2.0, start_alt=0.0, publish_interval_sec=1.0,
+                    cruise_speed_mps=100.0, battery_drain=0.005, heading_noise=0.0)
+    d.start()
+    d.apply_command("mission", {"waypoints": [{"lat": 48.001, "lon": 2.0}, {"lat": 48.001, "lon": 2.001, "alt": 12}]})
+    # 111 m par segment à 100 m/s : 2 pas chacun, puis un pas pour enchaîner
+    for _ in range(10):
+        engine.run_due(now=float(engine.fleet.next_due[:engine.fleet.n].min()))
+    assert (d.state.lat, d.state.lon, d.state.alt, d.state.status) == (48.001, 2.001, 12.0, "idle")
+    d.stop()
+
+
+@pytest.mark.asyncio
+async def test_trajectory_endpoint():
+    transport = ASGITransport(app=main.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/drones", json={"id": "traj-api"})
+        try:
+            assert (await ac.get("/drones/traj-api/trajectory")).status_code == 404
+            w = main.fleet.ensure_worker(main.registry.get("traj-api"))
+            w.is_running = lambda: True  # pas de thread : on interroge seulement l'évaluation
+            w.apply_command("goto", {"lat": 48.8666, "lon": 2.3522})
+            now = w.clock()
+            body = (await ac.get("/drones/traj-api/trajectory", params={"at": now + 60})).json()
+            assert body["state"]["lat"] == pytest.approx(48.8566 + 480.0 / M_PER_DEG)
+            assert body["state"]["status"] == "flying" and len(body["segments"]) == 1
+            assert body["segments"][0]["t1"] == pytest.approx(now + 0.01 * M_PER_DEG / 8.0, abs=0.5)
+        finally:
+            main.fleet.workers.pop("traj-api", None)
+            await ac.delete("/drones/traj-api")
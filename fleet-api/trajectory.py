@@ -0,0 +1,119 @@
+"""
+Trajectoires analytiques : un goto / rth / mission devient une file de
+segments précalculés (départ, vitesse en degrés/s, instants de départ et
+d'arrivée, pente de batterie). Position, cap et batterie à un instant t se
+lisent en O(1) (O(log n) sur une mission de n segments), seulement quand
+un pas publie ou qu'une requête le demande : plus d'itération pas à pas.
+Même modèle que sim.move_towards (terrain plat, 111 km par degré, batterie
+drain * vitesse * durée de vol, plancher à 0) ; le temps est celui du
+simulateur (secondes, origine libre).
+"""
+
+import bisect
+import math
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+M_PER_DEG = 111_000.0
+
+Waypoint = Tuple[float, float, Optional[float]]  # (lat, lon, alt ou None = inchangée)
+
+
+class Sample(NamedTuple):
+    lat: float
+    lon: float
+    alt: Optional[float]
+    speed_mps: float
+    battery_pct: float
+    heading_deg: float
+
+
+class Segment:
+    __slots__ = ("t0", "t1", "lat0", "lon0", "lat1", "lon1", "vlat", "vlon",
+                 "speed", "heading", "battery0", "battery1", "drain_rate", "alt")
+
+    def __init__(self, t0: float, lat0: float, lon0: float, battery0: float,
+                 lat1: float, lon1: float, alt: Optional[float], speed_mps: float, drain: float):
+        dlat, dlon = lat1 - lat0, lon1 - lon0
+        dist = math.hypot(dlat, dlon)
+        self.t0 = t0
+        self.lat0, self.lon0, self.lat1, self.lon1 = lat0, lon0, lat1, lon1
+        self.alt = alt
+        self.battery0 = battery0
+        if dist < 1e-9 or speed_mps <= 0:
+            # déjà sur place : segment de durée nulle
+            self.t1, self.vlat, self.vlon, self.speed = t0, 0.0, 0.0, 0.0
+            self.heading, self.drain_rate, self.battery1 = 0.0, 0.0, battery0
+            return
+        deg_per_s = speed_mps / M_PER_DEG
+        self.t1 = t0 + dist / deg_per_s
+        self.vlat, self.vlon = dlat / dist * deg_per_s, dlon / dist * deg_per_s
+        self.speed = speed_mps
+        self.heading = (math.degrees(math.atan2(dlon, dlat)) + 360) % 360
+        self.drain_rate = drain * speed_mps  # %/s
+        self.battery1 = max(0.0, battery0 - self.drain_rate * (self.t1 - self.t0))
+
+    def at(self, t: float) -> Sample:
+        if t >= self.t1:
+            return Sample(self.lat1, self.lon1, self.alt, 0.0, self.battery1, self.heading)
+        dt = t - self.t0 if t > self.t0 else 0.0
+        return Sample(self.lat0 + self.vlat * dt, self.lon0 + self.vlon * dt, self.alt, self.speed,
+                      max(0.0, self.battery0 - self.drain_rate * dt), self.heading)
+
+    def as_dict(self) -> dict:
+        return {"t0": self.t0, "t1": self.t1, "from": [self.lat0, self.lon0], "to": [self.lat1, self.lon1],
+                "alt": self.alt, "speed_mps": self.speed, "heading_deg": self.heading,
+                "battery_start": self.battery0, "battery_end": self.battery1}
+
+
+class Trajectory:
+    """
+    File de segments d'un drone. plan() remplace la mission en partant de
+    l'état courant ; append() la prolonge depuis la fin du dernier segment.
+    Les listes sont remplacées, jamais modifiées en place : une lecture
+    depuis un autre thread voit l'ancienne ou la nouvelle mission.
+    """
+
+    def __init__(self):
+        self.segments: List[Segment] = []
+        self._ends: List[float] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.segments)
+
+    @property
+    def end_time(self) -> Optional[float]:
+        return self._ends[-1] if self._ends else None
+
+    def plan(self, t: float, lat: float, lon: float, battery_pct: float,
+             waypoints: Iterable[Waypoint], speed_mps: float, drain: float):
+        self._build(t, lat, lon, battery_pct, waypoints, speed_mps, drain, [])
+
+    def append(self, waypoints: Iterable[Waypoint], speed_mps: float, drain: float):
+        last = self.segments[-1]
+        self._build(last.t1, last.lat1, last.lon1, last.battery1, waypoints, speed_mps, drain,
+                    list(self.segments))
+
+    def _build(self, t, lat, lon, battery, waypoints, speed_mps, drain, segments):
+        for wlat, wlon, walt in waypoints:
+            seg = Segment(t, lat, lon, battery, wlat, wlon, walt, speed_mps, drain)
+            segments.append(seg)
+            t, lat, lon, battery = seg.t1, wlat, wlon, seg.battery1
+        self.segments, self._ends = segments, [s.t1 for s in segments]
+
+    def clear(self):
+        self.segments, self._ends = [], []
+
+    def done(self, t: float) -> bool:
+        return not self._ends or t >= self._ends[-1]
+
+    def at(self, t: float) -> Optional[Sample]:
+        segments = self.segments
+        if not segments:
+            return None
+        i = bisect.bisect_right(self._ends, t)
+        if i == len(segments):
+            return segments[-1].at(t)
+        return segments[i].at(t)
+
+    def remaining(self, t: float) -> List[Segment]:
+        return self.segments[bisect.bisect_right(self._ends, t):]
@@ -0,0 +1,332 @@
+"""
+Générateur de charge MQTT de bout en bout, contre un broker local (une seule
+machine Linux, ex: `docker compose up -d broker`).
+- N drones virtuels publient leur télémétrie (JSON, même forme que sim.py)
+  à --telemetry-hz, répartis sur un pool de --connections connexions ; ils
+  acquittent les commandes signées reçues (event "ack" avec le cid, comme
+  les simulateurs de fleet-api) ;
+- M opérateurs envoient des commandes signées (security.Signer) à
+  --cmd-rate commandes/s chacun, vers des drones tirés au hasard : les
+  drones virtuels, ou de vrais drones (--targets, même SHARED_SECRET) ;
+- une connexion de mesure, abonnée à la télémétrie et aux events, calcule
+  la latence publication -> réception et commande -> ack ;
+- rapport JSON : débits visés/atteints, pertes, p50/p95/p99.
+
+    python tools/loadgen.py --drones 1000 --telemetry-hz 1 --operators 4 --cmd-rate 20 --duration 30 --out report.json
+    python tools/loadgen.py --drones 0 --prefix lab --targets drone-001,drone-002 --operators 1 --cmd-rate 2
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import paho.mqtt.client as mqtt
+
+# modules partagés avec fleet-api (signature, percentiles)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fleet-api"))
+from security import Signer  # noqa: E402
+from commands import percentile  # noqa: E402
+
+
+class Samples:
+    """Latences en ms ; échantillon réservoir borné à `cap` valeurs."""
+
+    def __init__(self, cap: int = 200_000, seed: int = 0):
+        self.cap = cap
+        self.values: List[float] = []
+        self.count = 0
+        self.max = 0.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def add(self, v: float):
+        with self._lock:
+            self.count += 1
+            if v > self.max:
+                self.max = v
+            if len(self.values) < self.cap:
+                self.values.append(v)
+            else:
+                k = self._rng.randrange(self.count)
+                if k < self.cap:
+                    self.values[k] = v
+
+    def summary(self) -> dict:
+        with self._lock:
+            s = sorted(self.values)
+            return {
+                "count": self.count,
+                "p50_ms": percentile(s, 50),
+                "p95_ms": percentile(s, 95),
+                "p99_ms": percentile(s, 99),
+                "max_ms": self.max if self.count else None,
+            }
+
+
+def paced(stop: threading.Event, interval: float, fn) -> float:
+    """Appelle fn() toutes les `interval` s jusqu'à stop ; renvoie le retard max (s)."""
+    behind = 0.0
+    nxt = time.monotonic()
+    while not stop.is_set():
+        fn()
+        nxt += interval
+        delay = nxt - time.monotonic()
+        if delay > 0:
+            stop.wait(delay)
+        else:
+            behind = max(behind, -delay)
+            if delay < -1.0:
+                nxt = time.monotonic()  # on ne rattrape pas indéfiniment
+    return behind
+
+
+class LoadGen:
+    def __init__(self, args):
+        self.args = args
+        self.signer = Signer(args.secret)
+        self.prefix = args.prefix
+        self.stop = threading.Event()
+        self.clients: List[mqtt.Client] = []
+
+        self.drone_ids = [f"{args.id_prefix}{i:05d}" for i in range(args.drones)]
+        self.targets = [t for t in args.targets.split(",") if t] if args.targets else self.drone_ids
+        self._ours = frozenset(self.drone_ids)
+
+        self.telemetry = Samples()
+        self.acks = Samples()
+        self.acks_by_cmd: Dict[str, Samples] = {}
+        self.pending: Dict[str, tuple] = {}  # cid -> (t_envoi, cmd)
+        self.counters = {
+            "telemetry_sent": 0, "telemetry_received": 0, "publish_errors": 0,
+            "commands_sent": 0, "commands_received": 0, "acked": 0, "nacked": 0,
+        }
+        self._count_lock = threading.Lock()
+        self.behind = 0.0
+
+    def _inc(self, key: str, n: int = 1):
+        with self._count_lock:
+            self.counters[key] += n
+
+    # --- connexions ---
+
+    def _client(self, name: str, topics=(), on_message=None) -> mqtt.Client:
+        c = mqtt.Client(client_id=f"loadgen-{os.getpid()}-{name}")
+        if self.args.username:
+            c.username_pw_set(self.args.username, self.args.password)
+
+        def on_connect(client, userdata, flags, rc):
+            for k in range(0, len(topics), 500):
+                client.subscribe([(t, 1) for t in topics[k:k + 500]])
+
+        c.on_connect = on_connect
+        if on_message is not None:
+            c.on_message = on_message
+        c.max_queued_messages_set(self.args.max_queue)
+        c.connect(self.args.host, self.args.port, keepalive=30)
+        c.loop_start()
+        self.clients.append(c)
+        return c
+
+    # --- drones virtuels ---
+
+    def _drone_message(self, client, userdata, msg):
+        drone_id = msg.topic.rsplit("/", 2)[-2]
+        payload, ok = self.signer.unseal(msg.payload)
+        self._inc("commands_received")
+        if payload is None or not isinstance(payload.get("cid"), str):
+            return
+        client.publish(f"{self.prefix}/drone/{drone_id}/events", json.dumps({
+            "type": "ack", "cid": payload["cid"], "cmd": payload.get("cmd"),
+            "ok": ok, "error": None if ok else "signature invalid", "ts": time.time(),
+        }), qos=1)
+
+    def _telemetry_loop(self, client: mqtt.Client, ids: List[str]):
+        rng = random.Random(ids[0])
+        seq = itertools.count(1)
+        qos = self.args.telemetry_qos
+
+        def publish_one():
+            n = next(seq)
+            drone_id = ids[n % len(ids)]
+            rec = {
+                "drone_id": drone_id, "ts": time.time(), "seq": n,
+                "position": {"lat": 48.85 + rng.uniform(-0.05, 0.05),
+                             "lon": 2.35 + rng.uniform(-0.05, 0.05), "alt": 30.0},
+                "speed_mps": 8.0, "battery_pct": 90.0, "status": "flying", "heading_deg": 0.0,
+            }
+            info = client.publish(f"{self.prefix}/drone/{drone_id}/telemetry", json.dumps(rec), qos=qos)
+            self._inc("telemetry_sent")
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self._inc("publish_errors")
+
+        # un message toutes les 1/(hz * nb_drones) s : charge lissée sur la période
+        behind = paced(self.stop, 1.0 / (self.args.telemetry_hz * len(ids)), publish_one)
+        self.behind = max(self.behind, behind)
+
+    # --- opérateurs ---
+
+    def _operator_loop(self, client: mqtt.Client, seed: int):
+        rng = random.Random(seed)
+        cmds = self.args.cmds.split(",")
+        seq = itertools.count(1)
+
+        def send_one():
+            drone_id = rng.choice(self.targets)
+            cmd = rng.choice(cmds)
+            cid = f"lg{os.getpid():x}-{seed}-{next(seq):x}"
+            payload = {"cmd": cmd, "cid": cid}
+            if cmd == "goto":
+                payload["args"] = {"lat": 48.85 + rng.uniform(-0.05, 0.05),
+                                   "lon": 2.35 + rng.uniform(-0.05, 0.05), "alt": 30.0}
+            elif cmd == "takeoff":
+                payload["args"] = {"alt": 20.0}
+            _, raw = self.signer.seal(payload)
+            self.pending[cid] = (time.monotonic(), cmd)
+            info = client.publish(f"{self.prefix}/drone/{drone_id}/commands", raw, qos=1)
+            self._inc("commands_sent")
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self._inc("publish_errors")
+
+        behind = paced(self.stop, 1.0 / self.args.cmd_rate, send_one)
+        self.behind = max(self.behind, behind)
+
+    # --- mesure ---
+
+    def _monitor_message(self, client, userdata, msg):
+        now_wall, now = time.time(), time.monotonic()
+        try:
+            data = json.loads(msg.payload)
+        except ValueError:
+            return
+        if msg.topic.endswith("/telemetry"):
+            if isinstance(data, dict) and data.get("drone_id") in self._ours:
+                self._inc("telemetry_received")
+                self.telemetry.add((now_wall - data["ts"]) * 1000.0)
+            return
+        if not isinstance(data, dict) or data.get("type") != "ack":
+            return
+        sent = self.pending.pop(data.get("cid"), None)
+        if sent is None:
+            return
+        t0, cmd = sent
+        ms = (now - t0) * 1000.0
+        self._inc("acked" if data.get("ok") is True else "nacked")
+        self.acks.add(ms)
+        per = self.acks_by_cmd.get(cmd)
+        if per is None:
+            per = self.acks_by_cmd.setdefault(cmd, Samples())
+        per.add(ms)
+
+    # --- exécution ---
+
+    def run(self) -> dict:
+        a = self.args
+        self._client("monitor", [f"{self.prefix}/drone/+/telemetry", f"{self.prefix}/drone/+/events"],
+                     self._monitor_message)
+        threads = []
+        if self.drone_ids:
+            n = max(1, min(a.connections, len(self.drone_ids)))
+            for c in range(n):
+                ids = self.drone_ids[c::n]
+                client = self._client(f"drones-{c}", [f"{self.prefix}/drone/{i}/commands" for i in ids],
+                                      self._drone_message)
+                threads.append(threading.Thread(target=self._telemetry_loop, args=(client, ids), daemon=True))
+        if self.targets and a.cmd_rate > 0:
+            for m in range(a.operators):
+                client = self._client(f"operator-{m}")
+                threads.append(threading.Thread(target=self._operator_loop, args=(client, a.seed + m), daemon=True))
+
+        time.sleep(a.settle)  # CONNACK + SUBACK avant de mesurer
+        t0 = time.monotonic()
+        for t in threads:
+            t.start()
+        self.stop.wait(a.duration)
+        self.stop.set()
+        for t in threads:
+            t.join(timeout=5.0)
+        elapsed = time.monotonic() - t0
+        time.sleep(a.drain)  # messages encore en vol
+        for c in self.clients:
+            c.loop_stop()
+            c.disconnect()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        a, c = self.args, dict(self.counters)
+        sent, received = c["telemetry_sent"], c["telemetry_received"]
+        return {
+            "config": {k: v for k, v in vars(a).items() if k not in {"secret", "password", "out"}},
+            "elapsed_sec": elapsed,
+            "telemetry": {
+                "target_msg_per_sec": a.telemetry_hz * len(self.drone_ids),
+                "sent": sent,
+                "received": received,
+                "lost": max(0, sent - received),
+                "sent_per_sec": sent / elapsed,
+                "received_per_sec": received / elapsed,
+                "latency": self.telemetry.summary(),
+            },
+            "commands": {
+                "target_per_sec": a.cmd_rate * a.operators if self.targets else 0.0,
+                "sent": c["commands_sent"],
+                "received_by_virtual_drones": c["commands_received"],
+                "acked": c["acked"],
+                "nacked": c["nacked"],
+                "unanswered": len(self.pending),
+                "acked_per_sec": c["acked"] / elapsed,
+                "latency": self.acks.summary(),
+                "latency_by_cmd": {k: s.summary() for k, s in self.acks_by_cmd.items()},
+            },
+            "publish_errors": c["publish_errors"],
+            "max_behind_sec": self.behind,
+        }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Charge MQTT : drones virtuels + opérateurs")
+    p.add_argument("--host", default="localhost")
+    p.add_argument("--port", type=int, default=1883)
+    p.add_argument("--username", default=os.getenv("MQTT_USERNAME", ""))
+    p.add_argument("--password", default=os.getenv("MQTT_PASSWORD", ""))
+    p.add_argument("--secret", default=os.getenv("SHARED_SECRET", "dev-secret-change-me"))
+    p.add_argument("--prefix", default="load", help="préfixe de topics (lab = celui de fleet-api)")
+    p.add_argument("--id-prefix", default="load-")
+    p.add_argument("--drones", type=int, default=100, help="drones virtuels")
+    p.add_argument("--telemetry-hz", type=float, default=1.0, help="messages/s par drone")
+    p.add_argument("--telemetry-qos", type=int, default=0, choices=[0, 1])
+    p.add_argument("--connections", type=int, default=4, help="connexions pour les drones virtuels")
+    p.add_argument("--operators", type=int, default=1)
+    p.add_argument("--cmd-rate", type=float, default=5.0, help="commandes/s par opérateur")
+    p.add_argument("--cmds", default="ping,goto")
+    p.add_argument("--targets", help="ids de vrais drones (sinon les drones virtuels)")
+    p.add_argument("--duration", type=float, default=30.0)
+    p.add_argument("--settle", type=float, default=1.0, help="attente des connexions (s)")
+    p.add_argument("--drain", type=float, default=2.0, help="attente des derniers messages (s)")
+    p.add_argument("--max-queue", type=int, default=100_000, help="file paho par connexion")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", help="rapport JSON")
+    args = p.parse_args(argv)
+    if args.drones == 0 and not args.targets:
+        p.error("--drones 0 demande --targets")
+    if args.telemetry_hz <= 0:
+        p.error("--telemetry-hz doit être > 0")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = LoadGen(args).run()
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
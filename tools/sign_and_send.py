@@ -1,11 +1,11 @@
 # sign_and_send.py
-import json, hmac, hashlib, argparse, subprocess
+import argparse, os, subprocess, sys
 
-SECRET = "dev-secret-change-me"  # doit correspondre à SHARED_SECRET dans docker-compose
+# module de signature partagé avec fleet-api et l'agent (cf. fleet-api/security.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fleet-api"))
+from security import Signer  # noqa: E402
 
-def sign(payload: dict) -> str:
-    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
-    return hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+SECRET = "dev-secret-change-me"  # doit correspondre à SHARED_SECRET dans docker-compose
 
 def main():
     parser = argparse.ArgumentParser()
@@ -26,9 +26,9 @@ def main():
         if args.alt is not None:
             payload["args"]["alt"] = args.alt
 
-    sig = sign(payload)
-    envelope = {"sig": sig, "payload": payload}
-    msg = json.dumps(envelope, separators=(",", ":"))
+    # enveloppe au format canonique : vérifiée sur les octets reçus côté drone
+    sig, raw = Signer(SECRET).seal(payload)
+    msg = raw.decode()
 
     # Nécessite mosquitto_pub (client mosquitto) installé sur ta machine.
     # Sous MobaXterm, tu peux l’installer sur Windows (Mosquitto) et l’appeler pareil.
@@ -1,11 +1,11 @@
-﻿import json, hmac, hashlib, argparse, time
+﻿import argparse, os, sys, time
 import paho.mqtt.client as mqtt
 
-SECRET = "dev-secret-change-me"  # doit matcher SHARED_SECRET dans docker-compose.yml
+# module de signature partagé avec fleet-api et l'agent (cf. fleet-api/security.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fleet-api"))
+from security import Signer  # noqa: E402
 
-def sign(payload: dict) -> str:
-    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
-    return hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+SECRET = "dev-secret-change-me"  # doit matcher SHARED_SECRET dans docker-compose.yml
 
 def main():
     p = argparse.ArgumentParser()
@@ -30,9 +30,9 @@ def main():
         if args.alt is not None:
             payload["args"]["alt"] = args.alt
 
-    sig = sign(payload)
-    envelope = {"sig": sig, "payload": payload}
-    msg = json.dumps(envelope, separators=(",", ":"))
+    # enveloppe au format canonique : vérifiée sur les octets reçus côté drone
+    sig, raw = Signer(SECRET).seal(payload)
+    msg = raw.decode()
     topic = args.topic or f"{args.topic_prefix}/drone/{args.drone_id}/commands"
 
     client = mqtt.Client()  # paho 1.x compatible